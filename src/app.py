@@ -1,11 +1,36 @@
 from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Response, stream_with_context, g, has_request_context
+import click
 import psycopg2
-from psycopg2.extras import RealDictCursor
+import psycopg2.extensions
+import psycopg2.pool
+import psycopg2.extras
+import psycopg2.errors
+from psycopg2 import sql
 import os
-from datetime import datetime
-from collections import Counter
+import io
+import csv
+import json
+import hashlib
+import re
+import threading
+import weakref
+import queue
+import select
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from typing import NamedTuple, Optional
+from datetime import datetime, timedelta
+import math
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.middleware.proxy_fix import ProxyFix
+from markupsafe import Markup
 from opentelemetry.instrumentation.logging import LoggingInstrumentor
+import prometheus_client
+import prometheus_client.multiprocess
 from flask_wtf.csrf import CSRFProtect
 
 # --- LOGGING SETUP START ---
@@ -13,6 +38,11 @@ import logging
 import functools
 import time
 import sys
+import bisect
+import itertools
+import random
+from contextlib import nullcontext
+from opentelemetry import trace
 from pythonjsonlogger import jsonlogger
 from dotenv import load_dotenv
 
@@ -36,35 +66,171 @@ if not logger.handlers:
     logger.addHandler(logHandler)
 
 
-# The Decorator: "Tag" your functions with this to trace them
+# --- Instrumentation knobs ---
+# LOG_SAMPLE_RATE: fraction of calls that emit the started/completed log pair (0 = none)
+# LOG_SLOW_CALL_MS: calls at least this slow are always logged
+# TRACE_FUNCTION_SPANS: wrap each tagged function in an OpenTelemetry span instead of logging it
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 0.0))
+LOG_SLOW_CALL_MS = float(os.environ.get('LOG_SLOW_CALL_MS', 500))
+TRACE_FUNCTION_SPANS = os.environ.get('TRACE_FUNCTION_SPANS', 'false').lower() == 'true'
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+tracer = trace.get_tracer("app")
+
+
+class LatencyHistogram:
+    """Cumulative call count, error count and latency buckets for one function."""
+    __slots__ = ('buckets', 'count', 'errors', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)  # last slot is +Inf
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, duration_ms, failed=False):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+        self.count += 1
+        self.errors += failed
+        self.total_ms += duration_ms
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+
+    def snapshot(self):
+        cumulative = list(itertools.accumulate(self.buckets))
+        buckets = {str(le): n for le, n in zip(LATENCY_BUCKETS_MS, cumulative)}
+        buckets['+Inf'] = cumulative[-1]
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'sum_ms': round(self.total_ms, 3),
+            'max_ms': round(self.max_ms, 3),
+            'buckets_ms': buckets
+        }
+
+
+class TimingRegistry:
+    """
+    Named LatencyHistograms, created on first use; keys are any hashable label set.
+
+    `metric`, when given, is a labelled Prometheus histogram that observes every call too,
+    labelled by the key (or by the parts of a tuple key).
+    """
+
+    def __init__(self, metric=None):
+        self.metric = metric
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, duration_ms, failed=False):
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.observe(duration_ms, failed)
+        if self.metric is not None:
+            self.metric.labels(*(key if isinstance(key, tuple) else (key,))).observe(duration_ms / 1000)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: histogram.snapshot() for key, histogram in self._histograms.items()}
+
+
+# --- Prometheus series ---
+# The in-process histograms above serve /api/timings for the worker that answers it; /metrics
+# is rendered by prometheus_client. Under gunicorn, PROMETHEUS_MULTIPROC_DIR (set in
+# gunicorn.conf.py) makes every worker write its samples to files there and a scrape of any
+# worker merges all of them, so each series describes the pod rather than one worker.
+# Counters of exited workers stay in the sum; gauges count live workers only ("live*" modes).
+prometheus_client.disable_created_metrics()
+LATENCY_BUCKETS_SECONDS = tuple(ms / 1000 for ms in LATENCY_BUCKETS_MS)
+
+http_request_duration = prometheus_client.Histogram(
+    'http_request_duration_seconds', 'Flask request latency by endpoint.', ['endpoint', 'method'],
+    buckets=LATENCY_BUCKETS_SECONDS)
+http_request_errors = prometheus_client.Counter(
+    'http_request_errors', 'Requests that returned a 5xx status.', ['endpoint', 'method'])
+app_function_duration = prometheus_client.Histogram(
+    'app_function_duration_seconds', 'Latency of functions tagged with log_execution (data access and views).',
+    ['function'], buckets=LATENCY_BUCKETS_SECONDS)
+db_query_duration = prometheus_client.Histogram(
+    'db_query_duration_seconds', 'Latency of registered SQL statements, including result transfer.', ['query'],
+    buckets=LATENCY_BUCKETS_SECONDS)
+db_query_rows = prometheus_client.Counter(
+    'db_query_rows', 'Rows returned or changed by registered SQL statements.', ['query'])
+db_pool_connections = prometheus_client.Gauge(
+    'db_pool_connections', 'Pooled PostgreSQL connections by state.', ['pool', 'state'], multiprocess_mode='livesum')
+db_pool_max_size = prometheus_client.Gauge(
+    'db_pool_max_size', 'Configured maximum pool size, summed over workers.', ['pool'], multiprocess_mode='livesum')
+db_pool_checkouts = prometheus_client.Counter('db_pool_checkouts', 'Connections handed out by the pool.', ['pool'])
+db_pool_timeouts = prometheus_client.Counter('db_pool_timeouts', 'Checkouts that gave up waiting.', ['pool'])
+db_pool_opened = prometheus_client.Counter('db_pool_opened', 'New PostgreSQL sessions opened by the pool.', ['pool'])
+db_pool_wait_seconds = prometheus_client.Counter(
+    'db_pool_wait_seconds', 'Time spent waiting for a free connection.', ['pool'])
+ticket_table_cache_requests = prometheus_client.Counter(
+    'ticket_table_cache_requests', 'Ticket table fragment cache lookups.', ['result'])
+ticket_table_cache_entries = prometheus_client.Gauge(
+    'ticket_table_cache_entries', 'Rendered ticket tables currently cached.', multiprocess_mode='livesum')
+ticket_ingest_queue_depth = prometheus_client.Gauge(
+    'ticket_ingest_queue_depth', 'Tickets waiting for the batch writer.', multiprocess_mode='livesum')
+ticket_ingest = prometheus_client.Counter('ticket_ingest', 'Batch writer outcomes.', ['outcome'])
+tickets_by_status = prometheus_client.Gauge(
+    'tickets_by_status', 'Tickets per status.', ['status'], multiprocess_mode='livemostrecent')
+tickets_by_priority = prometheus_client.Gauge(
+    'tickets_by_priority', 'Tickets per priority.', ['priority'], multiprocess_mode='livemostrecent')
+
+function_timings = TimingRegistry(app_function_duration)  # keyed by function name, fed by log_execution
+route_timings = TimingRegistry(http_request_duration)     # keyed by (endpoint, method), fed by the request hooks
+
+
+def call_timings():
+    """Per-function latency histograms recorded by log_execution since the process started."""
+    return function_timings.snapshot()
+
+
+# The Decorator: "Tag" your functions with this to trace them.
+# Every call is timed into an in-memory histogram; only sampled, slow or failed calls are logged.
 def log_execution(func):
+    name = func.__name__
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Log Start
-        logger.info(f"Executing {func.__name__}", extra={
-            "function_name": func.__name__,
-            "status": "started"
-        })
-        start_time = time.time()
+        sampled = LOG_SAMPLE_RATE > 0 and random.random() < LOG_SAMPLE_RATE  # nosec B311 - log sampling only
+        if sampled:
+            logger.info("Executing %s", name, extra={
+                "function_name": name,
+                "status": "started"
+            })
+        span = tracer.start_as_current_span(name) if TRACE_FUNCTION_SPANS else nullcontext()
+        start_time = time.perf_counter()
         try:
             # Run the actual function
-            result = func(*args, **kwargs)
-            # Log Success & Duration
-            duration = time.time() - start_time
-            logger.info(f"Completed {func.__name__}", extra={
-                "function_name": func.__name__,
-                "status": "success",
-                "duration_seconds": round(duration, 4)
-            })
-            return result
+            with span:
+                result = func(*args, **kwargs)
         except Exception as e:
-            # Log Failure
-            logger.error(f"Failed {func.__name__}", extra={
-                "function_name": func.__name__,
+            duration_ms = (time.perf_counter() - start_time) * 1000
+            function_timings.record(name, duration_ms, failed=True)
+            # Log Failure (always)
+            logger.error("Failed %s", name, extra={
+                "function_name": name,
                 "status": "failed",
+                "duration_seconds": round(duration_ms / 1000, 4),
                 "error": str(e)
             })
-            raise e  # Re-raise error so Flask handles it
+            raise  # Re-raise error so Flask handles it
+
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        function_timings.record(name, duration_ms)
+        slow = duration_ms >= LOG_SLOW_CALL_MS
+        if sampled or slow:
+            # Log Success & Duration
+            logger.log(logging.WARNING if slow else logging.INFO, "Completed %s", name, extra={
+                "function_name": name,
+                "status": "slow" if slow else "success",
+                "duration_seconds": round(duration_ms / 1000, 4)
+            })
+        return result
     return wrapper
 # --- LOGGING SETUP END ---
 
@@ -74,28 +240,508 @@ app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY')
 # Initialize CSRF Protection
 csrf = CSRFProtect(app)
+# Behind the ingress, trust this many X-Forwarded-For hops so request.remote_addr is the
+# client (login throttling is per IP). Leave at 0 when the app is reached directly.
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+if TRUSTED_PROXY_COUNT:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT, x_proto=TRUSTED_PROXY_COUNT)
+
+
+# Seconds libpq waits for a new connection before giving up, so an unreachable host fails fast
+DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', 5))
 
 
 # Database Connection Function
+# Opens a brand-new session. Request code should borrow from the pool via
+# db_connection() instead; this is the factory the pool uses to grow.
+# `host` overrides DB_HOST, which is how the read-replica pool reaches app-db-ro.
 @log_execution
-def get_db_connection():
+def get_db_connection(host=None):
     conn = psycopg2.connect(
-        host=os.environ.get('DB_HOST', 'localhost'),
+        host=host or os.environ.get('DB_HOST', 'localhost'),
         port=os.environ.get('DB_PORT', 5432),
         database=os.environ.get('DB_NAME', 'app'),
         user=os.environ.get('DB_USER', 'app'),
-        password=os.environ.get('DB_PASSWORD')
+        password=os.environ.get('DB_PASSWORD'),
+        connect_timeout=DB_CONNECT_TIMEOUT
     )
     return conn
 
 
-# Initialize PostgreSQL database
-@log_execution
-def init_db():
-    conn = get_db_connection()
-    cursor = conn.cursor()
+# --- CONNECTION POOL START ---
+class ConnectionPool:
+    """
+    Thread-safe pool of PostgreSQL connections shared by every request in a worker.
+
+    - min_size connections are opened eagerly, up to max_size on demand.
+    - getconn() waits up to `timeout` seconds for a free connection, then raises PoolError.
+    - Connections idle longer than `check_interval` seconds are probed with SELECT 1
+      before being handed out; broken ones are replaced transparently.
+    - The pool remembers the PID that created it, so a forked worker never reuses
+      sockets inherited from its parent.
+    - closeall() closes idle connections at once and checked-out ones as they come back.
+    """
+
+    def __init__(self, factory, min_size=1, max_size=10, timeout=5.0, check_interval=30.0, name='primary'):
+        self._factory = factory
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size, 1)
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        self._idle = []       # [(conn, returned_at)] - LIFO so warm connections are reused first
+        self._in_use = 0      # reserved slots, including checkouts still connecting
+        self._checked_out = set()
+        self._closed = False
+        self._opened = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        for _ in range(self.min_size):
+            self._idle.append((self._factory(), time.monotonic()))
+            self._opened += 1
+        db_pool_opened.labels(name).inc(self.min_size)
+        db_pool_max_size.labels(name).set(self.max_size)
+        self._publish_sizes()
+
+    def _publish_sizes(self):
+        db_pool_connections.labels(self.name, 'in_use').set(self._in_use)
+        db_pool_connections.labels(self.name, 'idle').set(len(self._idle))
+
+    @property
+    def size(self):
+        return len(self._idle) + self._in_use
+
+    def _is_healthy(self, conn, idle_for):
+        if conn.closed:
+            return False
+        if idle_for < self.check_interval:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _release_slot(self):
+        with self._cond:
+            self._in_use -= 1
+            self._publish_sizes()
+            self._cond.notify()
+
+    def getconn(self):
+        if os.getpid() != self._pid:
+            raise psycopg2.pool.PoolError("connection pool used across fork")
+
+        started = time.monotonic()
+        deadline = started + self.timeout
+        conn = returned_at = None
+        with self._cond:
+            while not self._closed and not self._idle and self.size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    db_pool_timeouts.labels(self.name).inc()
+                    raise psycopg2.pool.PoolError(
+                        f"no connection available within {self.timeout}s (max_size={self.max_size})")
+                self._cond.wait(remaining)
+            if self._closed:
+                raise psycopg2.pool.PoolError("connection pool is closed")
+            if self._idle:
+                conn, returned_at = self._idle.pop()
+            # Reserve the slot before leaving the lock so concurrent callers respect max_size
+            self._in_use += 1
+            waited = time.monotonic() - started
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            self._publish_sizes()
+        db_pool_checkouts.labels(self.name).inc()
+        db_pool_wait_seconds.labels(self.name).inc(waited)
+
+        # Connecting and health probes happen outside the lock
+        try:
+            if conn is not None and not self._is_healthy(conn, time.monotonic() - returned_at):
+                self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._factory()
+                with self._cond:
+                    self._opened += 1
+                db_pool_opened.labels(self.name).inc()
+        except Exception:
+            self._release_slot()
+            raise
+        with self._cond:
+            self._checked_out.add(conn)
+        return conn
+
+    def putconn(self, conn, discard=False):
+        if os.getpid() != self._pid:
+            return
+        if not discard and not conn.closed and not self._closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        with self._cond:
+            self._in_use -= 1
+            self._checked_out.discard(conn)
+            if discard or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._publish_sizes()
+            self._cond.notify()
+
+    def closeall(self):
+        """Close idle connections now; ones still checked out are closed by putconn()."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            pending = len(self._checked_out)
+            self._cond.notify_all()  # waiters in getconn() would otherwise sleep out their timeout
+        if os.getpid() != self._pid:
+            return  # Never close sockets that belong to the parent process
+        for conn, _ in idle:
+            self._discard(conn)
+        with self._cond:
+            self._publish_sizes()
+        if pending:
+            # --- LOG: Pool Closed With Checkouts ---
+            logger.info("Connection pool closed, in-use connections close on return", extra={
+                "event": "pool_closed",
+                "pool": self.name,
+                "in_use": pending
+            })
+
+    def stats(self):
+        with self._cond:
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'opened': self._opened,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'wait_seconds_total': round(self._wait_total, 4),
+                'wait_seconds_max': round(self._wait_max, 4),
+            }
+
+
+_pools = {}
+_pool_lock = threading.Lock()   # guards _pools and _pool_locks only; never held while connecting
+_pool_locks = {}                # role -> lock held while that role's pool is being built
+
+# Read-only endpoint (CNPG's app-db-ro service). Unset means every query goes to the primary.
+DB_READ_HOST = os.environ.get('DB_READ_HOST') or None
+# How long a session that just wrote keeps reading from the primary, to hide replication lag
+READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
+# After the replica fails, send reads to the primary for this long before trying it again
+REPLICA_RETRY_SECONDS = float(os.environ.get('REPLICA_RETRY_SECONDS', 30))
+_replica_down_until = 0.0
+
+
+def pool_max_sizes(role):
+    """
+    (sync, async) connection caps for `role` in this worker. DB_POOL_MAX_SIZE (or
+    DB_READ_POOL_MAX_SIZE for the replica) is the whole per-worker budget: with ASYNC_DB
+    the async pool takes ASYNC_DB_POOL_MAX_SIZE of it (default half) and the sync pool
+    the rest, so turning async views on never adds connections to PostgreSQL.
+    """
+    if role == 'replica':
+        total = int(os.environ.get('DB_READ_POOL_MAX_SIZE') or os.environ.get('DB_POOL_MAX_SIZE', 10))
+    else:
+        total = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+    if not ASYNC_DB:
+        return total, 0
+    async_max = max(1, min(int(os.environ.get('ASYNC_DB_POOL_MAX_SIZE') or total // 2), total - 1))
+    return max(1, total - async_max), async_max
+
+
+def get_pool(role='primary'):
+    """Return the process-wide pool for `role` ('primary' or 'replica'), creating it lazily (and again after a fork)."""
+    pool = _pools.get(role)
+    if pool is not None and pool._pid == os.getpid():
+        return pool
+    with _pool_lock:
+        role_lock = _pool_locks.setdefault(role, threading.Lock())
+    # Building a pool opens DB_POOL_MIN_SIZE connections; doing that under the role's own lock
+    # means an unreachable replica stalls only the readers waiting for it, not the primary.
+    with role_lock:
+        pool = _pools.get(role)
+        if pool is not None and pool._pid == os.getpid():
+            return pool
+        if role == 'replica':
+            if time.monotonic() < _replica_down_until:
+                # Another thread just failed to reach it; don't make every waiter dial it again
+                raise psycopg2.OperationalError("read replica marked down")
+            host = DB_READ_HOST
+        else:
+            host = None
+        pool = ConnectionPool(
+            lambda: get_db_connection(host),
+            min_size=int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            max_size=pool_max_sizes(role)[0],
+            timeout=float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+            check_interval=float(os.environ.get('DB_POOL_CHECK_INTERVAL', 30)),
+            name=role,
+        )
+        with _pool_lock:
+            _pools[role] = pool
+        return pool
+
+
+def close_pool():
+    global _replica_down_until
+    with _pool_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
+        _replica_down_until = 0.0
+
+
+def _reset_pool_after_fork():
+    # The child must not touch the parent's sockets or a lock that may have been held at fork time
+    global _pools, _pool_lock, _pool_locks
+    _pools = {}
+    _pool_lock = threading.Lock()
+    _pool_locks = {}
+
 
-    # Create tickets table
+os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+
+def note_primary_write():
+    """Pin this browser session's reads to the primary for READ_YOUR_WRITES_SECONDS."""
+    if has_request_context():
+        session['wrote_at'] = time.time()
+
+
+def wrote_recently():
+    """True while this browser session is inside its READ_YOUR_WRITES_SECONDS window."""
+    return has_request_context() and time.time() - session.get('wrote_at', 0) < READ_YOUR_WRITES_SECONDS
+
+
+def _read_from_replica():
+    if not DB_READ_HOST or time.monotonic() < _replica_down_until:
+        return False
+    return not wrote_recently()
+
+
+def _replica_failed(error):
+    """Send reads to the primary for REPLICA_RETRY_SECONDS after the replica errors."""
+    global _replica_down_until
+    _replica_down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+    # --- LOG: Replica Unavailable ---
+    logger.warning("Read replica unavailable, falling back to primary", extra={
+        "event": "replica_fallback",
+        "host": DB_READ_HOST,
+        "error": str(error)
+    })
+
+
+def _checkout(readonly):
+    """Pick the pool for this query and borrow a connection, falling back to the primary if the replica fails."""
+    if readonly and _read_from_replica():
+        try:
+            pool = get_pool('replica')
+            return pool, pool.getconn()
+        except (psycopg2.OperationalError, psycopg2.pool.PoolError) as e:
+            _replica_failed(e)
+    pool = get_pool()
+    return pool, pool.getconn()
+
+
+@contextmanager
+def _borrowed(pool, conn):
+    broken = False
+    try:
+        yield conn
+    except psycopg2.OperationalError:
+        broken = True
+        raise
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn, discard=broken)
+
+
+@contextmanager
+def db_connection(readonly=False):
+    """
+    Borrow a pooled connection; rolls back on error and always returns it.
+
+    readonly=True may be served by the DB_READ_HOST replica. Callers that write must
+    use the default and call note_primary_write() once committed. Prefer read_rows() for
+    single-statement reads: it also retries on the primary if the replica drops mid-query.
+    """
+    pool, conn = _checkout(readonly)
+    with _borrowed(pool, conn):
+        yield conn
+
+
+def read_rows(query, params=None, one=False):
+    """
+    Run the registered read-only `query` and return its rows (or the first row if `one`).
+
+    Served by the replica when allowed. A pooled replica connection can still be dead
+    (failover, restart), so an OperationalError there marks the replica down and the
+    query is retried once on the primary; errors from the primary propagate.
+    """
+    def fetch(conn):
+        cursor = queries.run(conn.cursor(), query, params)
+        return cursor.fetchone() if one else cursor.fetchall()
+
+    pool, conn = _checkout(True)
+    try:
+        with _borrowed(pool, conn):
+            return fetch(conn)
+    except psycopg2.OperationalError as e:
+        if pool.name != 'replica':
+            raise
+        _replica_failed(e)
+    pool = get_pool()
+    with _borrowed(pool, pool.getconn()) as conn:
+        return fetch(conn)
+# --- CONNECTION POOL END ---
+
+
+# --- QUERY REGISTRY START ---
+# Hot statements are registered once by name and run with queries.run(). The first run on
+# a pooled connection PREPAREs the statement; later runs send only EXECUTE name(params), so
+# PostgreSQL parses and analyses it once per session and may reuse a cached generic plan.
+# Every run is timed per name along with the rows it returned or changed (see /metrics).
+# Set DB_PREPARED_STATEMENTS=false behind a transaction-pooling proxy such as PgBouncer,
+# where consecutive transactions can land on different server sessions.
+DB_PREPARED_STATEMENTS = os.environ.get('DB_PREPARED_STATEMENTS', 'true').lower() == 'true'
+
+_QUERY_NAME_RE = re.compile(r'[a-z_][a-z0-9_]*\Z')
+_QUERY_PARAM_RE = re.compile(r'%\((\w+)\)s|%s|%%')
+
+
+class Query(NamedTuple):
+    name: str
+    text: str                 # psycopg2 paramstyle (%s or %(name)s), as run when not prepared
+    prepare: sql.Composable   # PREPARE name AS ... with $n parameters
+    execute: str              # EXECUTE name(...) taking the same params as `text`
+
+
+class QueryRegistry:
+    """Named statements, which of them each connection has prepared, and per-statement stats."""
+
+    def __init__(self):
+        self._queries = {}
+        self._prepared = weakref.WeakKeyDictionary()  # connection -> names PREPAREd in its session
+        self._rows = Counter()
+        self._lock = threading.Lock()
+        self.timings = TimingRegistry(db_query_duration)
+
+    def register(self, name, text):
+        if not _QUERY_NAME_RE.match(name) or name in self._queries:
+            raise ValueError(f"invalid or duplicate query name: {name!r}")
+        numbers = {}
+        placeholders = []
+
+        def number(match):
+            if match.group(0) == '%%':
+                return '%'
+            # A named parameter keeps one $n however often it appears; each %s is a new one
+            key = match.group(1) or len(placeholders)
+            if key not in numbers:
+                placeholders.append(match.group(0))
+                numbers[key] = len(placeholders)
+            return f'${numbers[key]}'
+
+        body = _QUERY_PARAM_RE.sub(number, text)
+        execute = f"EXECUTE {name}({', '.join(placeholders)})" if placeholders else f'EXECUTE {name}'
+        query = Query(name, text, sql.SQL('PREPARE {} AS {}').format(sql.Identifier(name), sql.SQL(body)), execute)
+        self._queries[name] = query
+        return query
+
+    def __getitem__(self, name):
+        return self._queries[name]
+
+    def __iter__(self):
+        return iter(list(self._queries.values()))
+
+    def run(self, cursor, query, params=None):
+        """Execute `query` on `cursor` (preparing it on this connection first if needed); returns the cursor."""
+        started = time.perf_counter()
+        try:
+            if DB_PREPARED_STATEMENTS:
+                self._execute_prepared(cursor, query, params)
+            else:
+                cursor.execute(query.text, params)
+        except Exception:
+            self.record(query.name, (time.perf_counter() - started) * 1000, 0, failed=True)
+            raise
+        self.record(query.name, (time.perf_counter() - started) * 1000, cursor.rowcount)
+        return cursor
+
+    def _execute_prepared(self, cursor, query, params):
+        # A connection serves one request at a time, so only the lookup needs the lock
+        with self._lock:
+            prepared = self._prepared.setdefault(cursor.connection, set())
+        if query.name not in prepared:
+            cursor.execute(query.prepare)
+            prepared.add(query.name)
+        # Statements outlive transactions, so a failed EXECUTE at the start of one is safe to redo
+        idle = cursor.connection.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        try:
+            cursor.execute(query.execute, params)
+        except psycopg2.errors.InvalidSqlStatementName:
+            # The session dropped its statements (DISCARD ALL); everything must be prepared again
+            prepared.clear()
+            if not idle:
+                raise  # earlier work in this transaction is lost with it; let the caller fail
+            cursor.connection.rollback()
+            cursor.execute(query.prepare)
+            prepared.add(query.name)
+            cursor.execute(query.execute, params)
+
+    def record(self, name, duration_ms, rows, failed=False):
+        self.timings.record(name, duration_ms, failed)
+        rows = max(rows, 0)  # rowcount is -1 when the driver cannot tell
+        with self._lock:
+            self._rows[name] += rows
+        db_query_rows.labels(name).inc(rows)
+
+    def snapshot(self):
+        """Latency histogram plus total rows for every statement that has run."""
+        timings = self.timings.snapshot()
+        with self._lock:
+            return {name: {**snap, 'rows': self._rows[name]} for name, snap in timings.items()}
+
+
+queries = QueryRegistry()
+
+PING_SQL = queries.register('ping', 'SELECT 1')
+# --- QUERY REGISTRY END ---
+
+
+# --- SCHEMA MIGRATIONS START ---
+# Each migration is (version, description, function(cursor)). Steps run in order, once,
+# each in its own transaction together with its schema_version row. Steps are written
+# with IF NOT EXISTS so databases created before versioning are adopted safely.
+# Append new steps at the end; never edit or renumber one that has shipped.
+
+def _migration_base_tables(cursor):
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS tickets (
             id SERIAL PRIMARY KEY,
@@ -106,25 +752,6 @@ def init_db():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
-
-    # Check if tickets already exist
-    cursor.execute('SELECT COUNT(*) FROM tickets')
-    count = cursor.fetchone()[0]
-
-    if count == 0:
-        # Insert sample tickets only if table is empty
-        sample_tickets = [
-            ('Login Failure', 'User reports login issue on portal', 'High', 'Open', '2025-07-20 10:00:00'),
-            ('Application Crash', 'App crashes during data import', 'High', 'In Progress', '2025-07-20 11:15:00'),
-            ('Report Generation Issue', 'Report not generating correctly', 'Medium', 'Open', '2025-07-20 12:30:00'),
-            ('UI Glitch', 'Minor display issue on dashboard', 'Low', 'Resolved', '2025-07-20 09:45:00')
-        ]
-        cursor.executemany('''
-            INSERT INTO tickets (title, description, priority, status, created_at)
-            VALUES (%s, %s, %s, %s, %s)
-        ''', sample_tickets)
-
-    # Create users table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
             id SERIAL PRIMARY KEY,
@@ -134,104 +761,1291 @@ def init_db():
         )
     ''')
 
-    # Optional: Add default admin if none exists
-    cursor.execute('SELECT COUNT(*) FROM users')
-    if cursor.fetchone()[0] == 0:
+
+def _migration_search_indexes(cursor):
+    # Search indexes: a weighted tsvector (title A, description B) behind a GIN index,
+    # plus a trigram index on title for substring and typo-tolerant matches.
+    # PostgreSQL backfills the generated column for existing rows when it is added.
+    cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    cursor.execute('''
+        ALTER TABLE tickets ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_search_vector ON tickets USING GIN (search_vector)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_title_trgm ON tickets USING GIN (title gin_trgm_ops)')
+
+
+def _migration_hot_query_indexes(cursor):
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets (status)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_priority ON tickets (priority)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_created_at ON tickets (created_at)')
+    # Covers the dashboard's status/priority GROUPING SETS with an index-only scan
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_status_priority ON tickets (status, priority)')
+
+
+# Channel the ticket triggers NOTIFY on; every app process LISTENs on it (see TicketEventHub)
+TICKET_EVENTS_CHANNEL = 'ticket_changes'
+
+
+def _migration_ticket_notify(cursor):
+    # Statement-level triggers with transition tables: one call per INSERT/UPDATE/COPY, not per
+    # row. Small statements send one JSON payload per changed ticket; anything larger (bulk
+    # import, bulk status change) sends a single 'reload' so dashboards refetch instead.
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION notify_ticket_changes() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            changed integer;
+        BEGIN
+            SELECT count(*) INTO changed FROM new_rows;
+            IF changed = 0 THEN
+                RETURN NULL;
+            ELSIF changed > 50 THEN
+                PERFORM pg_notify('ticket_changes', json_build_object('op', 'reload', 'count', changed)::text);
+            ELSIF TG_OP = 'INSERT' THEN
+                PERFORM pg_notify('ticket_changes', json_build_object(
+                    'op', 'insert', 'id', n.id, 'title', left(n.title, 200), 'description', left(n.description, 500),
+                    'priority', n.priority, 'status', n.status,
+                    'created_at', to_char(n.created_at, 'YYYY-MM-DD HH24:MI:SS'))::text)
+                FROM new_rows n;
+            ELSE
+                PERFORM pg_notify('ticket_changes', json_build_object(
+                    'op', 'update', 'id', n.id, 'title', left(n.title, 200), 'description', left(n.description, 500),
+                    'priority', n.priority, 'status', n.status,
+                    'created_at', to_char(n.created_at, 'YYYY-MM-DD HH24:MI:SS'),
+                    'old_priority', o.priority, 'old_status', o.status)::text)
+                FROM new_rows n JOIN old_rows o USING (id)
+                WHERE (n.title, n.description, n.priority, n.status)
+                      IS DISTINCT FROM (o.title, o.description, o.priority, o.status);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    ''')
+    cursor.execute('DROP TRIGGER IF EXISTS tickets_notify_insert ON tickets')
+    cursor.execute('''
+        CREATE TRIGGER tickets_notify_insert AFTER INSERT ON tickets
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_ticket_changes()
+    ''')
+    cursor.execute('DROP TRIGGER IF EXISTS tickets_notify_update ON tickets')
+    cursor.execute('''
+        CREATE TRIGGER tickets_notify_update AFTER UPDATE ON tickets
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_ticket_changes()
+    ''')
+
+
+def _migration_ticket_events(cursor):
+    # Ticket history, written by triggers so every path (add, edit, status, bulk, COPY import)
+    # records its events in the same transaction as the change itself. Monthly range
+    # partitions are created ahead by ensure_ticket_event_partitions(); the DEFAULT partition
+    # only catches rows if that ever falls behind. BRIN stays tiny because occurred_at only
+    # grows, and time-range queries prune whole partitions before touching it.
+    cursor.execute('ALTER TABLE tickets ADD COLUMN IF NOT EXISTS status_changed_at TIMESTAMP')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ticket_events (
+            ticket_id INTEGER NOT NULL,
+            occurred_at TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP,
+            event TEXT NOT NULL,
+            old_value TEXT,
+            new_value TEXT,
+            dwell INTERVAL
+        ) PARTITION BY RANGE (occurred_at)
+    ''')
+    cursor.execute('CREATE TABLE IF NOT EXISTS ticket_events_default PARTITION OF ticket_events DEFAULT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ticket_events_occurred_at ON ticket_events USING BRIN (occurred_at)')
+
+    # Row-level, but only for rows whose status really changes: remembers when the current
+    # status began, so a status event can carry how long the ticket sat in the old one
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION stamp_ticket_status_change() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.status_changed_at := LOCALTIMESTAMP;
+            RETURN NEW;
+        END
+        $$
+    ''')
+    cursor.execute('DROP TRIGGER IF EXISTS tickets_stamp_status ON tickets')
+    cursor.execute('''
+        CREATE TRIGGER tickets_stamp_status BEFORE UPDATE OF status ON tickets
+        FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status)
+        EXECUTE FUNCTION stamp_ticket_status_change()
+    ''')
+
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION record_ticket_events() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO ticket_events (ticket_id, event, new_value)
+                SELECT id, 'created', status FROM new_rows;
+            ELSE
+                INSERT INTO ticket_events (ticket_id, event, old_value, new_value, dwell)
+                SELECT n.id, 'status', o.status, n.status, LOCALTIMESTAMP - coalesce(o.status_changed_at, o.created_at)
+                FROM new_rows n JOIN old_rows o USING (id) WHERE n.status IS DISTINCT FROM o.status
+                UNION ALL
+                SELECT n.id, 'priority', o.priority, n.priority, NULL
+                FROM new_rows n JOIN old_rows o USING (id) WHERE n.priority IS DISTINCT FROM o.priority
+                UNION ALL
+                SELECT n.id, 'edited', NULL, NULL, NULL
+                FROM new_rows n JOIN old_rows o USING (id)
+                WHERE (n.title, n.description) IS DISTINCT FROM (o.title, o.description);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    ''')
+    cursor.execute('DROP TRIGGER IF EXISTS tickets_history_insert ON tickets')
+    cursor.execute('''
+        CREATE TRIGGER tickets_history_insert AFTER INSERT ON tickets
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION record_ticket_events()
+    ''')
+    cursor.execute('DROP TRIGGER IF EXISTS tickets_history_update ON tickets')
+    cursor.execute('''
+        CREATE TRIGGER tickets_history_update AFTER UPDATE ON tickets
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION record_ticket_events()
+    ''')
+
+
+def _migration_ticket_rollups(cursor):
+    # Hourly and daily counts for the trend charts, kept current by a statement-level trigger
+    # in the writing transaction. 'created' counts tickets by creation bucket and current
+    # priority (an edit moves the count); 'status' counts moves into each status.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ticket_rollups (
+            granularity TEXT NOT NULL CHECK (granularity IN ('hour', 'day')),
+            bucket TIMESTAMP NOT NULL,
+            kind TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (granularity, bucket, kind, value)
+        )
+    ''')
+    # Rows are upserted in key order so concurrent writers lock shared buckets in the same
+    # order; each statement touches a handful of rows however many tickets it changed.
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION update_ticket_rollups() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO ticket_rollups (granularity, bucket, kind, value, count)
+                SELECT g.granularity, date_trunc(g.granularity, n.created_at), 'created', n.priority, count(*)
+                FROM new_rows n CROSS JOIN (VALUES ('hour'), ('day')) AS g(granularity)
+                WHERE n.created_at IS NOT NULL AND n.priority IS NOT NULL
+                GROUP BY 1, 2, 4
+                ORDER BY 1, 2, 4
+                ON CONFLICT (granularity, bucket, kind, value)
+                DO UPDATE SET count = ticket_rollups.count + EXCLUDED.count;
+            ELSE
+                INSERT INTO ticket_rollups (granularity, bucket, kind, value, count)
+                SELECT g.granularity, date_trunc(g.granularity, d.at), d.kind, d.value, sum(d.delta)
+                FROM (
+                    SELECT n.created_at, 'created', n.priority, 1
+                    FROM new_rows n JOIN old_rows o USING (id) WHERE n.priority IS DISTINCT FROM o.priority
+                    UNION ALL
+                    SELECT o.created_at, 'created', o.priority, -1
+                    FROM new_rows n JOIN old_rows o USING (id) WHERE n.priority IS DISTINCT FROM o.priority
+                    UNION ALL
+                    SELECT LOCALTIMESTAMP, 'status', n.status, 1
+                    FROM new_rows n JOIN old_rows o USING (id) WHERE n.status IS DISTINCT FROM o.status
+                ) AS d(at, kind, value, delta) CROSS JOIN (VALUES ('hour'), ('day')) AS g(granularity)
+                WHERE d.at IS NOT NULL AND d.value IS NOT NULL
+                GROUP BY 1, 2, 3, 4
+                ORDER BY 1, 2, 3, 4
+                ON CONFLICT (granularity, bucket, kind, value)
+                DO UPDATE SET count = ticket_rollups.count + EXCLUDED.count;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    ''')
+    cursor.execute('DROP TRIGGER IF EXISTS tickets_rollup_insert ON tickets')
+    cursor.execute('''
+        CREATE TRIGGER tickets_rollup_insert AFTER INSERT ON tickets
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION update_ticket_rollups()
+    ''')
+    cursor.execute('DROP TRIGGER IF EXISTS tickets_rollup_update ON tickets')
+    cursor.execute('''
+        CREATE TRIGGER tickets_rollup_update AFTER UPDATE ON tickets
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION update_ticket_rollups()
+    ''')
+    # Existing tickets (and history since migration 5) are counted once here. Written out
+    # rather than calling rebuild_ticket_rollups(), whose sources may grow in later steps.
+    cursor.execute('''
+        INSERT INTO ticket_rollups (granularity, bucket, kind, value, count)
+        SELECT g.granularity, date_trunc(g.granularity, t.created_at), 'created', t.priority, count(*)
+        FROM tickets t CROSS JOIN (VALUES ('hour'), ('day')) AS g(granularity)
+        WHERE t.created_at IS NOT NULL AND t.priority IS NOT NULL
+        GROUP BY 1, 2, 4
+        UNION ALL
+        SELECT g.granularity, date_trunc(g.granularity, e.occurred_at), 'status', e.new_value, count(*)
+        FROM ticket_events e CROSS JOIN (VALUES ('hour'), ('day')) AS g(granularity)
+        WHERE e.event = 'status' AND e.new_value IS NOT NULL
+        GROUP BY 1, 2, 4
+        ON CONFLICT DO NOTHING
+    ''')
+
+
+def _migration_ticket_fingerprints(cursor):
+    # At most one unresolved ticket per fingerprint; add_ticket() upserts into it. Resolving
+    # a ticket releases its fingerprint, so the next alert opens a fresh ticket and a
+    # reopened ticket can never collide with one raised since.
+    cursor.execute('''
+        ALTER TABLE tickets
+            ADD COLUMN IF NOT EXISTS fingerprint TEXT,
+            ADD COLUMN IF NOT EXISTS occurrences INTEGER NOT NULL DEFAULT 1,
+            ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP
+    ''')
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_tickets_open_fingerprint ON tickets (fingerprint)
+        WHERE status <> 'Resolved'
+    ''')
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION release_ticket_fingerprint() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.fingerprint := NULL;
+            RETURN NEW;
+        END
+        $$
+    ''')
+    cursor.execute('DROP TRIGGER IF EXISTS tickets_release_fingerprint ON tickets')
+    cursor.execute('''
+        CREATE TRIGGER tickets_release_fingerprint BEFORE UPDATE OF status ON tickets
+        FOR EACH ROW WHEN (NEW.status = 'Resolved' AND OLD.fingerprint IS NOT NULL)
+        EXECUTE FUNCTION release_ticket_fingerprint()
+    ''')
+
+
+def _migration_ticket_archive(cursor):
+    # Resolved tickets past ARCHIVE_AFTER_DAYS move to tickets_archive, so the hot table (and
+    # every listing, search and stats query on it) stays the size of the open workload.
+    # Reads opt in to history through the all_tickets view; PostgreSQL pushes filters into
+    # both branches, so each still uses its own indexes. Ids are kept, never reissued.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tickets_archive (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT,
+            priority TEXT,
+            status TEXT,
+            created_at TIMESTAMP,
+            status_changed_at TIMESTAMP,
+            occurrences INTEGER NOT NULL DEFAULT 1,
+            last_seen_at TIMESTAMP,
+            archived_at TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP,
+            search_vector tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(description, '')), 'B')
+            ) STORED
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tickets_archive_search_vector ON tickets_archive USING GIN (search_vector)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tickets_archive_title_trgm ON tickets_archive USING GIN (title gin_trgm_ops)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tickets_archive_created_at ON tickets_archive USING BRIN (created_at)
+    ''')
+    # Finds archival candidates without scanning the resolved tickets that are still recent
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tickets_resolved_since ON tickets ((coalesce(status_changed_at, created_at)))
+        WHERE status = 'Resolved'
+    ''')
+    cursor.execute('''
+        CREATE OR REPLACE VIEW all_tickets AS
+        SELECT id, title, description, priority, status, created_at, status_changed_at, search_vector
+        FROM tickets
+        UNION ALL
+        SELECT id, title, description, priority, status, created_at, status_changed_at, search_vector
+        FROM tickets_archive
+    ''')
+
+
+def _migration_surface_occurrences(cursor):
+    # Listings show each ticket's occurrence count, so the all_tickets view carries it (new
+    # view columns can only be appended) and live events send it with every ticket.
+    cursor.execute('''
+        CREATE OR REPLACE VIEW all_tickets AS
+        SELECT id, title, description, priority, status, created_at, status_changed_at, search_vector, occurrences
+        FROM tickets
+        UNION ALL
+        SELECT id, title, description, priority, status, created_at, status_changed_at, search_vector, occurrences
+        FROM tickets_archive
+    ''')
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION notify_ticket_changes() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            changed integer;
+        BEGIN
+            SELECT count(*) INTO changed FROM new_rows;
+            IF changed = 0 THEN
+                RETURN NULL;
+            ELSIF changed > 50 THEN
+                PERFORM pg_notify('ticket_changes', json_build_object('op', 'reload', 'count', changed)::text);
+            ELSIF TG_OP = 'INSERT' THEN
+                PERFORM pg_notify('ticket_changes', json_build_object(
+                    'op', 'insert', 'id', n.id, 'title', left(n.title, 200), 'description', left(n.description, 500),
+                    'priority', n.priority, 'status', n.status,
+                    'created_at', to_char(n.created_at, 'YYYY-MM-DD HH24:MI:SS'), 'occurrences', n.occurrences)::text)
+                FROM new_rows n;
+            ELSE
+                -- A repeat only bumps occurrences; that alone is not pushed, or an alert storm
+                -- would become a NOTIFY storm. The next event or page load shows the count.
+                PERFORM pg_notify('ticket_changes', json_build_object(
+                    'op', 'update', 'id', n.id, 'title', left(n.title, 200), 'description', left(n.description, 500),
+                    'priority', n.priority, 'status', n.status,
+                    'created_at', to_char(n.created_at, 'YYYY-MM-DD HH24:MI:SS'), 'occurrences', n.occurrences,
+                    'old_priority', o.priority, 'old_status', o.status)::text)
+                FROM new_rows n JOIN old_rows o USING (id)
+                WHERE (n.title, n.description, n.priority, n.status)
+                      IS DISTINCT FROM (o.title, o.description, o.priority, o.status);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    ''')
+
+
+MIGRATIONS = [
+    (1, 'tickets and users tables', _migration_base_tables),
+    (2, 'full-text and trigram search indexes', _migration_search_indexes),
+    (3, 'indexes for status, priority, created_at and dashboard counts', _migration_hot_query_indexes),
+    (4, 'NOTIFY triggers for live dashboard updates', _migration_ticket_notify),
+    (5, 'ticket_events history table, partitioned by month', _migration_ticket_events),
+    (6, 'hourly and daily ticket rollups', _migration_ticket_rollups),
+    (7, 'ticket fingerprints and occurrence counts for deduplication', _migration_ticket_fingerprints),
+    (8, 'tickets_archive for resolved tickets and the all_tickets view', _migration_ticket_archive),
+    (9, 'occurrence counts in all_tickets and live ticket events', _migration_surface_occurrences),
+]
+
+# Arbitrary constant shared by every replica; pg_advisory_lock serialises runners
+MIGRATION_LOCK_ID = 814_227_001
+
+
+@log_execution
+def run_migrations(conn):
+    """Apply pending MIGRATIONS; safe to call from several replicas at once."""
+    cursor = conn.cursor()
+    # Session-level lock: other replicas block here until we finish, then find nothing to do
+    cursor.execute('SELECT pg_advisory_lock(%s)', (MIGRATION_LOCK_ID,))
+    try:
         cursor.execute('''
-            INSERT INTO users (username, password, role)
-            VALUES (%s, %s, %s)
-        ''', ('admin', generate_password_hash('admin123'), 'admin'))
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+        current = cursor.fetchone()[0]
+        conn.commit()
+
+        applied = []
+        for version, description, step in MIGRATIONS:
+            if version <= current:
+                continue
+            step(cursor)
+            cursor.execute('INSERT INTO schema_version (version, description) VALUES (%s, %s)',
+                           (version, description))
+            conn.commit()
+            applied.append(version)
+            logger.info("Schema Migration Applied", extra={
+                "event": "schema_migration",
+                "version": version,
+                "description": description
+            })
+        return applied
+    finally:
+        # Roll back a failed step first; the unlock must not run inside an aborted transaction
+        conn.rollback()
+        cursor.execute('SELECT pg_advisory_unlock(%s)', (MIGRATION_LOCK_ID,))
+        conn.commit()
+# --- SCHEMA MIGRATIONS END ---
 
-    conn.commit()
-    conn.close()
+
+# Initialize PostgreSQL database
+@log_execution
+def init_db():
+    with db_connection() as conn:
+        run_migrations(conn)
+        cursor = conn.cursor()
+        # Held until commit so two replicas starting together cannot both seed
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', (MIGRATION_LOCK_ID,))
+        ensure_ticket_event_partitions(cursor)
+
+        # Insert sample tickets only if table is empty (EXISTS stops at the first row)
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM tickets)')
+        if not cursor.fetchone()[0]:
+            sample_tickets = [
+                ('Login Failure', 'User reports login issue on portal', 'High', 'Open', '2025-07-20 10:00:00'),
+                ('Application Crash', 'App crashes during data import', 'High', 'In Progress', '2025-07-20 11:15:00'),
+                ('Report Generation Issue', 'Report not generating correctly', 'Medium', 'Open', '2025-07-20 12:30:00'),
+                ('UI Glitch', 'Minor display issue on dashboard', 'Low', 'Resolved', '2025-07-20 09:45:00')
+            ]
+            cursor.executemany('''
+                INSERT INTO tickets (title, description, priority, status, created_at)
+                VALUES (%s, %s, %s, %s, %s)
+            ''', sample_tickets)
+
+        # Optional: Add default admin if none exists
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM users)')
+        if not cursor.fetchone()[0]:
+            cursor.execute('''
+                INSERT INTO users (username, password, role)
+                VALUES (%s, %s, %s)
+            ''', ('admin', generate_password_hash('admin123', method=PASSWORD_HASH_METHOD), 'admin'))
+
+        conn.commit()
+
+
+VALID_PRIORITIES = ['High', 'Medium', 'Low']
+VALID_STATUSES = ['Open', 'In Progress', 'Resolved']
+
+
+# Unknown priorities are filed as Low rather than rejected
+def normalize_priority(priority):
+    return priority if priority in VALID_PRIORITIES else 'Low'
+
+
+# --- TICKET DEDUPLICATION START ---
+# A flapping alert files the same ticket over and over. Tickets are fingerprinted on their
+# normalised title and description; while one with that fingerprint is unresolved, repeats
+# only bump its occurrence count. The database (a unique partial index plus ON CONFLICT)
+# is the source of truth; fingerprint_index remembers recent fingerprints so a repeat can
+# go straight to a primary-key UPDATE instead of attempting (and indexing) an insert.
+DEDUP_ENABLED = os.environ.get('DEDUP_ENABLED', 'true').lower() == 'true'
+DEDUP_CACHE_SIZE = int(os.environ.get('DEDUP_CACHE_SIZE', 10000))
+DEDUP_CACHE_TTL = float(os.environ.get('DEDUP_CACHE_TTL', 600))
+
+# Alert bodies usually embed the time they fired; that alone must not make a ticket new
+_TIMESTAMP_RE = re.compile(r'\d{4}-\d{2}-\d{2}[t ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(z|[+-]\d{2}:?\d{2})?')
+
+
+def ticket_fingerprint(title, description):
+    """sha256 of the case-folded title and description, whitespace collapsed and timestamps masked."""
+    parts = (' '.join(_TIMESTAMP_RE.sub('<time>', (text or '').casefold()).split()) for text in (title, description))
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+
+class FingerprintIndex:
+    """Bounded LRU of fingerprint -> open ticket id; entries expire after `ttl` seconds."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # fingerprint -> (ticket_id, stored_at)
+        self._lock = threading.Lock()
+
+    def get(self, fingerprint):
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[1] >= self.ttl:
+                del self._entries[fingerprint]
+                return None
+            self._entries.move_to_end(fingerprint)
+            return entry[0]
+
+    def put(self, fingerprint, ticket_id):
+        with self._lock:
+            self._entries[fingerprint] = (ticket_id, time.monotonic())
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, fingerprint):
+        with self._lock:
+            self._entries.pop(fingerprint, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+fingerprint_index = FingerprintIndex(DEDUP_CACHE_SIZE, DEDUP_CACHE_TTL)
+
+
+RECORD_OCCURRENCE_SQL = queries.register('record_occurrence', '''
+    UPDATE tickets SET occurrences = occurrences + 1, last_seen_at = %s
+    WHERE id = %s AND fingerprint = %s
+''')
+
+
+def _record_occurrence(ticket_id, fingerprint, seen_at):
+    """Count a repeat against a cached ticket; False if it has been resolved (or vanished) since."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        queries.run(cursor, RECORD_OCCURRENCE_SQL, (seen_at, ticket_id, fingerprint))
+        counted = cursor.rowcount == 1
+        conn.commit()
+    return counted
+# --- TICKET DEDUPLICATION END ---
+
+
+# --- WRITE-BEHIND INGEST START ---
+# Optional (INGEST_BATCHING=true): add_ticket() hands its row to one writer thread per
+# process, which commits whatever has queued up as a single multi-row INSERT. A flood of
+# alert tickets then costs one round trip, one commit and one run of the statement-level
+# triggers per batch instead of per ticket. Callers still wait for the commit, so an
+# acknowledged ticket is durable; a full queue or a failed batch falls back to a plain
+# synchronous insert. A caller that outwaits INGEST_WAIT_SECONDS also inserts directly if
+# its row never left the queue, and gets TicketIngestPending if its batch is in flight.
+INGEST_BATCHING = os.environ.get('INGEST_BATCHING', 'false').lower() == 'true'
+INGEST_QUEUE_SIZE = int(os.environ.get('INGEST_QUEUE_SIZE', 1000))
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 200))
+INGEST_FLUSH_MS = float(os.environ.get('INGEST_FLUSH_MS', 10))
+# Back-pressure: how long a request may wait for queue space before inserting by itself
+INGEST_ENQUEUE_TIMEOUT = float(os.environ.get('INGEST_ENQUEUE_TIMEOUT', 0.05))
+INGEST_WAIT_SECONDS = float(os.environ.get('INGEST_WAIT_SECONDS', 30))
+
+# A repeat of an unresolved ticket updates it instead; `xmax = 0` holds only for a row this
+# statement inserted, which tells the two outcomes apart
+INSERT_TICKET_SQL = queries.register('insert_ticket', '''
+    INSERT INTO tickets (title, description, priority, status, created_at, fingerprint, occurrences)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (fingerprint) WHERE status <> 'Resolved'
+    DO UPDATE SET occurrences = tickets.occurrences + EXCLUDED.occurrences, last_seen_at = EXCLUDED.created_at
+    RETURNING id, xmax = 0
+''')
+# The same upsert for execute_values, which expands the single VALUES %s into the batch.
+# RETURNING comes back in no guaranteed order and cannot name the VALUES list, so each row
+# gets its id up front and the result is joined back to the caller's ordinal: on the new id
+# when inserted, on the fingerprint (unique within a folded batch) when it hit an open ticket.
+INSERT_TICKETS_BATCH_SQL = '''
+    WITH batch AS (
+        SELECT nextval(pg_get_serial_sequence('tickets', 'id')) AS new_id, v.*
+        FROM (VALUES %s) AS v (ord, title, description, priority, status, created_at, fingerprint, occurrences)
+    ), upserted AS (
+        INSERT INTO tickets (id, title, description, priority, status, created_at, fingerprint, occurrences)
+        SELECT new_id, title, description, priority, status, created_at, fingerprint, occurrences FROM batch
+        ON CONFLICT (fingerprint) WHERE status <> 'Resolved'
+        DO UPDATE SET occurrences = tickets.occurrences + EXCLUDED.occurrences, last_seen_at = EXCLUDED.created_at
+        RETURNING id, xmax = 0 AS inserted, fingerprint
+    )
+    SELECT batch.ord, upserted.id, upserted.inserted
+    FROM upserted JOIN batch
+        ON upserted.id = batch.new_id OR (NOT upserted.inserted AND upserted.fingerprint = batch.fingerprint)
+'''
+INSERT_TICKETS_BATCH_TEMPLATE = '(%s, %s, %s, %s, %s, %s::timestamp, %s, %s)'
+
+
+class TicketIngestPending(Exception):
+    """Raised when a queued ticket's batch is still being written after INGEST_WAIT_SECONDS,
+    or committed without returning a result for it."""
+
+
+class TicketBatchWriter:
+    """Bounded queue of ticket rows drained by a background thread in size- or time-bounded batches."""
+
+    def __init__(self, max_queue, batch_size, flush_seconds):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._reset()
+
+    def _reset(self):
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._counts = Counter()
+
+    def submit(self, row, timeout=INGEST_ENQUEUE_TIMEOUT):
+        """Queue a row; returns a Future for (ticket_id, inserted), or None if the queue stayed full."""
+        future = Future()
+        try:
+            self._queue.put((row, future), timeout=timeout)
+        except queue.Full:
+            self._count('rejected')
+            return None
+        ticket_ingest_queue_depth.set(self._queue.qsize())
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='ticket-writer', daemon=True)
+                self._thread.start()
+        return future
+
+    def write(self, row):
+        """Insert through the queue; returns (ticket_id, inserted), or None when the caller should insert itself."""
+        future = self.submit(row)
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=INGEST_WAIT_SECONDS)
+        except psycopg2.Error:
+            # The batch was rolled back, so inserting this row again cannot duplicate it
+            return None
+        except FutureTimeoutError:
+            self._count('timed_out')
+            if future.cancel():
+                # Still queued: the writer will skip it, so the caller can insert it instead
+                return None
+            # Its batch is in flight and may yet commit; inserting again could duplicate it
+            raise TicketIngestPending()
+
+    def _take_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        ticket_ingest_queue_depth.set(self._queue.qsize())
+        # Drop rows whose caller gave up waiting; the rest can no longer be cancelled
+        return [(row, future) for row, future in batch if future.set_running_or_notify_cancel()]
+
+    @staticmethod
+    def _fold_duplicates(batch):
+        """
+        One VALUES row per fingerprint, carrying how many queued tickets it stands for: an
+        upsert may not touch the same row twice in one statement. Returns (rows, waiters).
+        """
+        groups = OrderedDict()
+        for row, future in batch:
+            key = row[5] if row[5] is not None else future  # no fingerprint: never folded
+            groups.setdefault(key, []).append((row, future))
+        rows = [members[0][0][:6] + (len(members),) for members in groups.values()]
+        return rows, [[future for _, future in members] for members in groups.values()]
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                continue
+            rows, waiters = self._fold_duplicates(batch)
+            try:
+                with db_connection() as conn:
+                    results = psycopg2.extras.execute_values(
+                        conn.cursor(), INSERT_TICKETS_BATCH_SQL, [(i,) + row for i, row in enumerate(rows)],
+                        template=INSERT_TICKETS_BATCH_TEMPLATE, page_size=len(rows), fetch=True)
+                    conn.commit()
+            except Exception as e:
+                # --- LOG: Batch Insert Failed ---
+                logger.warning("Ticket batch insert failed, callers will insert directly", extra={
+                    "event": "ingest_batch_failed",
+                    "batch_size": len(batch),
+                    "error": str(e)
+                })
+                self._count('failed_batches')
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self._count('batches')
+            self._count('tickets', len(batch))
+            answered = set()
+            for ordinal, ticket_id, inserted in results:
+                answered.add(ordinal)
+                futures = waiters[ordinal]
+                futures[0].set_result((ticket_id, inserted))
+                for future in futures[1:]:
+                    future.set_result((ticket_id, False))
+            missing = [i for i in range(len(rows)) if i not in answered]
+            if missing:
+                # The batch committed, so these rows may exist; a direct retry could duplicate them
+                # --- LOG: Batch Result Missing ---
+                logger.error("Ticket batch committed without a result for some rows", extra={
+                    "event": "ingest_result_missing", "batch_size": len(batch), "missing": len(missing)})
+                self._count('unanswered', sum(len(waiters[i]) for i in missing))
+                for i in missing:
+                    for future in waiters[i]:
+                        future.set_exception(TicketIngestPending("Batch insert returned no result for this ticket"))
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._counts[key] += n
+        ticket_ingest.labels(key).inc(n)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        return {'queued': self._queue.qsize(), 'batches': counts.get('batches', 0),
+                'tickets': counts.get('tickets', 0), 'failed_batches': counts.get('failed_batches', 0),
+                'rejected': counts.get('rejected', 0), 'timed_out': counts.get('timed_out', 0),
+                'unanswered': counts.get('unanswered', 0)}
+
+
+ticket_writer = TicketBatchWriter(INGEST_QUEUE_SIZE, INGEST_BATCH_SIZE, INGEST_FLUSH_MS / 1000)
+# The writer thread does not survive a fork; rows queued in the parent stay with the parent
+os.register_at_fork(after_in_child=ticket_writer._reset)
+
+
+class NewTicket(NamedTuple):
+    id: int
+    priority: str
+    duplicate: bool  # True when an unresolved ticket with the same fingerprint absorbed it
+
+
+def _repeat_counted(ticket_id, priority):
+    # The ticket rows show occurrence counts, so a counted repeat changes the cached table too
+    note_primary_write()
+    ticket_table_cache.bump()
+    return NewTicket(ticket_id, priority, True)
 
 
 # Add a new ticket
 @log_execution
 def add_ticket(title, description, priority):
-    if priority not in ['High', 'Medium', 'Low']:
-        priority = 'Low'
+    """
+    Create an Open ticket, or count a repeat against the matching unresolved one.
+
+    Raises TicketIngestPending when INGEST_BATCHING is on and the write is still in flight.
+    """
+    priority = normalize_priority(priority)
     status = 'Open'
     created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO tickets (title, description, priority, status, created_at)
-        VALUES (%s, %s, %s, %s, %s)
-    ''', (title, description, priority, status, created_at))
-    conn.commit()
-    conn.close()
-    return priority
+    fingerprint = ticket_fingerprint(title, description) if DEDUP_ENABLED else None
+
+    if fingerprint:
+        cached_id = fingerprint_index.get(fingerprint)
+        if cached_id is not None:
+            if _record_occurrence(cached_id, fingerprint, created_at):
+                return _repeat_counted(cached_id, priority)
+            fingerprint_index.discard(fingerprint)
+
+    row = (title, description, priority, status, created_at, fingerprint, 1)
+    result = ticket_writer.write(row) if INGEST_BATCHING else None
+    if result is None:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            queries.run(cursor, INSERT_TICKET_SQL, row)
+            result = cursor.fetchone()
+            conn.commit()
+    ticket_id, inserted = result[0], result[1]
+    if fingerprint:
+        fingerprint_index.put(fingerprint, ticket_id)
+    if not inserted:
+        return _repeat_counted(ticket_id, priority)
+
+    note_primary_write()
+    ticket_table_cache.bump()
+    ticket_stats_cache.apply_delta('priority_counts', new=priority)
+    ticket_stats_cache.apply_delta('status_counts', new=status)
+    return NewTicket(ticket_id, priority, False)
+# --- WRITE-BEHIND INGEST END ---
 
 
 # Update ticket status
+# The CTE locks the row and hands back its previous status for the stats delta
+UPDATE_TICKET_STATUS_SQL = queries.register('update_ticket_status', '''
+    WITH old AS (SELECT status FROM tickets WHERE id = %s FOR UPDATE)
+    UPDATE tickets SET status = %s WHERE id = %s
+    RETURNING (SELECT status FROM old)
+''')
+
+
 @log_execution
 def update_ticket_status(ticket_id, new_status):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('UPDATE tickets SET status = %s WHERE id = %s', (new_status, ticket_id))
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        queries.run(cursor, UPDATE_TICKET_STATUS_SQL, (ticket_id, new_status, ticket_id))
+        row = cursor.fetchone()
+        conn.commit()
+        note_primary_write()
+        ticket_table_cache.bump()
+    if row:
+        ticket_stats_cache.apply_delta('status_counts', old=row[0], new=new_status)
+
+
+# Update the status of many tickets in one statement and one transaction
+@log_execution
+def bulk_update_ticket_status(new_status, conditions, params):
+    """Set new_status on every ticket matching `conditions`; returns the ids that actually changed."""
+    where = sql.SQL(' AND ').join(sql.SQL(c) for c in conditions)
+    query = sql.SQL('''
+        WITH old AS (SELECT id, status FROM tickets WHERE {} FOR UPDATE)
+        UPDATE tickets SET status = %s
+        FROM old
+        WHERE tickets.id = old.id AND old.status IS DISTINCT FROM %s
+        RETURNING tickets.id, old.status
+    ''').format(where)
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, [*params, new_status, new_status])
+        rows = cursor.fetchall()
+        conn.commit()
+        note_primary_write()
+        ticket_table_cache.bump()
+
+    for old_status, count in Counter(old for _, old in rows).items():
+        ticket_stats_cache.apply_delta('status_counts', old=old_status, new=new_status, count=count)
+    return [ticket_id for ticket_id, _ in rows]
 
 
 # Update ticket details
+# An edit changes what the ticket is about, so its fingerprint follows the new text. It stays
+# NULL once resolved (as the release trigger leaves it), and also when another unresolved
+# ticket already holds the new fingerprint: the edit must not break that unique index.
+UPDATE_TICKET_SQL = queries.register('update_ticket', '''
+    WITH old AS (SELECT priority, fingerprint FROM tickets WHERE id = %(id)s FOR UPDATE)
+    UPDATE tickets SET title = %(title)s, description = %(description)s, priority = %(priority)s,
+        fingerprint = CASE
+            WHEN status = 'Resolved' OR EXISTS (
+                SELECT 1 FROM tickets other
+                WHERE other.fingerprint = %(fingerprint)s AND other.status <> 'Resolved' AND other.id <> %(id)s
+            ) THEN NULL
+            ELSE %(fingerprint)s
+        END
+    WHERE id = %(id)s
+    RETURNING (SELECT priority FROM old), (SELECT fingerprint FROM old), fingerprint
+''')
+
+
 @log_execution
 def update_ticket(ticket_id, title, description, priority):
-    if priority not in ['High', 'Medium', 'Low']:
-        priority = 'Low'
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('UPDATE tickets SET title = %s, description = %s, priority = %s WHERE id = %s',
-                   (title, description, priority, ticket_id))
-    conn.commit()
-    conn.close()
+    priority = normalize_priority(priority)
+    fingerprint = ticket_fingerprint(title, description) if DEDUP_ENABLED else None
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        queries.run(cursor, UPDATE_TICKET_SQL, {'id': ticket_id, 'title': title, 'description': description,
+                                                'priority': priority, 'fingerprint': fingerprint})
+        row = cursor.fetchone()
+        conn.commit()
+        note_primary_write()
+        ticket_table_cache.bump()
+    if row:
+        old_priority, old_fingerprint, new_fingerprint = row
+        if old_fingerprint:
+            fingerprint_index.discard(old_fingerprint)
+        if new_fingerprint:
+            fingerprint_index.put(new_fingerprint, ticket_id)
+        ticket_stats_cache.apply_delta('priority_counts', old=old_priority, new=priority)
     return priority
 
 
-# Get all tickets
+class Ticket(NamedTuple):
+    """
+    One tickets row as returned by the listing, search and lookup functions.
+
+    Built straight from the plain tuple cursor, so a result set costs one small tuple per
+    row (no per-row dict). Templates read it by attribute; it still unpacks like a tuple.
+    """
+    id: int
+    title: str
+    description: Optional[str]
+    priority: str
+    status: str
+    created_at: datetime
+    occurrences: int  # times this issue was raised; repeats are folded in by deduplication
+
+
+# Get one page of tickets using keyset pagination (WHERE id > after_id), so the cost
+# of a page does not grow with how deep into the table the reader has scrolled.
+# Ticket reads list their columns explicitly, in Ticket's field order, so the
+# search_vector never leaves the database. Every read covers the hot tickets table
+# unless include_archived=True, which reads the all_tickets view instead.
+TICKETS_PAGE_SIZE = int(os.environ.get('TICKETS_PAGE_SIZE', 50))
+TICKETS_PAGE_SIZE_MAX = 500
+
+
+def clamp_page_size(limit):
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return TICKETS_PAGE_SIZE
+    return max(1, min(limit, TICKETS_PAGE_SIZE_MAX))
+
+
+# The listing, search and stats statements are shared with the async data layer below.
+# Listings fetch one extra row to learn whether another page exists without a COUNT(*).
+TICKETS_PAGE_SQL = queries.register('tickets_page', '''
+    SELECT id, title, description, priority, status, created_at, occurrences
+    FROM tickets WHERE id > %s ORDER BY id ASC LIMIT %s
+''')
+ALL_TICKETS_PAGE_SQL = queries.register('all_tickets_page', '''
+    SELECT id, title, description, priority, status, created_at, occurrences
+    FROM all_tickets WHERE id > %s ORDER BY id ASC LIMIT %s
+''')
+
+
 @log_execution
-def get_all_tickets():
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute('SELECT * FROM tickets ORDER BY id ASC')
-    tickets_dict = cursor.fetchall()
-    conn.close()
+def get_tickets_page(after_id=0, limit=TICKETS_PAGE_SIZE, include_archived=False):
+    """Return (tickets, next_after_id); next_after_id is None on the last page."""
+    limit = clamp_page_size(limit)
+    rows = read_rows(ALL_TICKETS_PAGE_SQL if include_archived else TICKETS_PAGE_SQL, (after_id, limit + 1))
 
-    tickets_list = []
-    for t in tickets_dict:
-        tickets_list.append((t['id'], t['title'], t['description'], t['priority'], t['status'], t['created_at']))
+    tickets = list(map(Ticket._make, rows[:limit]))
+    next_after_id = tickets[-1].id if len(rows) > limit else None
+    return tickets, next_after_id
 
-    return tickets_list
+
+# Ticket counts per priority and per status, aggregated by PostgreSQL in one pass
+TICKET_STATS_SQL = queries.register('ticket_stats', '''
+    SELECT priority, status, GROUPING(priority) AS by_status, COUNT(*)
+    FROM tickets
+    GROUP BY GROUPING SETS ((priority), (status))
+''')
+
+
+@log_execution
+def get_ticket_stats():
+    return ticket_stats_from_rows(read_rows(TICKET_STATS_SQL))
+
+
+def ticket_stats_from_rows(rows):
+    priority_counts = {}
+    status_counts = {}
+    for priority, status, by_status, count in rows:
+        if by_status:
+            status_counts[status] = count
+        else:
+            priority_counts[priority] = count
+    return {'priority_counts': priority_counts, 'status_counts': status_counts}
+
+
+class TicketStatsCache:
+    """
+    In-process copy of get_ticket_stats() kept current by the write paths.
+
+    add_ticket/update_ticket/update_ticket_status call apply_delta() after they commit,
+    so readers normally never hit the database. Every `ttl` seconds the counts are
+    reloaded from PostgreSQL to reconcile writes made by other workers or replicas; a
+    delta arriving after that drops the expired counts instead of adjusting them.
+    `on_change(stats)` is called with the new counts after every reload and delta, and
+    start_refresher() keeps them reloading with no readers at all.
+    """
+
+    def __init__(self, loader, ttl=30.0, on_change=None):
+        self._loader = loader
+        self.ttl = ttl
+        self._on_change = on_change
+        self._lock = threading.Lock()
+        self._stats = None
+        self._etag = None
+        self._loaded_at = 0.0
+        self._generation = 0  # bumped by every delta, used to detect writes racing a reload
+        self._refresher = None
+
+    def _snapshot(self):
+        if self._etag is None:
+            payload = json.dumps(self._stats, sort_keys=True).encode()
+            self._etag = hashlib.sha256(payload).hexdigest()[:32]
+        return {field: dict(counts) for field, counts in self._stats.items()}, self._etag
+
+    def _cached(self):
+        """Return (snapshot, None) while fresh, else (None, generation) for _store()."""
+        with self._lock:
+            if self._stats is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._snapshot(), None
+            return None, self._generation
+
+    def get(self):
+        """Return (stats, etag), reloading from the database when empty or older than ttl."""
+        cached, generation = self._cached()
+        if cached is not None:
+            return cached
+        return self._store(self._loader(), generation)
+
+    async def get_async(self, loader):
+        """get() for async views: same cache, but a reload awaits `loader()` instead."""
+        cached, generation = self._cached()
+        if cached is not None:
+            return cached
+        return self._store(await loader(), generation)
+
+    def refresh(self):
+        """Reload from the database now, fresh or not."""
+        with self._lock:
+            generation = self._generation
+        return self._store(self._loader(), generation)
+
+    def start_refresher(self):
+        """Reload every ttl seconds on a daemon thread (first load immediately); call once per process."""
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(target=self._refresh_forever, name='ticket-stats-refresh', daemon=True)
+            self._refresher.start()
+
+    def _refresh_forever(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                # --- LOG: Stats Refresh Failed ---
+                logger.warning("Ticket stats refresh failed", extra={
+                    "event": "stats_refresh_failed",
+                    "error": str(e)
+                })
+            time.sleep(self.ttl)
+
+    def _store(self, stats, generation):
+        with self._lock:
+            if generation == self._generation:
+                self._stats = stats
+                self._etag = None
+                self._loaded_at = time.monotonic()
+                self._changed()
+                return self._snapshot()
+        # A write landed while we were loading; serve the fresh read but let the next call reload
+        return stats, None
+
+    def apply_delta(self, field, old=None, new=None, count=1):
+        """Move `count` tickets from `old` to `new` in priority_counts or status_counts."""
+        if old == new:
+            return
+        with self._lock:
+            self._generation += 1
+            if self._stats is None:
+                return
+            if time.monotonic() - self._loaded_at >= self.ttl:
+                # Publishing adjusted stale counts would overwrite fresher ones from other workers
+                self._stats = None
+                self._etag = None
+                return
+            counts = self._stats[field]
+            if old is not None:
+                counts[old] = counts.get(old, 0) - count
+                if counts[old] <= 0:
+                    del counts[old]
+            if new is not None:
+                counts[new] = counts.get(new, 0) + count
+            self._etag = None
+            self._changed()
+
+    def _changed(self):
+        if self._on_change is not None:
+            self._on_change(self._stats)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._stats = None
+            self._etag = None
+
+
+def publish_ticket_gauges(stats):
+    """Copy ticket counts into the tickets_by_* gauges; absent values are published as 0."""
+    for status in {*VALID_STATUSES, *stats['status_counts']}:
+        tickets_by_status.labels(status).set(stats['status_counts'].get(status, 0))
+    for priority in {*VALID_PRIORITIES, *stats['priority_counts']}:
+        tickets_by_priority.labels(priority).set(stats['priority_counts'].get(priority, 0))
+
+
+# Every reload or delta also refreshes the Prometheus gauges, so /metrics never has to load
+# the counts itself; across workers the most recently published counts win. Each worker
+# also reloads on a timer (init_worker), so the gauges are set without dashboard traffic.
+ticket_stats_cache = TicketStatsCache(get_ticket_stats, ttl=float(os.environ.get('STATS_CACHE_TTL', 30)),
+                                      on_change=publish_ticket_gauges)
 
 
 # Search tickets
+# Matches the full-text index (stemmed words in title or description), the trigram
+# index (substrings of the title) and trigram similarity (typos), ranked by relevance.
+SEARCH_TICKETS_SQL = queries.register('search_tickets', '''
+    SELECT id, title, description, priority, status, created_at, occurrences
+    FROM tickets, websearch_to_tsquery('english', %(q)s) AS tsq
+    WHERE search_vector @@ tsq OR title ILIKE %(pattern)s OR title %% %(q)s
+    ORDER BY ts_rank_cd(search_vector, tsq) + similarity(title, %(q)s) DESC, id DESC
+    LIMIT %(limit)s OFFSET %(offset)s
+''')
+SEARCH_ALL_TICKETS_SQL = queries.register('search_all_tickets', '''
+    SELECT id, title, description, priority, status, created_at, occurrences
+    FROM all_tickets, websearch_to_tsquery('english', %(q)s) AS tsq
+    WHERE search_vector @@ tsq OR title ILIKE %(pattern)s OR title %% %(q)s
+    ORDER BY ts_rank_cd(search_vector, tsq) + similarity(title, %(q)s) DESC, id DESC
+    LIMIT %(limit)s OFFSET %(offset)s
+''')
+
+
+def search_params(query, page, limit):
+    pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    return {'q': query, 'pattern': pattern, 'limit': limit + 1, 'offset': (page - 1) * limit}
+
+
 @log_execution
-def search_tickets_by_title(query):
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute('SELECT * FROM tickets WHERE title ILIKE %s', ('%' + query + '%',))
-    tickets_dict = cursor.fetchall()
-    conn.close()
+def search_tickets(query, page=1, limit=TICKETS_PAGE_SIZE, include_archived=False):
+    """Return (tickets, next_page) for a ranked search; next_page is None on the last page."""
+    limit = clamp_page_size(limit)
+    page = max(1, int(page))
+    rows = read_rows(SEARCH_ALL_TICKETS_SQL if include_archived else SEARCH_TICKETS_SQL,
+                     search_params(query, page, limit))
 
-    tickets_list = []
-    for t in tickets_dict:
-        tickets_list.append((t['id'], t['title'], t['description'], t['priority'], t['status'], t['created_at']))
-    return tickets_list
+    next_page = page + 1 if len(rows) > limit else None
+    return list(map(Ticket._make, rows[:limit])), next_page
 
 
 # Get single ticket
+TICKET_BY_ID_SQL = queries.register(
+    'ticket_by_id',
+    'SELECT id, title, description, priority, status, created_at, occurrences FROM tickets WHERE id = %s')
+ALL_TICKETS_BY_ID_SQL = queries.register(
+    'all_tickets_by_id',
+    'SELECT id, title, description, priority, status, created_at, occurrences FROM all_tickets WHERE id = %s')
+
+
 @log_execution
-def get_ticket_by_id(ticket_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute('SELECT * FROM tickets WHERE id = %s', (ticket_id,))
-    t = cursor.fetchone()
-    conn.close()
+def get_ticket_by_id(ticket_id, include_archived=False):
+    row = read_rows(ALL_TICKETS_BY_ID_SQL if include_archived else TICKET_BY_ID_SQL, (ticket_id,), one=True)
+    return Ticket._make(row) if row else None
+
+
+# --- LOGIN THROTTLING START ---
+# Password hashes are deliberately expensive, so login is the cheapest way to burn this
+# service's CPU. Attempts are rate limited per client IP and failures per username before
+# any hashing happens, and verification runs on a small bounded pool so a burst cannot
+# occupy every request thread.
+
+# werkzeug method string; stored hashes with other parameters are upgraded on the next login
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+LOGIN_HASH_WORKERS = int(os.environ.get('LOGIN_HASH_WORKERS', 2))
+LOGIN_HASH_MAX_PENDING = int(os.environ.get('LOGIN_HASH_MAX_PENDING', 8))
+LOGIN_HASH_TIMEOUT = float(os.environ.get('LOGIN_HASH_TIMEOUT', 10))
+
+
+class TokenBucketLimiter:
+    """
+    One token bucket per key: up to `capacity` tokens, refilled at `rate` per second.
+
+    Only the `max_keys` most recently used keys are tracked; an evicted key simply starts
+    again with a full bucket, which bounds memory during a spray from many addresses.
+    """
+
+    def __init__(self, capacity, rate, max_keys=10000):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def _tokens(self, key, now):
+        tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated_at) * self.rate)
+
+    def peek(self, key):
+        """Seconds until `key` has a token (0.0 if it has one now), without spending it."""
+        with self._lock:
+            tokens = self._tokens(key, time.monotonic())
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def consume(self, key):
+        """Spend a token; returns 0.0 on success, else the seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            tokens = self._tokens(key, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return 0.0 if allowed else (1 - tokens) / self.rate
+
+    def clear(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class HashingBusyError(Exception):
+    """Raised when LOGIN_HASH_MAX_PENDING hashes are already queued or running, or one outlasts LOGIN_HASH_TIMEOUT."""
+
+
+class PasswordHasher:
+    """Runs password hashing on LOGIN_HASH_WORKERS threads, never queueing more than max_pending jobs."""
+
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._reset()
+
+    def _reset(self):
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusyError()
+        try:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hash')
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        # hashlib's scrypt/pbkdf2 release the GIL, so the request thread just waits here
+        try:
+            return future.result(timeout=LOGIN_HASH_TIMEOUT)
+        except FutureTimeoutError:
+            # The pool is saturated; the hash finishes in the background and frees its slot then
+            raise HashingBusyError() from None
+
+    def verify(self, stored_hash, password):
+        return self._run(check_password_hash, stored_hash, password)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
 
-    if t:
-        return (t['id'], t['title'], t['description'], t['priority'], t['status'], t['created_at'])
-    return None
+# Per-IP: every attempt costs a token (burst 10, then one per 6s). Per-username: only
+# failures do (burst 5, then one per minute), and a successful login clears them.
+login_ip_limiter = TokenBucketLimiter(
+    capacity=int(os.environ.get('LOGIN_IP_BURST', 10)), rate=float(os.environ.get('LOGIN_IP_PER_MINUTE', 10)) / 60)
+login_user_limiter = TokenBucketLimiter(
+    capacity=int(os.environ.get('LOGIN_USER_BURST', 5)), rate=float(os.environ.get('LOGIN_USER_PER_MINUTE', 1)) / 60)
+password_hasher = PasswordHasher(LOGIN_HASH_WORKERS, LOGIN_HASH_MAX_PENDING)
+os.register_at_fork(after_in_child=password_hasher._reset)
+
+
+@functools.lru_cache(maxsize=1)
+def _dummy_password_hash():
+    # Verified when the username does not exist, so the response time does not reveal it
+    return generate_password_hash(os.urandom(16).hex(), method=PASSWORD_HASH_METHOD)
+
+
+def _needs_rehash(stored_hash):
+    # Compare against a hash werkzeug actually produced: it spells out defaulted parameters,
+    # so e.g. 'pbkdf2:sha256' is stored as 'pbkdf2:sha256:<iterations>'
+    return stored_hash.split('$', 1)[0] != _dummy_password_hash().split('$', 1)[0]
+
+
+def _rehash_password(username, stored_hash, password):
+    """Store `password` under PASSWORD_HASH_METHOD; a failure here must not fail the login."""
+    try:
+        new_hash = password_hasher.hash(password)
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            # Compare-and-set: never overwrite a password changed since we read it
+            cursor.execute('UPDATE users SET password = %s WHERE username = %s AND password = %s',
+                           (new_hash, username, stored_hash))
+            conn.commit()
+        logger.info("Password hash upgraded", extra={
+            "event": "password_rehashed",
+            "user": username,
+            "method": PASSWORD_HASH_METHOD.split(':', 1)[0]
+        })
+    except Exception as e:
+        logger.warning("Password rehash failed", extra={
+            "event": "password_rehash_failed",
+            "user": username,
+            "error": str(e)
+        })
+# --- LOGIN THROTTLING END ---
+
+
+USER_CREDENTIALS_SQL = queries.register('user_credentials', 'SELECT password, role FROM users WHERE username = %s')
+LIST_USERS_SQL = queries.register('list_users', 'SELECT username, role FROM users')
 
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -240,14 +2054,39 @@ def login():
     if request.method == 'POST':
         uname = request.form['username']
         pwd = request.form['password']
+        client_ip = request.remote_addr
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT password, role FROM users WHERE username = %s', (uname,))
-        user = cursor.fetchone()
-        conn.close()
+        retry_after = max(login_ip_limiter.consume(client_ip), login_user_limiter.peek(uname))
+        if retry_after:
+            # --- LOG: Login Throttled ---
+            logger.warning("Login Throttled", extra={
+                "event": "login_throttled",
+                "user": uname,
+                "client_ip": client_ip
+            })
+            flash(f'Too many login attempts. Try again in {math.ceil(retry_after)} seconds.', 'danger')
+            return render_template('login.html'), 429, {'Retry-After': str(math.ceil(retry_after))}
+
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            queries.run(cursor, USER_CREDENTIALS_SQL, (uname,))
+            user = cursor.fetchone()
+
+        try:
+            valid = password_hasher.verify(user[0] if user else _dummy_password_hash(), pwd) and user is not None
+        except HashingBusyError:
+            logger.warning("Login Rejected (hashing pool busy)", extra={
+                "event": "login_busy",
+                "user": uname,
+                "client_ip": client_ip
+            })
+            flash('The server is busy. Please try again in a moment.', 'warning')
+            return render_template('login.html'), 503, {'Retry-After': '1'}
 
-        if user and check_password_hash(user[0], pwd):
+        if valid:
+            login_user_limiter.clear(uname)
+            if _needs_rehash(user[0]):
+                _rehash_password(uname, user[0], pwd)
             session['username'] = uname
             session['role'] = user[1]
 
@@ -261,10 +2100,12 @@ def login():
             flash('Logged in successfully!', 'success')
             return redirect(url_for('index'))
         else:
+            login_user_limiter.consume(uname)
             # --- LOG: Auth Failure ---
             logger.warning("User Authentication Failed", extra={
                 "event": "auth_failed",
-                "user": uname
+                "user": uname,
+                "client_ip": client_ip
             })
             flash('Invalid credentials.', 'danger')
     return render_template('login.html')
@@ -287,7 +2128,7 @@ def logout():
 
 @app.before_request
 def require_login():
-    allowed_routes = ['login', 'static', 'health_check']
+    allowed_routes = ['login', 'static', 'health_check', 'metrics']
     if 'username' not in session and request.endpoint not in allowed_routes:
         return redirect(url_for('login'))
 
@@ -305,23 +2146,11 @@ def index():
             "user": session.get('username')
         })
 
-    if query:
-        tickets = search_tickets_by_title(query)
-    else:
-        tickets = get_all_tickets()
-
-    priorities = [ticket[3] for ticket in tickets]
-    statuses = [ticket[4] for ticket in tickets]
-
-    priority_counts = dict(Counter(priorities))
-    status_counts = dict(Counter(statuses))
-
+    # Charts are drawn from /get_chart_data, so the dashboard no longer counts rows here
     return render_template(
         'index.html',
-        tickets=tickets,
+        **ticket_table(query),
         search_query=query,
-        priority_counts=priority_counts,
-        status_counts=status_counts,
         active_tab='home',
         role=session.get('role')
     )
@@ -334,39 +2163,177 @@ def home():
 
 @app.route("/get_chart_data")
 def get_chart_data():
-    tickets = get_all_tickets()
-    priorities = [ticket[3] for ticket in tickets]
-    statuses = [ticket[4] for ticket in tickets]
-    response = jsonify({
-        'priority_counts': dict(Counter(priorities)),
-        'status_counts': dict(Counter(statuses))
-    })
-    response.headers.add('Cache-Control', 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0')
+    stats, etag = ticket_stats_cache.get()
+    response = jsonify(stats)
+    # Browsers must revalidate every time, but an unchanged ETag costs only a 304
+    response.headers['Cache-Control'] = 'private, no-cache'
+    if etag:
+        response.set_etag(etag)
+        response.make_conditional(request)
     return response
 
 @app.route('/search', methods=['GET', 'POST'])
 @log_execution
 def search():
     query = request.form.get('search_query', '') if request.method == 'POST' else ''
+    table = ticket_table(query)
     if query:
-        tickets = search_tickets_by_title(query)
-
         # --- LOG: Search Query ---
         logger.info("User performed search", extra={
             "event": "user_search",
             "query": query,
-            "results_count": len(tickets),
+            "results_count": table['ticket_count'],
             "user": session.get('username')
         })
-    else:
-        tickets = get_all_tickets()
-    return render_template('index.html', tickets=tickets, search_query=query, active_tab='search')
+    return render_template('index.html', **table, search_query=query, active_tab='search')
 
 
 @app.route('/incident')
 def incident():
-    tickets = get_all_tickets()
-    return render_template('index.html', tickets=tickets, active_tab='incident')
+    return render_template('index.html', **ticket_table(), active_tab='incident')
+
+
+def listing_next_url(after_id=None, query=None, page=None):
+    """URL the dashboard's Load more button fetches, or None when there is nothing left."""
+    if query:
+        return url_for('list_tickets_api', q=query, page=page) if page else None
+    return url_for('list_tickets_api', after_id=after_id) if after_id else None
+
+
+# --- TICKET TABLE CACHE START ---
+class FragmentCache:
+    """
+    Bounded LRU of rendered HTML fragments, valid for one data version.
+
+    bump() is called by every ticket write in this process (and for every NOTIFY the
+    live-event listener receives), which orphans all cached fragments at once. Writes made
+    by other workers are only seen through `ttl`, so entries also expire after that long.
+    """
+
+    def __init__(self, max_entries=256, ttl=5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (version, stored_at, value)
+        self._lock = threading.Lock()
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            ticket_table_cache_entries.set(0)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self.version or time.monotonic() - entry[1] >= self.ttl:
+                self.misses += 1
+                ticket_table_cache_requests.labels('miss').inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            ticket_table_cache_requests.labels('hit').inc()
+            return entry[2]
+
+    def put(self, key, value, version):
+        """Store `value` computed from data read at `version`; dropped if a write has landed since."""
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = (version, time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            ticket_table_cache_entries.set(len(self._entries))
+
+    def stats(self):
+        with self._lock:
+            return {'version': self.version, 'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+ticket_table_cache = FragmentCache(
+    max_entries=int(os.environ.get('TICKET_TABLE_CACHE_SIZE', 256)),
+    ttl=float(os.environ.get('TICKET_TABLE_CACHE_TTL', 5)),
+)
+
+
+def cached_ticket_table(query=''):
+    """
+    Return (table, key, version): the cached first page of the listing or of a search, or
+    None plus what store_ticket_table() needs. A session that has just written skips the
+    cache, since another worker's copy may predate its write.
+    """
+    key = (query, session.get('role') == 'admin')
+    version = ticket_table_cache.version
+    table = None if wrote_recently() else ticket_table_cache.get(key)
+    return table, key, version
+
+
+def store_ticket_table(key, version, tickets, next_page_url):
+    """Render the rows once and cache them with the count and Load more URL the page needs."""
+    # render_template output is already autoescaped; Markup only stops index.html escaping it twice
+    rows = Markup(render_template('_ticket_rows.html', tickets=tickets, is_admin=key[1]))  # nosec B704
+    table = {
+        'ticket_rows': rows,
+        'ticket_count': len(tickets),
+        'next_page_url': next_page_url,
+    }
+    ticket_table_cache.put(key, table, version)
+    return table
+
+
+def ticket_table(query=''):
+    """Template variables for the ticket table: rows HTML, row count and next_page_url."""
+    table, key, version = cached_ticket_table(query)
+    if table is not None:
+        return table
+    if query:
+        tickets, next_page = search_tickets(query)
+        next_page_url = listing_next_url(query=query, page=next_page)
+    else:
+        tickets, next_after_id = get_tickets_page()
+        next_page_url = listing_next_url(next_after_id)
+    return store_ticket_table(key, version, tickets, next_page_url)
+# --- TICKET TABLE CACHE END ---
+
+
+@app.route('/api/tickets')
+def list_tickets_api():
+    # ?after_id=N pages the full list by id; ?q=...&page=N pages ranked search results
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', TICKETS_PAGE_SIZE)
+    try:
+        after_id = int(request.args.get('after_id', 0))
+        page = int(request.args.get('page', 1))
+    except ValueError:
+        return jsonify({'error': 'after_id and page must be integers'}), 400
+
+    # Resolved tickets moved to the archive are left out unless ?include_archived=1
+    archived = request.args.get('include_archived') == '1'
+    extra = {'include_archived': 1} if archived else {}
+
+    next_after_id = next_page = None
+    if query:
+        tickets, next_page = search_tickets(query, page, limit, include_archived=archived)
+        next_url = url_for('list_tickets_api', q=query, page=next_page, limit=limit, **extra) if next_page else None
+    else:
+        tickets, next_after_id = get_tickets_page(after_id, limit, include_archived=archived)
+        next_url = url_for('list_tickets_api', after_id=next_after_id, limit=limit, **extra) if next_after_id else None
+
+    return jsonify({
+        'tickets': [
+            {'id': t.id, 'title': t.title, 'description': t.description, 'priority': t.priority,
+             'status': t.status, 'created_at': str(t.created_at) if t.created_at is not None else None,
+             'occurrences': t.occurrences}
+            for t in tickets
+        ],
+        'next_after_id': next_after_id,
+        'next_page': next_page,
+        'next_url': next_url
+    })
 
 
 @app.route('/add_ticket', methods=['POST'])
@@ -387,17 +2354,38 @@ def add_ticket_route():
     priority = request.form.get('priority')
 
     if title and description and priority:
-        priority = add_ticket(title, description, priority)
-
-        # --- LOG: Ticket Created ---
-        logger.info("Ticket Created Successfully", extra={
-            "event": "ticket_created",
-            "title": title,
-            "priority": priority,
-            "created_by": session.get('username')
-        })
+        try:
+            ticket = add_ticket(title, description, priority)
+        except TicketIngestPending:
+            # --- LOG: Ticket Pending ---
+            logger.warning("Ticket Accepted but Not Yet Committed", extra={
+                "event": "ticket_pending",
+                "title": title,
+                "created_by": session.get('username')
+            })
+            flash('Ticket accepted and still being saved; it will appear shortly.', 'warning')
+            return index(), 202
+
+        if ticket.duplicate:
+            # --- LOG: Duplicate Coalesced ---
+            logger.info("Duplicate Ticket Coalesced", extra={
+                "event": "ticket_deduplicated",
+                "ticket_id": ticket.id,
+                "title": title,
+                "created_by": session.get('username')
+            })
+            flash(f'Ticket #{ticket.id} is already open for this issue; its occurrence count was updated.', 'info')
+        else:
+            # --- LOG: Ticket Created ---
+            logger.info("Ticket Created Successfully", extra={
+                "event": "ticket_created",
+                "ticket_id": ticket.id,
+                "title": title,
+                "priority": ticket.priority,
+                "created_by": session.get('username')
+            })
 
-        flash(f'Ticket submitted with {priority} priority!', 'success')
+            flash(f'Ticket #{ticket.id} submitted with {ticket.priority} priority!', 'success')
     else:
         logger.warning("Ticket Creation Failed (Missing Fields)", extra={
             "event": "ticket_creation_failed",
@@ -420,7 +2408,7 @@ def update_status_route(ticket_id, status):
         flash('Unauthorized: Only admin can update status.', 'danger')
         return redirect(url_for('index'))
 
-    if status in ['Open', 'In Progress', 'Resolved']:
+    if status in VALID_STATUSES:
         update_ticket_status(ticket_id, status)
 
         # --- LOG: Status Update ---
@@ -443,6 +2431,75 @@ def update_status_route(ticket_id, status):
     return redirect(url_for('index'))
 
 
+BULK_UPDATE_MAX_IDS = 10000
+
+
+# A JSON API, so API clients are not asked for a CSRF token. Only application/json bodies are
+# accepted: a cross-site form cannot send one, and a cross-site fetch() with that content type
+# needs a CORS preflight, which this app never grants. The admin session check still applies.
+@app.route('/bulk_update_status', methods=['POST'])
+@csrf.exempt
+@log_execution
+def bulk_update_status_route():
+    """
+    Body: {"status": "Resolved", "ticket_ids": [1, 2, 3]}
+       or {"status": "Resolved", "filter": {"status": "Open", "priority": "Low", "created_to": "2025-07-20"}}
+    """
+    if not request.is_json:
+        return jsonify({'error': 'Send the request body as application/json.'}), 415
+
+    if session.get('role') != 'admin':
+        logger.warning("Unauthorized Bulk Status Update Attempt", extra={
+            "event": "security_violation",
+            "action": "bulk_update_status",
+            "user": session.get('username')
+        })
+        return jsonify({'error': 'Unauthorized: Only admin can update status.'}), 403
+
+    payload = request.get_json(silent=True) or {}
+    status = payload.get('status')
+    ticket_ids = payload.get('ticket_ids')
+    filters = payload.get('filter')
+
+    if status not in VALID_STATUSES:
+        logger.error("Invalid Bulk Status Update Attempt", extra={
+            "event": "invalid_operation",
+            "invalid_status": status,
+            "user": session.get('username')
+        })
+        return jsonify({'error': f"status must be one of {', '.join(VALID_STATUSES)}"}), 400
+
+    if ticket_ids:
+        if not isinstance(ticket_ids, list) or not all(type(i) is int for i in ticket_ids):
+            return jsonify({'error': 'ticket_ids must be a list of integers'}), 400
+        if len(ticket_ids) > BULK_UPDATE_MAX_IDS:
+            return jsonify({'error': f'at most {BULK_UPDATE_MAX_IDS} ticket_ids per request'}), 400
+        conditions, params = ['id = ANY(%s)'], [ticket_ids]
+    elif isinstance(filters, dict):
+        try:
+            conditions, params = _ticket_filters(filters)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not conditions:
+            # Refuse to silently rewrite every ticket in the table
+            return jsonify({'error': 'filter must set at least one of status, priority, created_from, created_to'}), 400
+    else:
+        return jsonify({'error': 'Provide ticket_ids or filter.'}), 400
+
+    updated_ids = bulk_update_ticket_status(status, conditions, params)
+
+    # --- LOG: Status Update (one event for the whole batch) ---
+    logger.info("Ticket Status Bulk Updated", extra={
+        "event": "status_change",
+        "new_status": status,
+        "updated_count": len(updated_ids),
+        "ticket_ids": updated_ids[:100],
+        "filter": filters if not ticket_ids else None,
+        "updated_by": session.get('username')
+    })
+    return jsonify({'status': status, 'updated': len(updated_ids), 'ticket_ids': updated_ids})
+
+
 @app.route('/edit_ticket/<int:ticket_id>', methods=['GET', 'POST'])
 @log_execution
 def edit_ticket_route(ticket_id):
@@ -481,8 +2538,589 @@ def edit_ticket_route(ticket_id):
             flash('Please fill in all fields.', 'danger')
         return redirect(url_for('index'))
 
-    tickets = get_all_tickets()
-    return render_template('index.html', tickets=tickets, edit_ticket=ticket, active_tab='create', role=session.get('role'))
+    return render_template('index.html', **ticket_table(), edit_ticket=ticket,
+                           active_tab='create', role=session.get('role'))
+
+
+# --- BULK IMPORT START ---
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 5000))
+IMPORT_MAX_REPORTED_ERRORS = 100
+
+
+def _iter_import_records(stream, fmt):
+    """Yield (line_number, record, error) from a CSV (with header) or NDJSON upload, one row at a time."""
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "expected a JSON object"
+            continue
+        yield line_number, record, None
+
+
+# COPY cannot upsert, so each batch is copied into a session-local staging table and moved
+# into tickets by one INSERT ... ON CONFLICT, the same upsert as add_ticket(). Rows sharing a
+# fingerprint are folded first (an upsert may not touch a row twice); `n` keeps file order.
+IMPORT_STAGING_SQL = '''
+    CREATE TEMP TABLE IF NOT EXISTS ticket_import (
+        n SERIAL,
+        title TEXT,
+        description TEXT,
+        priority TEXT,
+        status TEXT,
+        created_at TIMESTAMP,
+        fingerprint TEXT
+    )
+'''
+IMPORT_UPSERT_SQL = '''
+    WITH folded AS (
+        SELECT DISTINCT ON (coalesce(fingerprint, n::text)) n, title, description, priority, status, created_at,
+               fingerprint, count(*) OVER (PARTITION BY coalesce(fingerprint, n::text)) AS occurrences
+        FROM ticket_import
+        ORDER BY coalesce(fingerprint, n::text), n
+    ), upserted AS (
+        INSERT INTO tickets (title, description, priority, status, created_at, fingerprint, occurrences)
+        SELECT title, description, priority, status, created_at, fingerprint, occurrences FROM folded ORDER BY n
+        ON CONFLICT (fingerprint) WHERE status <> 'Resolved'
+        DO UPDATE SET occurrences = tickets.occurrences + EXCLUDED.occurrences, last_seen_at = EXCLUDED.created_at
+        RETURNING xmax = 0 AS inserted
+    )
+    SELECT count(*) FILTER (WHERE inserted) FROM upserted
+'''
+
+
+def _copy_tickets(cursor, rows):
+    """Load one batch of (title, description, priority, status, created_at, fingerprint); returns tickets created."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.execute('TRUNCATE ticket_import')
+    cursor.copy_expert(
+        'COPY ticket_import (title, description, priority, status, created_at, fingerprint) '
+        'FROM STDIN WITH (FORMAT csv)', buffer)
+    cursor.execute(IMPORT_UPSERT_SQL)
+    return cursor.fetchone()[0]
+
+
+@log_execution
+def import_tickets(stream, fmt):
+    """
+    Load tickets from an upload with COPY, IMPORT_BATCH_SIZE rows per batch, all in one
+    transaction. Rows are validated like add_ticket(); bad rows are skipped and reported.
+    Repeats of an unresolved ticket (or of another row) are deduplicated like add_ticket().
+    """
+    started = time.perf_counter()
+    created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    imported = 0
+    created = 0
+    failed = 0
+    errors = []
+    batch = []
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(IMPORT_STAGING_SQL)
+        for line_number, record, error in _iter_import_records(stream, fmt):
+            title = str(record.get('title') or '').strip() if record is not None else ''
+            description = record.get('description') if record is not None else None
+            description = '' if description is None else str(description)
+            if error is None and not title:
+                error = "title is required"
+            if error is None and not description:
+                error = "description is required"
+            if error:
+                failed += 1
+                if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+                    errors.append({'line': line_number, 'error': error})
+                continue
+
+            fingerprint = ticket_fingerprint(title, description) if DEDUP_ENABLED else None
+            batch.append((title, description, normalize_priority(record.get('priority')), 'Open', created_at,
+                          fingerprint))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                created += _copy_tickets(cursor, batch)
+                imported += len(batch)
+                batch = []
+
+        if batch:
+            created += _copy_tickets(cursor, batch)
+            imported += len(batch)
+        conn.commit()
+        note_primary_write()
+        ticket_table_cache.bump()
+
+    if imported:
+        # One reload beats thousands of single-row deltas
+        ticket_stats_cache.invalidate()
+
+    seconds = time.perf_counter() - started
+    return {
+        'imported': imported,
+        'duplicates': imported - created,  # counted against an existing ticket instead of creating one
+        'failed': failed,
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(imported / seconds, 1) if seconds > 0 else None
+    }
+
+
+@app.route('/import_tickets', methods=['POST'])
+@log_execution
+def import_tickets_route():
+    if session.get('role') != 'admin':
+        logger.warning("Unauthorized Ticket Import Attempt", extra={
+            "event": "security_violation",
+            "action": "import_tickets",
+            "user": session.get('username')
+        })
+        return jsonify({'error': 'Unauthorized: Only admin can import tickets.'}), 403
+
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'error': 'No file uploaded.'}), 400
+
+    fmt = request.form.get('format')
+    if not fmt:
+        fmt = 'ndjson' if upload.filename.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+
+    try:
+        result = import_tickets(upload.stream, fmt)
+    except (UnicodeDecodeError, csv.Error) as e:
+        # The transaction was rolled back, so nothing from this file was loaded
+        return jsonify({'error': f'Could not read {fmt} upload: {e}'}), 400
+
+    # --- LOG: Bulk Import ---
+    logger.info("Tickets Imported", extra={
+        "event": "tickets_imported",
+        "format": fmt,
+        "imported": result['imported'],
+        "failed": result['failed'],
+        "rows_per_second": result['rows_per_second'],
+        "imported_by": session.get('username')
+    })
+    return jsonify(result)
+# --- BULK IMPORT END ---
+
+
+# --- STREAMING EXPORT START ---
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 2000))
+EXPORT_FIELDS = ['id', 'title', 'description', 'priority', 'status', 'created_at']
+
+
+def _ticket_filters(args):
+    """Turn status/priority/date filters into (conditions, params); raises ValueError on bad input."""
+    conditions = []
+    params = []
+
+    status = args.get('status')
+    if status:
+        if status not in VALID_STATUSES:
+            raise ValueError(f"status must be one of {', '.join(VALID_STATUSES)}")
+        conditions.append('status = %s')
+        params.append(status)
+
+    priority = args.get('priority')
+    if priority:
+        if priority not in VALID_PRIORITIES:
+            raise ValueError(f"priority must be one of {', '.join(VALID_PRIORITIES)}")
+        conditions.append('priority = %s')
+        params.append(priority)
+
+    # Dates are inclusive calendar days: created_to=2025-07-20 includes all of the 20th
+    try:
+        if args.get('created_from'):
+            conditions.append('created_at >= %s')
+            params.append(datetime.strptime(args['created_from'], '%Y-%m-%d'))
+        if args.get('created_to'):
+            conditions.append('created_at < %s')
+            params.append(datetime.strptime(args['created_to'], '%Y-%m-%d') + timedelta(days=1))
+    except (TypeError, ValueError):
+        raise ValueError("created_from and created_to must be YYYY-MM-DD")
+
+    return conditions, params
+
+
+def iter_ticket_batches(conditions, params, batch_size=EXPORT_BATCH_SIZE, include_archived=False):
+    """
+    Yield lists of ticket tuples from a server-side (named) cursor, so only one batch
+    is ever held in memory no matter how many rows match.
+    """
+    where = sql.SQL(' AND ').join(sql.SQL(c) for c in conditions) if conditions else sql.SQL('TRUE')
+    query = sql.SQL(
+        'SELECT id, title, description, priority, status, created_at FROM {} WHERE {} ORDER BY id'
+    ).format(sql.Identifier('all_tickets' if include_archived else 'tickets'), where)
+
+    with db_connection(readonly=True) as conn:
+        cursor = conn.cursor(name='ticket_export')
+        cursor.itersize = batch_size
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+        cursor.close()
+
+
+def _export_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue()
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def _export_ndjson(batches):
+    for rows in batches:
+        yield ''.join(json.dumps(dict(zip(EXPORT_FIELDS, row)), default=str) + '\n' for row in rows)
+
+
+@app.route('/export')
+@log_execution
+def export_tickets():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    try:
+        conditions, params = _ticket_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # --- LOG: Export Started ---
+    logger.info("Ticket Export Started", extra={
+        "event": "tickets_exported",
+        "format": fmt,
+        "filters": {k: v for k, v in request.args.items() if k != 'format'},
+        "user": session.get('username')
+    })
+
+    batches = iter_ticket_batches(conditions, params, include_archived=request.args.get('include_archived') == '1')
+    if fmt == 'csv':
+        body, mimetype = _export_csv(batches), 'text/csv'
+    else:
+        body, mimetype = _export_ndjson(batches), 'application/x-ndjson'
+
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    filename = f"tickets-{datetime.now():%Y%m%d-%H%M%S}.{fmt}"
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+# --- STREAMING EXPORT END ---
+
+
+# --- TICKET HISTORY START ---
+# ticket_events is filled by triggers (migration 5). Startup creates the monthly partitions
+# a few months ahead; pods restart far more often than that, so the DEFAULT partition
+# should stay empty. Old months can be dropped or detached whole for retention.
+TICKET_EVENTS_MONTHS_AHEAD = int(os.environ.get('TICKET_EVENTS_MONTHS_AHEAD', 3))
+STATS_DEFAULT_DAYS = 30
+
+
+def ensure_ticket_event_partitions(cursor, months_ahead=TICKET_EVENTS_MONTHS_AHEAD):
+    """Create ticket_events partitions from this month to `months_ahead` months on; returns the new names."""
+    created = []
+    month = datetime.now().date().replace(day=1)
+    for _ in range(months_ahead + 1):
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        name = f'ticket_events_{month:%Y_%m}'
+        cursor.execute('SELECT to_regclass(%s)', (name,))
+        if cursor.fetchone()[0] is None:
+            partition = sql.Identifier(name)
+            # ATTACH refuses while the DEFAULT partition holds rows for this range, so move them first
+            cursor.execute(sql.SQL('CREATE TABLE {} (LIKE ticket_events INCLUDING DEFAULTS)').format(partition))
+            cursor.execute(sql.SQL('''
+                WITH moved AS (
+                    DELETE FROM ticket_events_default WHERE occurred_at >= %s AND occurred_at < %s
+                    RETURNING ticket_id, occurred_at, event, old_value, new_value, dwell
+                )
+                INSERT INTO {} (ticket_id, occurred_at, event, old_value, new_value, dwell)
+                SELECT ticket_id, occurred_at, event, old_value, new_value, dwell FROM moved
+            ''').format(partition), (month, next_month))
+            cursor.execute(sql.SQL('ALTER TABLE ticket_events ATTACH PARTITION {} FOR VALUES FROM (%s) TO (%s)')
+                           .format(partition), (month, next_month))
+            created.append(name)
+        month = next_month
+    return created
+
+
+def _stats_range(args, max_span=None):
+    """Parse from/to (inclusive YYYY-MM-DD days) into a half-open [start, end) range; raises ValueError."""
+    try:
+        end = datetime.strptime(args['to'], '%Y-%m-%d') + timedelta(days=1) if args.get('to') else \
+            datetime.combine(datetime.now().date() + timedelta(days=1), datetime.min.time())
+        start = datetime.strptime(args['from'], '%Y-%m-%d') if args.get('from') else \
+            end - timedelta(days=STATS_DEFAULT_DAYS)
+    except (TypeError, ValueError):
+        raise ValueError("from and to must be YYYY-MM-DD")
+    if start >= end:
+        raise ValueError("from must not be after to")
+    if max_span is not None and end - start > max_span:
+        raise ValueError(f"from and to may be at most {max_span.days} days apart")
+    return start, end
+
+
+def _duration_summary(count, avg_seconds, p50_seconds, p90_seconds):
+    hours = [None if v is None else round(float(v) / 3600, 2) for v in (avg_seconds, p50_seconds, p90_seconds)]
+    return {'count': count, 'avg_hours': hours[0], 'p50_hours': hours[1], 'p90_hours': hours[2]}
+
+
+# Every resolution in the range counts, so a reopened ticket resolved twice counts twice
+TIME_TO_RESOLVE_SQL = queries.register('time_to_resolve', '''
+    SELECT t.priority, GROUPING(t.priority) AS overall, COUNT(*),
+           EXTRACT(EPOCH FROM AVG(e.occurred_at - t.created_at)),
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM e.occurred_at - t.created_at)),
+           percentile_cont(0.9) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM e.occurred_at - t.created_at))
+    FROM ticket_events e JOIN all_tickets t ON t.id = e.ticket_id
+    WHERE e.occurred_at >= %s AND e.occurred_at < %s AND e.event = 'status' AND e.new_value = 'Resolved'
+    GROUP BY GROUPING SETS ((t.priority), ())
+''')
+
+
+@log_execution
+def time_to_resolve(start, end):
+    """Creation-to-resolution time for tickets resolved in [start, end), overall and per priority."""
+    rows = read_rows(TIME_TO_RESOLVE_SQL, (start, end))
+    result = {'overall': _duration_summary(0, None, None, None), 'by_priority': {}}
+    for priority, overall, *summary in rows:
+        if overall:
+            result['overall'] = _duration_summary(*summary)
+        else:
+            result['by_priority'][priority] = _duration_summary(*summary)
+    return result
+
+
+# dwell is stamped on each status event, so this never needs the previous event for a ticket
+STATUS_DWELL_SQL = queries.register('status_dwell', '''
+    SELECT old_value, COUNT(*), EXTRACT(EPOCH FROM AVG(dwell)),
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM dwell)),
+           percentile_cont(0.9) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM dwell))
+    FROM ticket_events
+    WHERE occurred_at >= %s AND occurred_at < %s AND event = 'status'
+    GROUP BY old_value
+''')
+
+
+@log_execution
+def status_dwell_times(start, end):
+    """How long tickets stayed in each status before a change made in [start, end)."""
+    rows = read_rows(STATUS_DWELL_SQL, (start, end))
+    return {status: _duration_summary(*summary) for status, *summary in rows}
+
+
+@app.route('/stats/resolution')
+def resolution_stats():
+    try:
+        start, end = _stats_range(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'from': start.date().isoformat(),
+        'to': (end - timedelta(days=1)).date().isoformat(),
+        'time_to_resolve': time_to_resolve(start, end),
+        'status_dwell': status_dwell_times(start, end),
+    })
+# --- TICKET HISTORY END ---
+
+
+# --- TICKET ROLLUPS START ---
+ROLLUP_STEPS = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+# Defaults when ?from= is omitted, and the most buckets one /stats/trend response may hold
+TREND_DEFAULT_SPAN = {'hour': timedelta(days=2), 'day': timedelta(days=STATS_DEFAULT_DAYS)}
+TREND_MAX_BUCKETS = 1000
+
+REBUILD_ROLLUPS_SQL = '''
+    INSERT INTO ticket_rollups (granularity, bucket, kind, value, count)
+    SELECT g.granularity, date_trunc(g.granularity, t.created_at), 'created', t.priority, count(*)
+    FROM all_tickets t CROSS JOIN (VALUES ('hour'), ('day')) AS g(granularity)
+    WHERE t.created_at >= %(start)s AND t.created_at < %(end)s AND t.priority IS NOT NULL
+    GROUP BY 1, 2, 4
+    UNION ALL
+    SELECT g.granularity, date_trunc(g.granularity, e.occurred_at), 'status', e.new_value, count(*)
+    FROM ticket_events e CROSS JOIN (VALUES ('hour'), ('day')) AS g(granularity)
+    WHERE e.occurred_at >= %(start)s AND e.occurred_at < %(end)s AND e.event = 'status' AND e.new_value IS NOT NULL
+    GROUP BY 1, 2, 4
+'''
+
+
+def rebuild_ticket_rollups(cursor, start=None, end=None):
+    """
+    Recount the rollups for [start, end) (whole days; everything when omitted) from tickets
+    and ticket_events, in the caller's transaction. Returns the number of rollup rows written.
+    """
+    start = datetime.combine(start.date(), datetime.min.time()) if start else datetime.min
+    end = datetime.combine(end.date(), datetime.min.time()) + timedelta(days=1) if end else datetime.max
+    # Blocks ticket writes' trigger upserts until commit, so none is counted twice or lost
+    cursor.execute('LOCK TABLE ticket_rollups IN SHARE ROW EXCLUSIVE MODE')
+    cursor.execute('DELETE FROM ticket_rollups WHERE bucket >= %s AND bucket < %s', (start, end))
+    cursor.execute(REBUILD_ROLLUPS_SQL, {'start': start, 'end': end})
+    return cursor.rowcount
+
+
+@log_execution
+def backfill_ticket_rollups(start=None, end=None):
+    """Repair the rollups for the days from start to end inclusive (all history by default)."""
+    with db_connection() as conn:
+        written = rebuild_ticket_rollups(conn.cursor(), start, end)
+        conn.commit()
+    logger.info("Ticket Rollups Rebuilt", extra={
+        "event": "rollups_rebuilt",
+        "from": start.date().isoformat() if start else None,
+        "to": end.date().isoformat() if end else None,
+        "rows": written
+    })
+    return written
+
+
+@app.cli.command('backfill-rollups')
+@click.option('--from', 'start', type=click.DateTime(['%Y-%m-%d']), help='first day to rebuild')
+@click.option('--to', 'end', type=click.DateTime(['%Y-%m-%d']), help='last day to rebuild (inclusive)')
+def backfill_rollups_command(start, end):
+    """Recount ticket_rollups from tickets and ticket_events."""
+    click.echo(f"Rebuilt {backfill_ticket_rollups(start, end)} rollup rows")
+
+
+def _floor_bucket(moment, granularity):
+    if granularity == 'day':
+        return datetime.combine(moment.date(), datetime.min.time())
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+TICKET_TREND_SQL = queries.register('ticket_trend', '''
+    SELECT bucket, kind, value, count FROM ticket_rollups
+    WHERE granularity = %s AND bucket >= %s AND bucket < %s AND count <> 0
+''')
+
+
+@log_execution
+def get_ticket_trend(granularity, start, end):
+    """Dense per-bucket series for [start, end): tickets created by priority and moves into each status."""
+    step = ROLLUP_STEPS[granularity]
+    first = _floor_bucket(start, granularity)
+    # Count before building anything, so an absurd range costs nothing but the error
+    if -((first - end) // step) > TREND_MAX_BUCKETS:
+        raise ValueError(f"at most {TREND_MAX_BUCKETS} {granularity} buckets per request")
+    buckets = []
+    bucket = first
+    while bucket < end:
+        buckets.append(bucket)
+        bucket += step
+
+    rows = read_rows(TICKET_TREND_SQL, (granularity, buckets[0] if buckets else start, end))
+
+    position = {b: i for i, b in enumerate(buckets)}
+    series = {
+        'created': {p: [0] * len(buckets) for p in VALID_PRIORITIES},
+        'status': {s: [0] * len(buckets) for s in VALID_STATUSES},
+    }
+    for bucket, kind, value, count in rows:
+        if bucket in position:
+            series[kind].setdefault(value, [0] * len(buckets))[position[bucket]] = count
+    return {
+        'granularity': granularity,
+        'buckets': [b.isoformat() for b in buckets],
+        'created_by_priority': series['created'],
+        'entered_status': series['status'],
+    }
+
+
+@app.route('/stats/trend')
+def trend_stats():
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ROLLUP_STEPS:
+        return jsonify({'error': 'granularity must be hour or day'}), 400
+    args = request.args.to_dict()
+    try:
+        start, end = _stats_range(args, max_span=TREND_MAX_BUCKETS * ROLLUP_STEPS[granularity])
+        if granularity == 'hour' and not args.get('to'):
+            # An hourly view ends with the current hour, not at midnight tonight
+            end = _floor_bucket(datetime.now(), 'hour') + ROLLUP_STEPS['hour']
+        if not args.get('from'):
+            start = end - TREND_DEFAULT_SPAN[granularity]
+        return jsonify(get_ticket_trend(granularity, start, end))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+# --- TICKET ROLLUPS END ---
+
+
+# --- TICKET ARCHIVAL START ---
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 90))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 1000))
+
+# One batch per transaction: each ticket is in exactly one table at every commit, and
+# SKIP LOCKED leaves rows that a request is updating right now for the next run
+ARCHIVE_BATCH_SQL = '''
+    WITH moved AS (
+        DELETE FROM tickets WHERE id IN (
+            SELECT id FROM tickets
+            WHERE status = 'Resolved' AND coalesce(status_changed_at, created_at) < %s
+            ORDER BY id LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, title, description, priority, status, created_at, status_changed_at, occurrences, last_seen_at
+    )
+    INSERT INTO tickets_archive
+        (id, title, description, priority, status, created_at, status_changed_at, occurrences, last_seen_at)
+    SELECT id, title, description, priority, status, created_at, status_changed_at, occurrences, last_seen_at
+    FROM moved
+'''
+
+
+@log_execution
+def archive_resolved_tickets(older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move tickets resolved more than `older_than_days` ago into tickets_archive; returns how many moved."""
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    moved = 0
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        while True:
+            cursor.execute(ARCHIVE_BATCH_SQL, (cutoff, batch_size))
+            batch = cursor.rowcount
+            conn.commit()
+            moved += batch
+            if batch < batch_size:
+                break
+        if moved:
+            # Other workers drop their cached ticket tables and open dashboards refetch
+            cursor.execute('SELECT pg_notify(%s, %s)', (TICKET_EVENTS_CHANNEL, json.dumps({'op': 'reload'})))
+            conn.commit()
+
+    if moved:
+        ticket_table_cache.bump()
+        ticket_stats_cache.invalidate()
+    # --- LOG: Tickets Archived ---
+    logger.info("Resolved Tickets Archived", extra={
+        "event": "tickets_archived",
+        "moved": moved,
+        "older_than_days": older_than_days
+    })
+    return moved
+
+
+@app.cli.command('archive-tickets')
+@click.option('--older-than-days', type=int, default=ARCHIVE_AFTER_DAYS, show_default=True,
+              help='archive tickets resolved longer ago than this')
+@click.option('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, show_default=True)
+def archive_tickets_command(older_than_days, batch_size):
+    """Move old resolved tickets from tickets to tickets_archive."""
+    click.echo(f"Archived {archive_resolved_tickets(older_than_days, batch_size)} tickets")
+# --- TICKET ARCHIVAL END ---
 
 
 @app.route('/manage_users', methods=['GET', 'POST'])
@@ -497,75 +3135,76 @@ def manage_users():
         flash("Unauthorized access", "danger")
         return redirect(url_for('index'))
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with db_connection() as conn:
+        cursor = conn.cursor()
 
-    if request.method == 'POST':
-        username = request.form.get('username')
-        password = request.form.get('password')
-        role = request.form.get('role')
-        action = request.form.get('action')
-
-        valid_roles = ['admin', 'readonly']
-
-        if action == 'add':
-            if not username or not password or not role:
-                flash("Please fill all fields.", "danger")
-            elif role not in valid_roles:
-                flash("Invalid role selected.", "danger")
-            else:
-                hashed_pw = generate_password_hash(password)
-                try:
-                    cursor.execute(
-                        'INSERT INTO users (username, password, role) VALUES (%s, %s, %s)',
-                        (username, hashed_pw, role)
-                    )
+        if request.method == 'POST':
+            username = request.form.get('username')
+            password = request.form.get('password')
+            role = request.form.get('role')
+            action = request.form.get('action')
+
+            valid_roles = ['admin', 'readonly']
+
+            if action == 'add':
+                if not username or not password or not role:
+                    flash("Please fill all fields.", "danger")
+                elif role not in valid_roles:
+                    flash("Invalid role selected.", "danger")
+                else:
+                    hashed_pw = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+                    try:
+                        cursor.execute(
+                            'INSERT INTO users (username, password, role) VALUES (%s, %s, %s)',
+                            (username, hashed_pw, role)
+                        )
+                        conn.commit()
+                        note_primary_write()
+
+                        # --- LOG: User Created ---
+                        logger.info("User Account Created", extra={
+                            "event": "user_created",
+                            "target_user": username,
+                            "target_role": role,
+                            "created_by": session.get('username')
+                        })
+
+                        flash(f"User '{username}' added as {role}.", 'success')
+                    except psycopg2.IntegrityError:
+                        conn.rollback()
+                        logger.warning("User Creation Failed (Duplicate)", extra={
+                            "event": "user_creation_failed",
+                            "reason": "duplicate_username",
+                            "target_user": username
+                        })
+                        flash(f"User '{username}' already exists.", 'warning')
+                    except Exception as e:
+                        conn.rollback()
+                        logger.error("User Creation Error", extra={
+                            "event": "user_creation_error",
+                            "error": str(e)
+                        })
+                        flash(f"Error: {str(e)}", 'danger')
+
+            elif action == 'remove':
+                if not username:
+                    flash("No username provided for deletion.", "warning")
+                else:
+                    cursor.execute('DELETE FROM users WHERE username = %s', (username,))
                     conn.commit()
-
-                    # --- LOG: User Created ---
-                    logger.info("User Account Created", extra={
-                        "event": "user_created",
+                    note_primary_write()
+                    # --- LOG: User Deleted ---
+                    logger.info("User Account Deleted", extra={
+                        "event": "user_deleted",
                         "target_user": username,
-                        "target_role": role,
-                        "created_by": session.get('username')
+                        "deleted_by": session.get('username')
                     })
 
-                    flash(f"User '{username}' added as {role}.", 'success')
-                except psycopg2.IntegrityError:
-                    conn.rollback()
-                    logger.warning("User Creation Failed (Duplicate)", extra={
-                        "event": "user_creation_failed",
-                        "reason": "duplicate_username",
-                        "target_user": username
-                    })
-                    flash(f"User '{username}' already exists.", 'warning')
-                except Exception as e:
-                    conn.rollback()
-                    logger.error("User Creation Error", extra={
-                        "event": "user_creation_error",
-                        "error": str(e)
-                    })
-                    flash(f"Error: {str(e)}", 'danger')
+                    flash(f"User '{username}' removed.", 'info')
 
-        elif action == 'remove':
-            if not username:
-                flash("No username provided for deletion.", "warning")
-            else:
-                cursor.execute('DELETE FROM users WHERE username = %s', (username,))
-                conn.commit()
-                # --- LOG: User Deleted ---
-                logger.info("User Account Deleted", extra={
-                    "event": "user_deleted",
-                    "target_user": username,
-                    "deleted_by": session.get('username')
-                })
-
-                flash(f"User '{username}' removed.", 'info')
-
-    # Fetch existing users for display
-    cursor.execute('SELECT username, role FROM users')
-    users = cursor.fetchall()
-    conn.close()
+        # Fetch existing users for display
+        queries.run(cursor, LIST_USERS_SQL)
+        users = cursor.fetchall()
 
     users_list = [{'username': row[0], 'role': row[1]} for row in users]
     return render_template('index.html', users=users_list, active_tab='manage_users', role=session.get('role'))
@@ -577,25 +3216,222 @@ def existing_users():
         flash("Unauthorized access", "danger")
         return redirect(url_for('index'))
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT username, role FROM users')
-    users = cursor.fetchall()
-    conn.close()
+    users = read_rows(LIST_USERS_SQL)
 
     users_list = [{'username': row[0], 'role': row[1]} for row in users]
     return jsonify(users_list)
 
 
+@app.route('/api/timings')
+def call_timings_api():
+    if session.get('role') != 'admin':
+        return jsonify({'error': 'Unauthorized access'}), 403
+    return jsonify(call_timings())
+
+
+# --- PROMETHEUS METRICS START ---
+# The series are defined with the instrumentation knobs at the top of this file and fed
+# where things happen, ticket gauges included (by ticket_stats_cache). A scrape only merges
+# them (across workers under gunicorn): it never queries the database or opens a connection.
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_timing(response):
+    started = g.pop('request_started', None)
+    if started is not None and request.endpoint not in ('metrics', 'static'):
+        endpoint = request.endpoint or 'unmatched'
+        failed = response.status_code >= 500
+        route_timings.record((endpoint, request.method), (time.perf_counter() - started) * 1000, failed=failed)
+        if failed:
+            http_request_errors.labels(endpoint, request.method).inc()
+    return response
+
+
+def metrics_registry():
+    """Registry to expose: every worker's samples when PROMETHEUS_MULTIPROC_DIR is set, else this process."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = prometheus_client.CollectorRegistry()
+        prometheus_client.multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+
+@app.route('/metrics')
+def metrics():
+    return Response(prometheus_client.generate_latest(metrics_registry()),
+                    mimetype=prometheus_client.CONTENT_TYPE_LATEST)
+# --- PROMETHEUS METRICS END ---
+
+
+# --- LIVE TICKET EVENTS START ---
+# The NOTIFY triggers from migration 4 are fanned out to open dashboards over Server-Sent
+# Events by one LISTEN connection per process. Under gthread an open stream holds one of the
+# worker's GUNICORN_THREADS for its whole life, so SSE_MAX_STREAMS (default: half of them)
+# leaves the rest for requests. A pod therefore holds WEB_CONCURRENCY * SSE_MAX_STREAMS
+# streams (2 * 8 = 16 as deployed); scale replicas, not threads, for more. Dashboards that
+# get a 503 fall back to polling /get_chart_data and retry the stream later.
+SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS') or max(1, int(os.environ.get('GUNICORN_THREADS', 4)) // 2))
+# Streams are closed after this long; EventSource reconnects, which rebalances clients across workers
+SSE_STREAM_SECONDS = float(os.environ.get('SSE_STREAM_SECONDS', 300))
+SSE_KEEPALIVE_SECONDS = 15
+SSE_QUEUE_SIZE = 100
+
+
+class TicketEventHub:
+    """
+    The process's LISTEN connection plus one bounded queue per open event stream.
+
+    The listener thread starts with the first subscriber and exits after the last one
+    leaves. NOTIFYs sent while it is disconnected are lost, so after a reconnect every
+    subscriber is told to 'reload'; the same happens to a subscriber whose queue fills up.
+    LISTEN must use the primary: notifications are not delivered on replicas.
+    """
+
+    def __init__(self, channel, connect):
+        self.channel = channel
+        self._connect = connect
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+
+    def subscribe(self):
+        """Return a Queue of event dicts, or None when SSE_MAX_STREAMS streams are already open."""
+        with self._lock:
+            if len(self._subscribers) >= SSE_MAX_STREAMS:
+                return None
+            events = queue.Queue(maxsize=SSE_QUEUE_SIZE)
+            self._subscribers.add(events)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._listen, name='ticket-events', daemon=True)
+                self._thread.start()
+            return events
+
+    def unsubscribe(self, events):
+        with self._lock:
+            self._subscribers.discard(events)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for events in subscribers:
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                # A stalled client: replace its backlog with one instruction to refetch
+                with events.mutex:
+                    events.queue.clear()
+                events.put_nowait({'op': 'reload'})
+
+    def _dispatch(self, payload):
+        # Another worker (or pod) changed tickets: cached table fragments are stale here too
+        ticket_table_cache.bump()
+        try:
+            self.publish(json.loads(payload))
+        except ValueError:
+            logger.warning("Ignoring malformed ticket event", extra={"event": "ticket_event_invalid"})
+
+    def _listen(self):
+        reconnecting = False
+        backoff = 1
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            conn = None
+            try:
+                conn = self._connect()
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                conn.cursor().execute(sql.SQL('LISTEN {}').format(sql.Identifier(self.channel)))
+                if reconnecting:
+                    self.publish({'op': 'reload'})
+                reconnecting = False
+                backoff = 1
+                while self.subscriber_count():
+                    # Wake up now and then to notice that every subscriber has gone
+                    if select.select([conn], [], [], SSE_KEEPALIVE_SECONDS) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._dispatch(conn.notifies.pop(0).payload)
+            except (psycopg2.Error, OSError) as e:
+                # --- LOG: Listener Lost ---
+                logger.warning("Ticket event listener disconnected", extra={
+                    "event": "ticket_listener_error",
+                    "error": str(e),
+                    "retry_in_seconds": backoff
+                })
+                reconnecting = True
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if conn is not None and not conn.closed:
+                    conn.close()
+
+    def _reset_after_fork(self):
+        # Neither the listener thread nor its socket exists in the child
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+
+
+ticket_events_hub = TicketEventHub(TICKET_EVENTS_CHANNEL, lambda: get_db_connection())
+os.register_at_fork(after_in_child=ticket_events_hub._reset_after_fork)
+
+
+@app.route('/events')
+def ticket_events():
+    """Server-Sent Events: 'ticket' carries an inserted/updated ticket, 'reload' means refetch."""
+    events = ticket_events_hub.subscribe()
+    if events is None:
+        return jsonify({'error': 'Too many live connections, try again later'}), 503, {'Retry-After': '30'}
+
+    def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            deadline = time.monotonic() + SSE_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                try:
+                    event = events.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'  # keeps proxies from closing an idle stream
+                    continue
+                name = 'reload' if event.get('op') == 'reload' else 'ticket'
+                yield f'event: {name}\ndata: {json.dumps(event)}\n\n'
+        finally:
+            ticket_events_hub.unsubscribe(events)
+
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # stop nginx ingress from buffering the stream
+    return response
+# --- LIVE TICKET EVENTS END ---
+
+
 @app.route('/health')
 def health_check():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT 1')
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            queries.run(cursor, PING_SQL)
         # We don't log success here to avoid noise in Kibana
-        return jsonify({'status': 'healthy', 'database': 'connected'}), 200
+        body = {'status': 'healthy', 'database': 'connected', 'pool': get_pool().stats()}
+        if DB_READ_HOST:
+            # The replica is optional: reads fall back to the primary, so it never fails the probe
+            replica = _pools.get('replica')
+            body['replica'] = {
+                'host': DB_READ_HOST,
+                'available': time.monotonic() >= _replica_down_until,
+                'pool': replica.stats() if replica is not None else None
+            }
+        return jsonify(body), 200
     except Exception as e:
         # --- LOG: Critical Health Failure ---
         logger.critical("Health Check Failed", extra={
@@ -605,13 +3441,328 @@ def health_check():
         return jsonify({'status': 'unhealthy', 'error': str(e)}), 503
 
 
-# Initialize database and run app
-if __name__ == '__main__':
+# --- ASYNC DATA ACCESS START ---
+# Optional asyncio path for the I/O-bound read views, enabled with ASYNC_DB=true.
+# Needs psycopg 3 (psycopg[binary,pool]) and Flask's async extra (asgiref).
+#
+# Each worker process runs one event loop on a background thread that owns psycopg 3
+# AsyncConnectionPools, and async views hand their queries to it with run_db(). This does
+# not raise a worker's request concurrency: under gthread, Flask runs each async view to
+# completion in its own short-lived event loop on the request thread, so a worker still
+# serves at most GUNICORN_THREADS requests at once. What it buys is overlapping the
+# independent queries within one view (asyncio.gather()). The async pools draw on the
+# same per-worker DB_POOL_MAX_SIZE budget as the sync pools (see pool_max_sizes()).
+# Writes stay on the sync path.
+ASYNC_DB = os.environ.get('ASYNC_DB', 'false').lower() == 'true'
+
+_async_use_replica = contextvars.ContextVar('async_use_replica', default=False)
+
+
+class AsyncDatabase:
+    """Background event loop plus one psycopg 3 AsyncConnectionPool per role ('primary', 'replica')."""
+
+    def __init__(self):
+        self._pid = os.getpid()
+        self._pools = {}
+        self._pools_lock = asyncio.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='async-db', daemon=True)
+        self._thread.start()
+
+    async def _pool(self, role):
+        from psycopg_pool import AsyncConnectionPool
+        async with self._pools_lock:
+            pool = self._pools.get(role)
+            if pool is None:
+                max_size = pool_max_sizes(role)[1] or 1
+                pool = AsyncConnectionPool(
+                    kwargs={
+                        'host': DB_READ_HOST if role == 'replica' else os.environ.get('DB_HOST', 'localhost'),
+                        'port': os.environ.get('DB_PORT', 5432),
+                        'dbname': os.environ.get('DB_NAME', 'app'),
+                        'user': os.environ.get('DB_USER', 'app'),
+                        'password': os.environ.get('DB_PASSWORD'),
+                        'connect_timeout': DB_CONNECT_TIMEOUT,
+                    },
+                    min_size=min(int(os.environ.get('DB_POOL_MIN_SIZE', 1)), max_size),
+                    max_size=max_size,
+                    timeout=float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+                    check=AsyncConnectionPool.check_connection,
+                    open=False,
+                    name=f'async-{role}',
+                )
+                try:
+                    await pool.open(wait=True, timeout=pool.timeout)
+                except Exception:
+                    await pool.close()  # stop its background connection attempts
+                    raise
+                self._pools[role] = pool
+            return pool
+
+    async def _fetch(self, role, query, params, one):
+        pool = await self._pool(role)
+        async with pool.connection() as conn:
+            started = time.perf_counter()
+            try:
+                # psycopg 3 tracks prepared statements per connection itself; prepare= skips its
+                # five-run warm-up, or keeps it from preparing at all when that is disabled
+                cursor = await conn.execute(query.text, params, prepare=DB_PREPARED_STATEMENTS)
+                rows = await (cursor.fetchone() if one else cursor.fetchall())
+            except Exception:
+                queries.record(query.name, (time.perf_counter() - started) * 1000, 0, failed=True)
+                raise
+            queries.record(query.name, (time.perf_counter() - started) * 1000, cursor.rowcount)
+            return rows
+
+    async def fetch(self, query, params=None, one=False):
+        """Run one registered read; uses the replica when run_db() allowed it, falling back like _checkout()."""
+        if _async_use_replica.get():
+            import psycopg
+            from psycopg_pool import PoolTimeout
+            try:
+                return await self._fetch('replica', query, params, one)
+            except (psycopg.OperationalError, PoolTimeout) as e:
+                _replica_failed(e)
+        return await self._fetch('primary', query, params, one)
+
+    def submit(self, coro):
+        """Schedule `coro` on the background loop from any thread; returns a concurrent Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def stats(self):
+        return {role: pool.get_stats() for role, pool in list(self._pools.items())}
+
+    def close(self):
+        async def close_pools():
+            for pool in self._pools.values():
+                await pool.close()
+            self._pools.clear()
+        self.submit(close_pools()).result(timeout=30)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+_async_db = None
+_async_db_lock = threading.Lock()
+
+
+def get_async_db():
+    global _async_db
+    with _async_db_lock:
+        if _async_db is None or _async_db._pid != os.getpid():
+            _async_db = AsyncDatabase()
+        return _async_db
+
+
+def close_async_db():
+    global _async_db
+    with _async_db_lock:
+        if _async_db is not None and _async_db._pid == os.getpid():
+            _async_db.close()
+        _async_db = None
+
+
+def _reset_async_db_after_fork():
+    # The loop thread does not exist in the child; build a new one on first use
+    global _async_db, _async_db_lock
+    _async_db = None
+    _async_db_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_async_db_after_fork)
+
+
+async def run_db(coro, readonly=True):
+    """
+    Await a repository coroutine on the DB loop. The replica/read-your-writes decision
+    is taken here, in the request, because the DB loop has no access to the session.
+    """
+    use_replica = readonly and _read_from_replica()
+
+    async def routed():
+        _async_use_replica.set(use_replica)
+        return await coro
+    return await asyncio.wrap_future(get_async_db().submit(routed()))
+
+
+# Async repository: same statements as the sync functions above
+async def get_tickets_page_async(after_id=0, limit=TICKETS_PAGE_SIZE):
+    limit = clamp_page_size(limit)
+    rows = await get_async_db().fetch(TICKETS_PAGE_SQL, (after_id, limit + 1))
+    tickets = list(map(Ticket._make, rows[:limit]))
+    return tickets, (tickets[-1].id if len(rows) > limit else None)
+
+
+async def search_tickets_async(query, page=1, limit=TICKETS_PAGE_SIZE):
+    limit = clamp_page_size(limit)
+    page = max(1, int(page))
+    rows = await get_async_db().fetch(SEARCH_TICKETS_SQL, search_params(query, page, limit))
+    return list(map(Ticket._make, rows[:limit])), (page + 1 if len(rows) > limit else None)
+
+
+async def get_ticket_stats_async():
+    return ticket_stats_from_rows(await get_async_db().fetch(TICKET_STATS_SQL))
+
+
+async def get_users_async():
+    return await get_async_db().fetch(LIST_USERS_SQL)
+
+
+async def ping_async():
+    return await get_async_db().fetch(PING_SQL, one=True)
+
+
+async def ticket_table_async(query=''):
+    """ticket_table() for async views, sharing the same fragment cache."""
+    table, key, version = cached_ticket_table(query)
+    if table is not None:
+        return table
+    if query:
+        tickets, next_page = await run_db(search_tickets_async(query))
+        next_page_url = listing_next_url(query=query, page=next_page)
+    else:
+        tickets, next_after_id = await run_db(get_tickets_page_async())
+        next_page_url = listing_next_url(next_after_id)
+    return store_ticket_table(key, version, tickets, next_page_url)
+
+
+# Async views. install_async_views() swaps them in under the sync views' endpoint names,
+# so routes, url_for() and the login check are unchanged.
+async def index_async():
+    query = request.form.get('search_query', '') if request.method == 'POST' else ''
+
+    if request.method == 'GET':
+        logger.info("Dashboard Accessed", extra={
+            "event": "page_view",
+            "page": "dashboard",
+            "user": session.get('username')
+        })
+
+    return render_template(
+        'index.html',
+        **await ticket_table_async(query),
+        search_query=query,
+        active_tab='home',
+        role=session.get('role')
+    )
+
+
+async def search_async():
+    query = request.form.get('search_query', '') if request.method == 'POST' else ''
+    table = await ticket_table_async(query)
+    if query:
+        # --- LOG: Search Query ---
+        logger.info("User performed search", extra={
+            "event": "user_search",
+            "query": query,
+            "results_count": table['ticket_count'],
+            "user": session.get('username')
+        })
+    return render_template('index.html', **table, search_query=query, active_tab='search')
+
+
+async def get_chart_data_async():
+    stats, etag = await ticket_stats_cache.get_async(lambda: run_db(get_ticket_stats_async()))
+    response = jsonify(stats)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    if etag:
+        response.set_etag(etag)
+        response.make_conditional(request)
+    return response
+
+
+async def health_check_async():
+    try:
+        # Probe the primary and, when configured, the replica concurrently
+        probes = [run_db(ping_async(), readonly=False)]
+        if DB_READ_HOST:
+            probes.append(run_db(ping_async()))
+        await asyncio.gather(*probes)
+        return jsonify({'status': 'healthy', 'database': 'connected', 'async_pools': get_async_db().stats()}), 200
+    except Exception as e:
+        # --- LOG: Critical Health Failure ---
+        logger.critical("Health Check Failed", extra={
+            "event": "health_check_failed",
+            "error": str(e)
+        })
+        return jsonify({'status': 'unhealthy', 'error': str(e)}), 503
+
+
+async def existing_users_async():
+    if session.get('role') != 'admin':
+        flash("Unauthorized access", "danger")
+        return redirect(url_for('index'))
+
+    users = await run_db(get_users_async())
+    return jsonify([{'username': row[0], 'role': row[1]} for row in users])
+
+
+ASYNC_VIEWS = {
+    'index': index_async,
+    'search': search_async,
+    'get_chart_data': get_chart_data_async,
+    'health_check': health_check_async,
+    'existing_users': existing_users_async,
+}
+
+
+def install_async_views():
+    """Serve the ASYNC_VIEWS endpoints from their async versions; returns the sync views replaced."""
+    replaced = {endpoint: app.view_functions[endpoint] for endpoint in ASYNC_VIEWS}
+    app.view_functions.update(ASYNC_VIEWS)
+    return replaced
+
+
+if ASYNC_DB:
+    install_async_views()
+# --- ASYNC DATA ACCESS END ---
+
+
+# --- WSGI ENTRY POINT START ---
+# Production serving: gunicorn -c gunicorn.conf.py 'app:create_app()'
+# gunicorn imports this once in the master (preload), calls create_app(), then forks
+# workers; each worker runs init_worker() from the post_fork hook.
+def create_app():
+    """Migrate the schema and hand the WSGI app to the server."""
     try:
         init_db()
     except Exception as e:
         # We use the logger even here for consistency
         logger.warning(f"DB Init Warning (ignore if tables exist): {e}")
+    # Do not carry open sockets across the fork; each worker builds its own pool
+    close_pool()
+    return app
+
+
+def init_worker():
+    """Per-process setup after fork: telemetry exporters, the connection pool and the stats refresher."""
+    # Exporter threads and gRPC channels do not survive fork, so under gunicorn the
+    # SDK is configured here rather than by the opentelemetry-instrument wrapper.
+    sdk_configured = not isinstance(trace.get_tracer_provider(), trace.ProxyTracerProvider)
+    if os.environ.get('OTEL_EXPORTER_OTLP_ENDPOINT') and not sdk_configured:
+        from opentelemetry.instrumentation.auto_instrumentation import initialize
+        from opentelemetry.instrumentation.flask import FlaskInstrumentor
+        initialize()
+        # The app object was built before the Flask class was patched
+        FlaskInstrumentor().instrument_app(app)
+    if ASYNC_DB:
+        get_async_db()  # start the worker's DB event loop before the first request
+    ticket_stats_cache.start_refresher()
+    try:
+        get_pool()
+    except psycopg2.Error as e:
+        # The pool retries on first use; a worker must still boot while the database is down
+        logger.warning("Connection pool warm-up failed", extra={
+            "event": "pool_warmup_failed",
+            "pid": os.getpid(),
+            "error": str(e)
+        })
+# --- WSGI ENTRY POINT END ---
+
+
+# Development server: python app.py (single process, no preload)
+if __name__ == '__main__':
+    create_app()
 
     # nosemgrep: python.flask.security.audit.app-run-param-config.avoid_app_run_with_bad_host
     app.run(host='0.0.0.0', port=5000, debug=False)  # nosec
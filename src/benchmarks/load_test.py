@@ -0,0 +1,204 @@
+"""
+HTTP load test for comparing serving modes.
+
+Starts the app under each requested mode in turn, drives it with concurrent
+keep-alive clients for a fixed duration and prints throughput and latency
+percentiles per mode:
+
+    python benchmarks/load_test.py --modes dev gunicorn --duration 20 --concurrency 32
+
+Modes:
+    dev       python app.py (Flask development server, single process)
+    gunicorn  gunicorn -c gunicorn.conf.py 'app:create_app()'
+
+Both need the usual DB_* environment pointing at a PostgreSQL instance. Use
+--url to load an already running server instead of starting one.
+Standard library only, so it runs inside the application image.
+"""
+import argparse
+import http.client
+import http.cookies
+import json
+import os
+import re
+import statistics
+import subprocess  # nosec B404 - starts the app under test
+import sys
+import threading
+import time
+import urllib.parse
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    'dev': [sys.executable, 'app.py'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:create_app()'],
+}
+
+DEFAULT_PATHS = ['/', '/api/tickets', '/get_chart_data', '/health']
+
+
+def _connection(base_url, timeout=30):
+    parts = urllib.parse.urlsplit(base_url)
+    return http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+
+
+def wait_until_healthy(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = _connection(base_url, timeout=2)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{base_url} did not become healthy within {timeout}s")
+
+
+def login(base_url, username, password):
+    """Log in through the real form (CSRF token included) and return the session Cookie header."""
+    conn = _connection(base_url)
+    conn.request('GET', '/login')
+    response = conn.getresponse()
+    page = response.read().decode()
+    jar = http.cookies.SimpleCookie(response.getheader('Set-Cookie', ''))
+    token = re.search(r'name="csrf_token" value="([^"]+)"', page).group(1)
+
+    body = urllib.parse.urlencode({'username': username, 'password': password, 'csrf_token': token})
+    cookie = '; '.join(f'{k}={m.value}' for k, m in jar.items())
+    conn.request('POST', '/login', body, {'Content-Type': 'application/x-www-form-urlencoded', 'Cookie': cookie})
+    response = conn.getresponse()
+    response.read()
+    jar.load(response.getheader('Set-Cookie', ''))
+    conn.close()
+    return '; '.join(f'{k}={m.value}' for k, m in jar.items())
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies_ms, errors, seconds):
+    ordered = sorted(latencies_ms)
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'requests_per_second': round(len(ordered) / seconds, 1) if seconds else None,
+        'mean_ms': round(statistics.fmean(ordered), 2) if ordered else None,
+        'p50_ms': percentile(ordered, 50),
+        'p95_ms': percentile(ordered, 95),
+        'p99_ms': percentile(ordered, 99),
+    }
+
+
+def run_load(base_url, paths, concurrency, duration, cookie='', make_request=None):
+    """
+    Round-robin `paths` from `concurrency` keep-alive clients for `duration` seconds.
+    Returns {path: {'latencies_ms': [...], 'errors': n}} and the elapsed wall time.
+
+    Entries in `paths` are plain GETs unless `make_request(path, i)` is given; it returns
+    the (method, url, body, extra_headers) to send for the i-th request of that entry.
+    """
+    results = {path: {'latencies_ms': [], 'errors': 0} for path in paths}
+    lock = threading.Lock()
+    headers = {'Cookie': cookie} if cookie else {}
+    stop_at = time.monotonic() + duration
+    make_request = make_request or (lambda path, i: ('GET', path, None, {}))
+
+    def client(offset):
+        conn = _connection(base_url)
+        latencies = {path: [] for path in paths}
+        errors = dict.fromkeys(paths, 0)
+        i = offset
+        while time.monotonic() < stop_at:
+            path = paths[i % len(paths)]
+            method, url, body, extra = make_request(path, i)
+            i += 1
+            started = time.perf_counter()
+            try:
+                conn.request(method, url, body, {**headers, **extra})
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = _connection(base_url)
+                ok = False
+            if ok:
+                latencies[path].append(round((time.perf_counter() - started) * 1000, 3))
+            else:
+                errors[path] += 1
+        conn.close()
+        with lock:
+            for path in paths:
+                results[path]['latencies_ms'].extend(latencies[path])
+                results[path]['errors'] += errors[path]
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.monotonic() - started
+
+
+def benchmark(base_url, args):
+    cookie = login(base_url, args.user, args.password) if args.user else ''
+    # Warm caches and pools so the first mode measured is not penalised
+    run_load(base_url, args.paths, args.concurrency, min(2, args.duration), cookie)
+    results, seconds = run_load(base_url, args.paths, args.concurrency, args.duration, cookie)
+    everything = [ms for r in results.values() for ms in r['latencies_ms']]
+    return {
+        'total': summarize(everything, sum(r['errors'] for r in results.values()), seconds),
+        'routes': {path: summarize(r['latencies_ms'], r['errors'], seconds) for path, r in results.items()},
+    }
+
+
+def start_server(mode):
+    return subprocess.Popen(MODES[mode], cwd=SRC_DIR, stdout=subprocess.DEVNULL)  # nosec B603
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['dev', 'gunicorn'])
+    parser.add_argument('--url', help='load this running server instead of starting one per mode')
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=15, help='seconds per mode')
+    parser.add_argument('--user', default=os.environ.get('BENCH_USER', 'admin'))
+    parser.add_argument('--password', default=os.environ.get('BENCH_PASSWORD', 'admin123'))
+    parser.add_argument('--json', action='store_true', help='print the raw report as JSON')
+    args = parser.parse_args(argv)
+
+    report = {}
+    if args.url:
+        report['url'] = benchmark(args.url, args)
+    else:
+        for mode in args.modes:
+            server = start_server(mode)
+            try:
+                wait_until_healthy('http://127.0.0.1:5000')
+                report[mode] = benchmark('http://127.0.0.1:5000', args)
+            finally:
+                server.terminate()
+                server.wait(timeout=60)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'mode':<10} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for mode, result in report.items():
+        t = {k: str(v) for k, v in result['total'].items()}
+        print(f"{mode:<10} {t['requests_per_second']:>9} {t['p50_ms']:>9} {t['p95_ms']:>9} {t['p99_ms']:>9} "
+              f"{t['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Route latency benchmark against a local PostgreSQL.
+
+Seeds the database pointed at by the usual DB_* environment with a fixed number
+of synthetic tickets, then measures the dashboard, search, chart data and the
+two write routes:
+
+    python benchmarks/suite.py --tickets 100000 --modes client http --duration 20
+
+Modes:
+    client  in-process Flask test client, one request at a time (app + DB cost only)
+    http    concurrent keep-alive clients against gunicorn (see load_test.py), or
+            against an already running server with --url
+
+Each run writes a JSON report (per-route p50/p95/p99, volumes, git commit) to
+benchmarks/results/<commit>.json unless --output says otherwise; pass an earlier
+report to --compare to print the p95 change per route.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import subprocess  # nosec B404 - reads the git commit and starts the app under test
+import sys
+import time
+import urllib.parse
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import load_test  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+ROUTES = ['/', '/search', '/get_chart_data', '/add_ticket', '/update_status']
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+SEARCH_TERMS = ['login', 'disk', 'network', 'printer', 'timeout', 'crash', 'report', 'email']
+
+# Built server side in one statement, so a million rows take seconds rather than a
+# round trip each. Words come from SEARCH_TERMS so /search has something to rank.
+SEED_SQL = '''
+    INSERT INTO tickets (title, description, priority, status, created_at)
+    SELECT 'Bench ' || w.words[1 + g %% 8] || ' issue ' || g,
+           'Users report ' || w.words[1 + g %% 8] || ' and ' || w.words[1 + (g / 8) %% 8] || ' problems',
+           (ARRAY['High', 'Medium', 'Low'])[1 + g %% 3],
+           (ARRAY['Open', 'In Progress', 'Resolved'])[1 + (g / 3) %% 3],
+           now() - make_interval(mins => g)
+    FROM generate_series(1, %s) AS g, (SELECT %s::text[] AS words) AS w
+'''
+
+
+def seed(tickets):
+    """Top the tickets table up to `tickets` rows; returns (row count, min id, max id)."""
+    import app
+    app.init_db()
+    with app.db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT count(*) FROM tickets')
+        missing = tickets - cursor.fetchone()[0]
+        if missing > 0:
+            started = time.perf_counter()
+            cursor.execute(SEED_SQL, (missing, SEARCH_TERMS))
+            conn.commit()
+            print(f"seeded {missing} tickets in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+            cursor.execute('ANALYZE tickets')
+            conn.commit()
+        cursor.execute('SELECT count(*), min(id), max(id) FROM tickets')
+        return cursor.fetchone()
+
+
+def request_for(route, i, ids, csrf=''):
+    """(method, url, form) for the i-th request to `route`; writes touch random seeded tickets."""
+    rng = random.Random(i)  # nosec B311 - workload shape, not security
+    if route == '/search':
+        return 'POST', route, {'search_query': SEARCH_TERMS[i % len(SEARCH_TERMS)], 'csrf_token': csrf}
+    if route == '/add_ticket':
+        return 'POST', route, {'title': f'Bench add {i}', 'description': 'Created by the benchmark',
+                               'priority': ('High', 'Medium', 'Low')[i % 3], 'csrf_token': csrf}
+    if route == '/update_status':
+        status = ('Open', 'In Progress', 'Resolved')[i % 3]
+        return 'GET', f'/update_status/{rng.randint(*ids)}/{urllib.parse.quote(status)}', None
+    return 'GET', route, None
+
+
+def run_client(routes, iterations, ids):
+    """Drive each route `iterations` times through the Flask test client."""
+    import app
+    app.app.config['WTF_CSRF_ENABLED'] = False
+    # FLASK_SECRET_KEY is only needed to share sessions with a server; any key works in-process
+    app.app.secret_key = app.app.secret_key or os.urandom(24).hex()
+    client = app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+        sess['role'] = 'admin'
+
+    report = {}
+    for route in routes:
+        latencies, errors, spent = [], 0, 0.0
+        for i in range(-min(10, iterations), iterations):  # negative i: warm-up, not recorded
+            method, url, form = request_for(route, i, ids)
+            started = time.perf_counter()
+            response = client.open(url, method=method, data=form)
+            elapsed = time.perf_counter() - started
+            if i < 0:
+                continue
+            spent += elapsed
+            if response.status_code < 400:
+                latencies.append(round(elapsed * 1000, 3))
+            else:
+                errors += 1
+        report[route] = load_test.summarize(latencies, errors, spent)
+    return {'routes': report}
+
+
+def run_http(base_url, routes, args, ids):
+    cookie = load_test.login(base_url, args.user, args.password)
+    conn = load_test._connection(base_url)
+    conn.request('GET', '/', headers={'Cookie': cookie})
+    match = re.search(r'name="csrf_token" value="([^"]+)"', conn.getresponse().read().decode())
+    conn.close()
+    token = match.group(1) if match else ''
+
+    def make_request(route, i):
+        method, url, form = request_for(route, i, ids, token)
+        if form is None:
+            return method, url, None, {}
+        return method, url, urllib.parse.urlencode(form), {'Content-Type': 'application/x-www-form-urlencoded'}
+
+    load_test.run_load(base_url, routes, args.concurrency, min(2, args.duration), cookie, make_request)
+    results, seconds = load_test.run_load(base_url, routes, args.concurrency, args.duration, cookie, make_request)
+    everything = [ms for r in results.values() for ms in r['latencies_ms']]
+    return {
+        'concurrency': args.concurrency,
+        'total': load_test.summarize(everything, sum(r['errors'] for r in results.values()), seconds),
+        'routes': {route: load_test.summarize(r['latencies_ms'], r['errors'], seconds) for route, r in results.items()},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,  # nosec
+                              check=True, cwd=load_test.SRC_DIR).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(report, baseline):
+    print(f"\n{'mode':<7} {'route':<16} {'base p95':>9} {'p95':>9} {'change':>8}")
+    for mode, result in report['modes'].items():
+        before = baseline.get('modes', {}).get(mode, {}).get('routes', {})
+        for route, stats in result['routes'].items():
+            old, new = before.get(route, {}).get('p95_ms'), stats['p95_ms']
+            change = f"{(new - old) / old:+.0%}" if old and new is not None else '-'
+            print(f"{mode:<7} {route:<16} {str(old):>9} {str(new):>9} {change:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--tickets', type=int, default=10_000, help='rows to seed before measuring (e.g. 10000-1000000)')
+    parser.add_argument('--modes', nargs='+', choices=['client', 'http'], default=['client', 'http'])
+    parser.add_argument('--routes', nargs='+', choices=ROUTES, default=ROUTES)
+    parser.add_argument('--iterations', type=int, default=200, help='requests per route in client mode')
+    parser.add_argument('--url', help='http mode: load this running server instead of starting gunicorn')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=15, help='http mode: seconds of load')
+    parser.add_argument('--user', default=os.environ.get('BENCH_USER', 'admin'))
+    parser.add_argument('--password', default=os.environ.get('BENCH_PASSWORD', 'admin123'))
+    parser.add_argument('--output', help='report path (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', metavar='REPORT', help='earlier JSON report to compare p95 against')
+    parser.add_argument('--allow-remote', action='store_true', help='seed and load a non-local DB_HOST')
+    args = parser.parse_args(argv)
+
+    db_host = os.environ.get('DB_HOST', 'localhost')
+    if db_host not in LOCAL_HOSTS and not args.allow_remote:
+        parser.error(f"DB_HOST={db_host} is not local; this writes benchmark tickets, pass --allow-remote to proceed")
+
+    count, min_id, max_id = seed(args.tickets)
+    ids = (min_id, max_id)
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'tickets': count,
+        'modes': {},
+    }
+
+    if 'client' in args.modes:
+        report['modes']['client'] = run_client(args.routes, args.iterations, ids)
+    if 'http' in args.modes:
+        if args.url:
+            report['modes']['http'] = run_http(args.url, args.routes, args, ids)
+        else:
+            server = load_test.start_server('gunicorn')
+            try:
+                load_test.wait_until_healthy('http://127.0.0.1:5000')
+                report['modes']['http'] = run_http('http://127.0.0.1:5000', args.routes, args, ids)
+            finally:
+                server.terminate()
+                server.wait(timeout=60)
+
+    output = args.output or os.path.join(RESULTS_DIR, f'{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{count} tickets, commit {commit}")
+    print(f"{'mode':<7} {'route':<16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for mode, result in report['modes'].items():
+        for route, s in result['routes'].items():
+            print(f"{mode:<7} {route:<16} {str(s['p50_ms']):>9} {str(s['p95_ms']):>9} {str(s['p99_ms']):>9} "
+                  f"{s['errors']:>7}")
+    print(f"report written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Memory/throughput microbenchmark for ticket result sets.
+
+Compares the old row handling (a RealDictCursor dict per row, then a tuple copy
+of each dict for the template) with building app.Ticket records straight from
+the plain tuples a default cursor returns:
+
+    python benchmarks/ticket_rows.py --rows 100000
+
+Rows are synthetic, so no database is needed. Peak is the highest traced
+allocation while building the result set; retained is what is still held once
+the intermediate list is dropped (what a request keeps alive while rendering).
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import Ticket  # noqa: E402
+
+COLUMNS = ('id', 'title', 'description', 'priority', 'status', 'created_at', 'occurrences')
+PRIORITIES = ('Low', 'Medium', 'High')
+STATUSES = ('Open', 'In Progress', 'Resolved')
+
+
+def synthetic_rows(count):
+    start = datetime(2024, 1, 1)
+    return [
+        (i, f'Ticket {i}', f'Description of ticket {i}', PRIORITIES[i % 3], STATUSES[i % 3],
+         start + timedelta(minutes=i), 1)
+        for i in range(1, count + 1)
+    ]
+
+
+def dict_rows_then_tuples(rows):
+    """What the listing functions used to do: RealDictCursor rows, copied into tuples."""
+    dict_rows = [dict(zip(COLUMNS, row)) for row in rows]
+    tickets = [(t['id'], t['title'], t['description'], t['priority'], t['status'], t['created_at'], t['occurrences'])
+               for t in dict_rows]
+    return dict_rows, tickets
+
+
+def ticket_records(rows):
+    tickets = list(map(Ticket._make, rows))
+    return None, tickets
+
+
+STRATEGIES = {
+    'dict+tuple': dict_rows_then_tuples,
+    'Ticket': ticket_records,
+}
+
+
+def measure(build, rows, repeat):
+    gc.collect()
+    tracemalloc.start()
+    intermediate, tickets = build(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    del intermediate
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tickets
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        build(rows)
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    return {
+        'peak_mib': round(peak / 2**20, 2),
+        'retained_mib': round(retained / 2**20, 2),
+        'best_seconds': round(best, 4),
+        'rows_per_second': round(len(rows) / best),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per strategy (best is reported)')
+    parser.add_argument('--json', action='store_true', help='print the raw report as JSON')
+    args = parser.parse_args(argv)
+
+    rows = synthetic_rows(args.rows)
+    report = {name: measure(build, rows, args.repeat) for name, build in STRATEGIES.items()}
+
+    if args.json:
+        print(json.dumps({'rows': args.rows, 'results': report}, indent=2))
+        return
+
+    print(f"{args.rows} rows")
+    print(f"{'strategy':<12} {'peak MiB':>9} {'kept MiB':>9} {'rows/s':>11}")
+    for name, r in report.items():
+        print(f"{name:<12} {r['peak_mib']:>9} {r['retained_mib']:>9} {r['rows_per_second']:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# Gunicorn settings for the ticketing app.
+#
+#   gunicorn -c gunicorn.conf.py 'app:create_app()'
+#
+# Every value can be overridden from the environment (see the GUNICORN_* names below,
+# plus WEB_CONCURRENCY for the worker count). Send SIGHUP to the master for a graceful
+# reload of the workers; with preload on, a code change needs a full restart instead.
+import math
+import os
+import shutil
+import tempfile
+
+
+def cpu_limit():
+    """CPUs this container may actually use: the cgroup quota if one is set, else the affinity mask."""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return len(os.sched_getaffinity(0))
+
+
+cpus = cpu_limit()
+
+# Every worker writes its Prometheus samples to files here and /metrics merges them, so a
+# scrape reports the whole pod whichever worker answers it. prometheus_client reads this when
+# the app is imported, which happens after this file is loaded.
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR',
+                                    os.path.join(tempfile.gettempdir(), 'ticketing-app-metrics'))
+os.makedirs(metrics_dir, exist_ok=True)
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')  # nosec B104 - the container must accept Service traffic
+
+# Processes give parallelism on CPU-bound work (templates, hashing); threads keep a worker
+# busy while its requests wait on PostgreSQL. Each open /events stream parks one thread, and
+# the app caps those at half (SSE_MAX_STREAMS); keep DB_POOL_MAX_SIZE >= the other half.
+workers = int(os.environ.get('WEB_CONCURRENCY', 2 * cpus + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import the app once in the master and fork it: faster boots and shared read-only memory.
+# app.create_app() closes its pool before the fork and post_fork rebuilds per-worker state.
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Longer than the ingress/load balancer idle timeout (nginx: 60s), so the proxy, not
+# gunicorn, closes idle upstream connections and never reuses one we just dropped.
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 75))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+# Matches the Kubernetes default terminationGracePeriodSeconds so in-flight requests finish
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Recycle workers now and then to cap slow leaks; jitter avoids restarting them all at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+reload = os.environ.get('GUNICORN_RELOAD', 'false').lower() == 'true'  # development only
+
+# The app logs JSON to stdout itself; keep gunicorn's own error log there too
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    # Files left by an earlier master would be summed into this one's counters
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges; its counters and histograms stay in the totals
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid, metrics_dir)
+
+
+def post_fork(server, worker):
+    import app
+    app.init_worker()
+    server.log.info("Worker %s ready (%s threads)", worker.pid, threads)
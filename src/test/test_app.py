@@ -1,13 +1,18 @@
 import pytest
+import io
+import json
 import sys
 import os
+import threading
 import psycopg2
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+from datetime import datetime
 from werkzeug.security import generate_password_hash
 
 
 # 1. SETUP: Add parent directory to path to import 'app.py'
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app as app_module  # noqa: E402
 from app import app  # noqa: E402
 
 
@@ -17,6 +22,9 @@ def client():
     app.config['TESTING'] = True
     app.config['WTF_CSRF_ENABLED'] = False  # Disable CSRF for testing
     app.secret_key = os.urandom(24).hex()
+    # Every test client logs in from 127.0.0.1; start each test with full login buckets
+    app_module.login_ip_limiter.reset()
+    app_module.login_user_limiter.reset()
     with app.test_client() as client:
         yield client
 
@@ -34,8 +42,28 @@ def mock_db():
         mock_connect.return_value = mock_conn
         # Configure conn.cursor() to return mock_cursor
         mock_conn.cursor.return_value = mock_cursor
-
+        # psycopg2 reports an open connection as closed == 0
+        mock_conn.closed = 0
+        # Like a real cursor: knows its connection and reports how many rows the last statement had
+        mock_cursor.connection = mock_conn
+        mock_cursor.rowcount = 0
+
+        # Start every test with an empty pool so it picks up this mock connection
+        app_module.close_pool()
+        app_module.ticket_stats_cache.invalidate()
+        app_module.ticket_table_cache.bump()
+        app_module.fingerprint_index.clear()
         yield mock_cursor
+        app_module.close_pool()
+
+
+def executed_sql(call):
+    """SQL text of one cursor.execute() call; EXECUTE of a prepared statement maps back to its registered SQL."""
+    statement = str(call.args[0])
+    for query in app_module.queries:
+        if statement == query.execute:
+            return query.text
+    return statement
 
 
 # Helper function to find specific SQL statements in the execution history
@@ -44,12 +72,11 @@ def assert_sql_executed(mock_cursor, partial_query):
     Iterates through all calls to cursor.execute() and returns True
     if any of them contain the partial_query string.
     """
-    calls = mock_cursor.execute.call_args_list
-    query_found = any(partial_query in str(call.args[0]) for call in calls)
+    executed_queries = [executed_sql(call) for call in mock_cursor.execute.call_args_list]
+    query_found = any(partial_query in query for query in executed_queries)
 
     if not query_found:
         # Print executed queries for debugging if assertion fails
-        executed_queries = [str(call.args[0]) for call in calls]
         print(f"\n[DEBUG] Expected SQL containing: '{partial_query}'")
         print(f"[DEBUG] Actual SQL executed: {executed_queries}")
 
@@ -112,12 +139,9 @@ def test_dashboard_loads_tickets(client, mock_db):
         sess['username'] = 'admin'
         sess['role'] = 'admin'
 
-    # Prepare mock data for RealDictCursor behavior simulation
-    # Note: In the actual app, you use RealDictCursor, but MagicMock usually returns tuples/lists.
-    # For this test, verifying the data presence is enough.
+    # Rows arrive as plain tuples in column order (id, title, description, priority, status, created_at)
     mock_tickets = [
-        {'id': 1, 'title': 'Test Ticket', 'description': 'Desc',
-         'priority': 'High', 'status': 'Open', 'created_at': '2025-01-01'}
+        (1, 'Test Ticket', 'Desc', 'High', 'Open', '2025-01-01', 1)
     ]
     mock_db.fetchall.return_value = mock_tickets
 
@@ -182,9 +206,9 @@ def test_edit_ticket_logic(client, mock_db):
         sess['role'] = 'admin'
 
     # Mock fetching the ticket (GET)
-    mock_ticket = {'id': 1, 'title': 'Old Title', 'description': 'Old Desc',
-                   'priority': 'Low', 'status': 'Open', 'created_at': '2025-01-01'}
-    mock_db.fetchone.return_value = mock_ticket
+    mock_ticket = (1, 'Old Title', 'Old Desc', 'Low', 'Open', '2025-01-01', 1)
+    # First fetch loads the ticket, the second is the UPDATE ... RETURNING old priority and fingerprints
+    mock_db.fetchone.side_effect = [mock_ticket, ('Low', None, None)]
 
     client.post('/edit_ticket/1', data={
         'title': 'Updated Title',
@@ -239,28 +263,47 @@ def test_search_functionality(client, mock_db):
         sess['role'] = 'admin'
 
     mock_tickets = [
-        {'id': 1, 'title': 'Found Me', 'description': 'Desc',
-         'priority': 'Low', 'status': 'Open', 'created_at': '2025-01-01'}
+        (1, 'Found Me', 'Desc', 'Low', 'Open', '2025-01-01', 1)
     ]
     mock_db.fetchall.return_value = mock_tickets
 
     client.post('/search', data={'search_query': 'Found'}, follow_redirects=True)
 
-    # Verify the correct SQL query was generated
-    assert_sql_executed(mock_db, "SELECT * FROM tickets WHERE title ILIKE")  # nosec
+    # Verify the ranked full-text + trigram query was generated
+    assert_sql_executed(mock_db, "WHERE search_vector @@ tsq OR title ILIKE")  # nosec
+    params = mock_db.execute.call_args.args[1]
+    assert params['q'] == 'Found' and params['pattern'] == '%Found%'  # nosec
+
+
+def test_search_api_paginates_ranked_results(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+
+    mock_db.fetchall.return_value = [
+        (i, 'disk 100%', 'D', 'Low', 'Open', '2025-01-01', 1) for i in (9, 8, 7)
+    ]
+
+    response = client.get('/api/tickets?q=100%25_&page=2&limit=2')
+    assert [t['id'] for t in response.json['tickets']] == [9, 8]  # nosec
+    assert response.json['next_page'] == 3  # nosec
+    assert 'page=3' in response.json['next_url']  # nosec
+    params = mock_db.execute.call_args.args[1]
+    # LIKE wildcards typed by the user are matched literally
+    assert params['pattern'] == '%100\\%\\_%'  # nosec
+    assert (params['limit'], params['offset']) == (3, 2)  # nosec
 
 
 def test_chart_data_api(client, mock_db):
     with client.session_transaction() as sess:
         sess['username'] = 'admin'
 
-    mock_tickets = [
-        {'id': 1, 'title': 'A', 'description': 'D', 'priority': 'High',
-         'status': 'Open', 'created_at': '...'},
-        {'id': 2, 'title': 'B', 'description': 'D', 'priority': 'Low',
-         'status': 'Resolved', 'created_at': '...'}
+    # GROUPING SETS rows: (priority, status, grouped_by_status, count)
+    mock_db.fetchall.return_value = [
+        ('High', None, 0, 1),
+        ('Low', None, 0, 1),
+        (None, 'Open', 1, 1),
+        (None, 'Resolved', 1, 1),
     ]
-    mock_db.fetchall.return_value = mock_tickets
 
     response = client.get('/get_chart_data')
     assert response.status_code == 200  # nosec
@@ -268,6 +311,68 @@ def test_chart_data_api(client, mock_db):
 
     assert json_data['priority_counts']['High'] == 1  # nosec
     assert json_data['status_counts']['Resolved'] == 1  # nosec
+    assert_sql_executed(mock_db, "GROUP BY GROUPING SETS")
+    # Only the aggregate query runs - no full ticket fetch
+    assert not any('SELECT *' in str(c.args[0]) for c in mock_db.execute.call_args_list)  # nosec
+
+
+def test_tickets_api_keyset_pagination(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+
+    # limit=2 fetches 3 rows; the extra row only signals that another page exists
+    mock_db.fetchall.return_value = [
+        (i, f'T{i}', 'D', 'Low', 'Open', '2025-01-01', 1) for i in (11, 12, 13)
+    ]
+
+    response = client.get('/api/tickets?after_id=10&limit=2')
+    assert response.status_code == 200  # nosec
+    assert [t['id'] for t in response.json['tickets']] == [11, 12]  # nosec
+    assert response.json['next_after_id'] == 12  # nosec
+    assert_sql_executed(mock_db, "WHERE id > %s ORDER BY id ASC LIMIT %s")
+    assert mock_db.execute.call_args.args[1] == (10, 3)  # nosec
+
+
+def test_tickets_api_last_page(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+
+    mock_db.fetchall.return_value = [(5, 'Last', 'D', 'Low', 'Open', '2025-01-01', 1)]
+
+    response = client.get('/api/tickets?after_id=4')
+    assert response.json['next_after_id'] is None  # nosec
+    assert client.get('/api/tickets?after_id=abc').status_code == 400  # nosec
+
+
+def test_chart_data_etag_not_modified(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+
+    mock_db.fetchall.return_value = [('High', None, 0, 2), (None, 'Open', 1, 2)]
+
+    first = client.get('/get_chart_data')
+    etag = first.headers['ETag']
+    second = client.get('/get_chart_data', headers={'If-None-Match': etag})
+
+    assert second.status_code == 304  # nosec
+    # The second request is served from the stats cache without touching the database
+    grouping_calls = [c for c in mock_db.execute.call_args_list if 'GROUPING SETS' in str(c.args[0])]
+    assert len(grouping_calls) == 1  # nosec
+
+
+def test_stats_cache_applies_write_deltas(mock_db):
+    mock_db.fetchall.return_value = [('High', None, 0, 2), ('Low', None, 0, 1),
+                                     (None, 'Open', 1, 3)]
+    stats, etag = app_module.ticket_stats_cache.get()
+
+    app_module.add_ticket('Disk full', 'Node 3', 'Low')
+    mock_db.fetchone.return_value = ('Open',)
+    app_module.update_ticket_status(1, 'Resolved')
+
+    updated, new_etag = app_module.ticket_stats_cache.get()
+    assert updated['priority_counts'] == {'High': 2, 'Low': 2}  # nosec
+    assert updated['status_counts'] == {'Open': 3, 'Resolved': 1}  # nosec
+    assert new_etag != etag  # nosec
 
 
 def test_incident_route(client, mock_db):
@@ -275,8 +380,7 @@ def test_incident_route(client, mock_db):
         sess['username'] = 'admin'
         sess['role'] = 'admin'
 
-    mock_tickets = [{'id': 1, 'title': 'Incident Ticket', 'description': 'Desc',
-                     'priority': 'High', 'status': 'Open', 'created_at': '2025-01-01'}]
+    mock_tickets = [(1, 'Incident Ticket', 'Desc', 'High', 'Open', '2025-01-01', 1)]
     mock_db.fetchall.return_value = mock_tickets
 
     response = client.get('/incident')
@@ -289,8 +393,7 @@ def test_home_route(client, mock_db):
         sess['username'] = 'admin'
         sess['role'] = 'admin'
 
-    mock_tickets = [{'id': 1, 'title': 'Home Ticket', 'description': 'Desc',
-                     'priority': 'Low', 'status': 'Open', 'created_at': '2025-01-01'}]
+    mock_tickets = [(1, 'Home Ticket', 'Desc', 'Low', 'Open', '2025-01-01', 1)]
     mock_db.fetchall.return_value = mock_tickets
 
     response = client.get('/home')
@@ -324,8 +427,7 @@ def test_index_authenticated(client, mock_db):
         sess['username'] = 'admin'
         sess['role'] = 'admin'
 
-    mock_tickets = [{'id': 1, 'title': 'Auth Ticket', 'description': 'Desc',
-                     'priority': 'Medium', 'status': 'In Progress', 'created_at': '2025-01-01'}]
+    mock_tickets = [(1, 'Auth Ticket', 'Desc', 'Medium', 'In Progress', '2025-01-01', 1)]
     mock_db.fetchall.return_value = mock_tickets
 
     response = client.get('/')
@@ -338,8 +440,7 @@ def test_search_empty_query(client, mock_db):
         sess['username'] = 'admin'
         sess['role'] = 'admin'
 
-    mock_tickets = [{'id': 1, 'title': 'Empty Search', 'description': 'Desc',
-                     'priority': 'Low', 'status': 'Open', 'created_at': '2025-01-01'}]
+    mock_tickets = [(1, 'Empty Search', 'Desc', 'Low', 'Open', '2025-01-01', 1)]
     mock_db.fetchall.return_value = mock_tickets
 
     response = client.post('/search', data={'search_query': ''}, follow_redirects=True)
@@ -370,9 +471,9 @@ def test_edit_ticket_logic_enhanced(client, mock_db):
         sess['role'] = 'admin'
 
     # Mock fetching the ticket (GET)
-    mock_ticket = {'id': 1, 'title': 'Old Title', 'description': 'Old Desc',
-                   'priority': 'Low', 'status': 'Open', 'created_at': '2025-01-01'}
-    mock_db.fetchone.return_value = mock_ticket
+    mock_ticket = (1, 'Old Title', 'Old Desc', 'Low', 'Open', '2025-01-01', 1)
+    # First fetch loads the ticket, the second is the UPDATE ... RETURNING old priority and fingerprints
+    mock_db.fetchone.side_effect = [mock_ticket, ('Low', None, None)]
 
     client.post('/edit_ticket/1', data={
         'title': 'Updated Title',
@@ -382,7 +483,7 @@ def test_edit_ticket_logic_enhanced(client, mock_db):
 
     # Enhanced: Check full UPDATE query
     assert_sql_executed(mock_db,
-                        "UPDATE tickets SET title = %s, description = %s, priority = %s WHERE id = %s")
+                        "UPDATE tickets SET title = %(title)s, description = %(description)s, priority = %(priority)s")
 
 
 def test_manage_users_add_duplicate(client, mock_db):
@@ -429,8 +530,7 @@ def test_edit_ticket_get_form(client, mock_db):
         sess['role'] = 'admin'
 
     # Mock fetching the ticket for GET request
-    mock_ticket = {'id': 1, 'title': 'Test Ticket', 'description': 'Desc',
-                   'priority': 'High', 'status': 'Open', 'created_at': '2025-01-01'}
+    mock_ticket = (1, 'Test Ticket', 'Desc', 'High', 'Open', '2025-01-01', 1)
     mock_db.fetchone.return_value = mock_ticket
 
     response = client.get('/edit_ticket/1')
@@ -522,3 +622,1193 @@ def test_existing_users_unauthorized(client, mock_db):
 
     response = client.get('/existing_users', follow_redirects=True)
     assert b'Unauthorized access' in response.data  # nosec
+
+
+# ----------------------------------------------------------------------
+# 7. TESTS: Connection Pool
+# ----------------------------------------------------------------------
+
+
+def _fake_conn():
+    conn = MagicMock()
+    conn.closed = 0
+    conn.get_transaction_status.return_value = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    return conn
+
+
+def test_pool_reuses_connections():
+    factory = MagicMock(side_effect=lambda: _fake_conn())
+    pool = app_module.ConnectionPool(factory, min_size=1, max_size=2, timeout=0.1)
+
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn  # nosec
+    assert factory.call_count == 1  # nosec
+    assert pool.stats()['in_use'] == 1  # nosec
+
+
+def test_pool_checkout_timeout():
+    pool = app_module.ConnectionPool(_fake_conn, min_size=0, max_size=1, timeout=0.05)
+    pool.getconn()
+
+    with pytest.raises(psycopg2.pool.PoolError):
+        pool.getconn()
+    assert pool.stats()['timeouts'] == 1  # nosec
+
+
+def test_pool_replaces_stale_connection():
+    pool = app_module.ConnectionPool(_fake_conn, min_size=1, max_size=1, timeout=0.1, check_interval=0)
+    stale = pool.getconn()
+    stale.cursor.return_value.execute.side_effect = psycopg2.OperationalError
+    pool.putconn(stale)
+
+    fresh = pool.getconn()
+    assert fresh is not stale  # nosec
+    stale.close.assert_called_once()
+
+
+def test_pool_closeall_closes_checked_out_connections_on_return():
+    pool = app_module.ConnectionPool(_fake_conn, min_size=2, max_size=2, timeout=0.1)
+    busy = pool.getconn()
+    idle = pool.getconn()
+    pool.putconn(idle)
+
+    pool.closeall()
+    idle.close.assert_called_once()
+    busy.close.assert_not_called()  # still serving its request
+
+    pool.putconn(busy)
+    busy.close.assert_called_once()
+    assert pool.stats()['in_use'] == 0 and pool.stats()['idle'] == 0  # nosec
+    with pytest.raises(psycopg2.pool.PoolError, match='closed'):
+        pool.getconn()
+
+
+def test_pool_discards_connection_after_operational_error(mock_db):
+    mock_db.execute.side_effect = psycopg2.OperationalError
+    with pytest.raises(psycopg2.OperationalError):
+        app_module.get_ticket_by_id(1)
+    assert app_module.get_pool().stats()['idle'] == 0  # nosec
+
+
+def test_health_check_reports_pool_stats(client, mock_db):
+    response = client.get('/health')
+    assert response.json['pool']['max_size'] >= 1  # nosec
+
+
+# ----------------------------------------------------------------------
+# 8. TESTS: Schema Migrations
+# ----------------------------------------------------------------------
+
+
+def test_run_migrations_applies_only_pending_steps(mock_db):
+    mock_db.fetchone.return_value = (2,)  # versions 1 and 2 already applied
+
+    applied = app_module.run_migrations(app_module.get_pool().getconn())
+
+    assert applied == [3, 4, 5, 6, 7, 8, 9]  # nosec
+    assert_sql_executed(mock_db, "pg_advisory_lock")
+    assert_sql_executed(mock_db, "CREATE INDEX IF NOT EXISTS idx_tickets_status_priority")
+    assert_sql_executed(mock_db, "pg_advisory_unlock")
+    executed = [str(c.args[0]) for c in mock_db.execute.call_args_list]
+    assert not any('CREATE EXTENSION' in q for q in executed)  # nosec
+
+
+def test_init_db_uses_existence_checks(mock_db):
+    mock_db.fetchone.return_value = (len(app_module.MIGRATIONS),)
+
+    app_module.init_db()
+
+    assert_sql_executed(mock_db, "SELECT EXISTS (SELECT 1 FROM tickets)")
+    executed = [str(c.args[0]) for c in mock_db.execute.call_args_list]
+    assert not any('COUNT(*)' in q for q in executed)  # nosec
+    mock_db.executemany.assert_not_called()
+
+
+# ----------------------------------------------------------------------
+# 9. TESTS: Bulk Import
+# ----------------------------------------------------------------------
+
+
+def test_import_tickets_csv_uses_copy(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+        sess['role'] = 'admin'
+
+    csv_data = (b"title,description,priority\nDisk full,Node 3,High\n,missing title,Low\nCPU,Spike,Critical\n"
+                b"No description,,Low\n")
+    mock_db.fetchone.return_value = (2,)  # tickets created by the batch upsert
+    response = client.post('/import_tickets', data={'file': (io.BytesIO(csv_data), 'alerts.csv')},
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 200  # nosec
+    assert response.json['imported'] == 2 and response.json['duplicates'] == 0  # nosec
+    assert response.json['errors'] == [{'line': 3, 'error': 'title is required'},
+                                       {'line': 5, 'error': 'description is required'}]  # nosec
+    copy_sql, buffer = mock_db.copy_expert.call_args.args
+    assert 'COPY ticket_import' in copy_sql  # nosec
+    rows = buffer.getvalue().splitlines()
+    # Priority is validated exactly like add_ticket: unknown values become Low
+    assert rows[1].startswith('CPU,Spike,Low,Open,')  # nosec
+    # Imported rows carry the same fingerprint add_ticket would give them
+    assert rows[1].endswith(',' + app_module.ticket_fingerprint('CPU', 'Spike'))  # nosec
+    assert_sql_executed(mock_db, "ON CONFLICT (fingerprint) WHERE status <> 'Resolved'")
+
+
+def test_import_counts_repeats_instead_of_duplicating(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+        sess['role'] = 'admin'
+
+    ndjson = b'{"title": "Disk full", "description": "node 3"}\n{"title": "disk  FULL", "description": "Node 3"}\n'
+    mock_db.fetchone.return_value = (1,)  # both rows folded into one new ticket
+    response = client.post('/import_tickets', data={'file': (io.BytesIO(ndjson), 'alerts.ndjson')},
+                           content_type='multipart/form-data')
+
+    assert response.json['imported'] == 2 and response.json['duplicates'] == 1  # nosec
+    fingerprints = {row.rsplit(',', 1)[1] for row in mock_db.copy_expert.call_args.args[1].getvalue().splitlines()}
+    assert len(fingerprints) == 1  # nosec
+
+
+def test_import_tickets_ndjson_reports_bad_lines(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+        sess['role'] = 'admin'
+
+    ndjson = b'{"title": "A", "description": "B", "priority": "Medium"}\nnot json\n[1]\n'
+    mock_db.fetchone.return_value = (1,)
+    response = client.post('/import_tickets', data={'file': (io.BytesIO(ndjson), 'alerts.ndjson')},
+                           content_type='multipart/form-data')
+
+    assert response.json['imported'] == 1  # nosec
+    assert [e['line'] for e in response.json['errors']] == [2, 3]  # nosec
+
+
+def test_import_tickets_unauthorized(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'viewer'
+        sess['role'] = 'readonly'
+
+    response = client.post('/import_tickets', data={'file': (io.BytesIO(b'title\nx\n'), 'a.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 403  # nosec
+    mock_db.copy_expert.assert_not_called()
+
+
+# ----------------------------------------------------------------------
+# 10. TESTS: Streaming Export
+# ----------------------------------------------------------------------
+
+
+def test_export_csv_streams_server_side_cursor(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'viewer'
+        sess['role'] = 'readonly'
+
+    mock_db.fetchmany.side_effect = [
+        [(1, 'Disk full', 'Node 3', 'High', 'Open', '2025-07-20 10:00:00')],
+        [(2, 'CPU, spike', 'Node 4', 'Low', 'Open', '2025-07-21 10:00:00')],
+        [],
+    ]
+
+    response = client.get('/export?format=csv&status=Open&created_from=2025-07-20&created_to=2025-07-21')
+
+    assert response.status_code == 200  # nosec
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == 'id,title,description,priority,status,created_at'  # nosec
+    assert lines[2].startswith('2,"CPU, spike"')  # nosec
+    _, kwargs = app_module.get_pool().getconn().cursor.call_args
+    assert kwargs['name'] == 'ticket_export'  # nosec
+    query, params = mock_db.execute.call_args.args
+    assert params[0] == 'Open'  # nosec
+    assert params[2] == app_module.datetime(2025, 7, 22)  # nosec
+
+
+def test_export_ndjson(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+
+    mock_db.fetchmany.side_effect = [[(1, 'A', 'D', 'Low', 'Resolved', '2025-07-20 10:00:00')], []]
+
+    response = client.get('/export?format=ndjson')
+    assert response.mimetype == 'application/x-ndjson'  # nosec
+    assert json.loads(response.get_data(as_text=True).splitlines()[0])['status'] == 'Resolved'  # nosec
+
+
+def test_export_rejects_bad_filters(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+
+    assert client.get('/export?status=Closed').status_code == 400  # nosec
+    assert client.get('/export?created_from=yesterday').status_code == 400  # nosec
+    assert client.get('/export?format=xml').status_code == 400  # nosec
+
+
+# ----------------------------------------------------------------------
+# 11. TESTS: Bulk Status Updates
+# ----------------------------------------------------------------------
+
+
+def test_bulk_update_status_by_ids(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+        sess['role'] = 'admin'
+
+    mock_db.fetchall.return_value = [(1, 'Open'), (2, 'In Progress')]
+
+    with patch.object(app_module.logger, 'info') as mock_log:
+        response = client.post('/bulk_update_status', json={'status': 'Resolved', 'ticket_ids': [1, 2, 3]})
+
+    assert response.status_code == 200  # nosec
+    assert response.json['ticket_ids'] == [1, 2]  # nosec
+    update_calls = [c for c in mock_db.execute.call_args_list if 'UPDATE tickets SET status' in str(c.args[0])]
+    assert len(update_calls) == 1  # nosec
+    assert update_calls[0].args[1] == [[1, 2, 3], 'Resolved', 'Resolved']  # nosec
+    events = [c.kwargs['extra'] for c in mock_log.call_args_list if c.kwargs.get('extra', {}).get('event') == 'status_change']
+    assert len(events) == 1 and events[0]['updated_count'] == 2  # nosec
+
+
+def test_bulk_update_status_by_filter(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+        sess['role'] = 'admin'
+
+    mock_db.fetchall.return_value = []
+    response = client.post('/bulk_update_status', json={'status': 'Resolved', 'filter': {'priority': 'Low'}})
+
+    assert response.status_code == 200  # nosec
+    assert mock_db.execute.call_args.args[1] == ['Low', 'Resolved', 'Resolved']  # nosec
+
+
+def test_bulk_update_status_rejects_bad_requests(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+        sess['role'] = 'admin'
+
+    assert client.post('/bulk_update_status', json={'status': 'Closed', 'ticket_ids': [1]}).status_code == 400  # nosec
+    assert client.post('/bulk_update_status', json={'status': 'Open', 'ticket_ids': ['1']}).status_code == 400  # nosec
+    assert client.post('/bulk_update_status', json={'status': 'Open', 'filter': {}}).status_code == 400  # nosec
+    mock_db.execute.assert_not_called()
+
+
+def test_bulk_update_status_works_with_csrf_enabled(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+        sess['role'] = 'admin'
+    mock_db.fetchall.return_value = []
+
+    with patch.dict(app.config, {'WTF_CSRF_ENABLED': True}):
+        response = client.post('/bulk_update_status', json={'status': 'Resolved', 'ticket_ids': [1]})
+        assert response.status_code == 200  # nosec
+        # Without the JSON content type the exemption does not help a cross-site form post
+        form_post = client.post('/bulk_update_status', data={'status': 'Resolved', 'ticket_ids': '1'})
+        assert form_post.status_code == 415  # nosec
+        # Everything else is still protected
+        protected = client.post('/add_ticket', data={'title': 't', 'description': 'd', 'priority': 'Low'})
+        assert protected.status_code == 400  # nosec
+
+
+def test_bulk_update_status_unauthorized(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'viewer'
+        sess['role'] = 'readonly'
+
+    response = client.post('/bulk_update_status', json={'status': 'Resolved', 'ticket_ids': [1]})
+    assert response.status_code == 403  # nosec
+
+
+# ----------------------------------------------------------------------
+# 12. TESTS: Instrumentation
+# ----------------------------------------------------------------------
+
+
+def test_log_execution_records_histogram_without_logging_fast_calls():
+    @app_module.log_execution
+    def quick_helper():
+        return 42
+
+    with patch.object(app_module.logger, 'info') as mock_info, \
+            patch.object(app_module.logger, 'log') as mock_log:
+        assert quick_helper() == 42  # nosec
+
+    mock_info.assert_not_called()
+    mock_log.assert_not_called()
+    timing = app_module.call_timings()['quick_helper']
+    assert timing['count'] == 1 and timing['buckets_ms']['+Inf'] == 1  # nosec
+
+
+def test_log_execution_logs_slow_and_failed_calls():
+    @app_module.log_execution
+    def flaky_helper(fail):
+        if fail:
+            raise ValueError('boom')
+
+    with patch.object(app_module, 'LOG_SLOW_CALL_MS', 0), \
+            patch.object(app_module.logger, 'log') as mock_log, \
+            patch.object(app_module.logger, 'error') as mock_error:
+        flaky_helper(False)
+        with pytest.raises(ValueError):
+            flaky_helper(True)
+
+    assert mock_log.call_args.kwargs['extra']['status'] == 'slow'  # nosec
+    assert mock_error.call_args.kwargs['extra']['status'] == 'failed'  # nosec
+    assert app_module.call_timings()['flaky_helper']['errors'] == 1  # nosec
+
+
+def test_timings_api_admin_only(client):
+    with client.session_transaction() as sess:
+        sess['username'] = 'viewer'
+        sess['role'] = 'readonly'
+    assert client.get('/api/timings').status_code == 403  # nosec
+
+
+# ----------------------------------------------------------------------
+# 13. TESTS: Prometheus Metrics
+# ----------------------------------------------------------------------
+
+
+def test_metrics_endpoint_is_public_and_uses_cached_stats(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+    mock_db.fetchall.return_value = [('High', None, 0, 4), (None, 'Open', 1, 4)]
+    client.get('/get_chart_data')  # warms the stats cache and records a route timing
+
+    with client.session_transaction() as sess:
+        sess.clear()
+    mock_db.execute.reset_mock()
+    response = client.get('/metrics')
+
+    assert response.status_code == 200  # nosec
+    body = response.get_data(as_text=True)
+    assert 'tickets_by_status{status="Open"} 4' in body  # nosec
+    assert 'tickets_by_priority{priority="High"} 4' in body  # nosec
+    assert 'http_request_duration_seconds_count{endpoint="get_chart_data",method="GET"}' in body  # nosec
+    assert 'db_pool_connections{pool="primary",state="idle"}' in body  # nosec
+    # The scrape was served entirely from memory
+    mock_db.execute.assert_not_called()
+
+
+def test_metrics_scrape_never_reloads_expired_ticket_stats(client, mock_db):
+    mock_db.fetchall.return_value = [('High', None, 0, 2), (None, 'Resolved', 1, 2)]
+    app_module.ticket_stats_cache.get()
+    app_module.ticket_stats_cache.apply_delta('status_counts', old='Resolved', new='Open')
+    app_module.ticket_stats_cache.invalidate()  # as if STATS_CACHE_TTL had run out
+    mock_db.execute.reset_mock()
+
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'tickets_by_status{status="Open"} 1.0' in body  # nosec
+    assert 'tickets_by_status{status="In Progress"} 0.0' in body  # nosec
+    mock_db.execute.assert_not_called()
+
+
+def test_delta_on_expired_stats_is_dropped_not_published(mock_db):
+    mock_db.fetchall.return_value = [(None, 'Open', 1, 5)]
+    cache = app_module.TicketStatsCache(app_module.get_ticket_stats, ttl=60, on_change=MagicMock())
+    cache.get()
+    cache._on_change.reset_mock()
+
+    with patch('app.time.monotonic', return_value=app_module.time.monotonic() + 61):
+        cache.apply_delta('status_counts', old='Open', new='Resolved')
+    cache._on_change.assert_not_called()
+    assert cache._stats is None  # nosec
+
+
+def test_stats_refresher_publishes_without_readers(mock_db):
+    mock_db.fetchall.return_value = [(None, 'Open', 1, 3)]
+    cache = app_module.TicketStatsCache(app_module.get_ticket_stats, ttl=60, on_change=MagicMock())
+    with patch('app.time.sleep', side_effect=SystemExit):  # stop after the first pass
+        with pytest.raises(SystemExit):
+            cache._refresh_forever()
+    cache._on_change.assert_called_once_with({'priority_counts': {}, 'status_counts': {'Open': 3}})
+
+
+def test_init_worker_starts_the_stats_refresher(mock_db):
+    with patch.object(app_module.ticket_stats_cache, 'start_refresher') as start:
+        app_module.init_worker()
+    start.assert_called_once_with()
+
+
+def test_metrics_merge_the_samples_of_every_worker(client, tmp_path):
+    from prometheus_client.mmap_dict import MmapedDict, mmap_key
+    for pid, errors in ((101, 2), (102, 3)):  # what two gunicorn workers wrote
+        samples = MmapedDict(str(tmp_path / f'counter_{pid}.db'))
+        samples.write_value(mmap_key('http_request_errors', 'http_request_errors_total', ['endpoint', 'method'],
+                                     ['index', 'GET'], 'Requests that returned a 5xx status.'), errors, 0)
+        samples.close()
+
+    with patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': str(tmp_path)}):
+        body = client.get('/metrics').get_data(as_text=True)
+    assert 'http_request_errors_total{endpoint="index",method="GET"} 5.0' in body  # nosec
+
+
+def test_gunicorn_resets_the_metrics_directory_on_start(tmp_path):
+    import runpy
+    metrics_dir = tmp_path / 'metrics'
+    with patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': str(metrics_dir)}):
+        conf = runpy.run_path(os.path.join(os.path.dirname(app_module.__file__), 'gunicorn.conf.py'))
+    (metrics_dir / 'counter_99.db').write_bytes(b'stale')
+    (metrics_dir / 'gauge_livesum_42.db').write_bytes(b'')
+
+    conf['on_starting'](MagicMock())
+    assert list(metrics_dir.iterdir()) == []  # nosec
+
+    (metrics_dir / 'counter_42.db').write_bytes(b'')
+    (metrics_dir / 'gauge_livesum_42.db').write_bytes(b'')
+    conf['child_exit'](MagicMock(), MagicMock(pid=42))
+    assert [f.name for f in metrics_dir.iterdir()] == ['counter_42.db']  # nosec
+
+
+# ----------------------------------------------------------------------
+# 14. TESTS: Read Replica Routing
+# ----------------------------------------------------------------------
+
+
+@pytest.fixture
+def replica_db():
+    """Like mock_db, but with DB_READ_HOST set. Yields the connect mock so tests can see which host was dialled."""
+    with patch('app.psycopg2.connect') as mock_connect, patch.object(app_module, 'DB_READ_HOST', 'app-db-ro'):
+        mock_conn = MagicMock()
+        mock_conn.closed = 0
+        mock_conn.cursor.return_value.fetchall.return_value = []
+        mock_conn.cursor.return_value.rowcount = 0
+        mock_connect.return_value = mock_conn
+        app_module.close_pool()
+        app_module.ticket_stats_cache.invalidate()
+        app_module.ticket_table_cache.bump()
+        yield mock_connect
+        app_module.close_pool()
+
+
+def _dialled_hosts(mock_connect):
+    return [c.kwargs['host'] for c in mock_connect.call_args_list]
+
+
+def test_reads_use_replica_and_writes_use_primary(replica_db):
+    app_module.get_tickets_page()
+    assert _dialled_hosts(replica_db) == ['app-db-ro']  # nosec
+
+    replica_db.reset_mock()
+    app_module.add_ticket('t', 'd', 'Low')
+    assert _dialled_hosts(replica_db) == ['localhost']  # nosec
+
+
+def test_replica_failure_falls_back_to_primary(replica_db):
+    def connect(**kwargs):
+        if kwargs['host'] == 'app-db-ro':
+            raise psycopg2.OperationalError('replica down')
+        return replica_db.return_value
+    replica_db.side_effect = connect
+
+    tickets, _ = app_module.get_tickets_page()
+    assert tickets == []  # nosec
+    assert _dialled_hosts(replica_db) == ['app-db-ro', 'localhost']  # nosec
+
+    # The replica is not retried on every read while it is marked down
+    replica_db.reset_mock()
+    app_module.get_tickets_page()
+    assert _dialled_hosts(replica_db) == []  # nosec
+
+
+def test_replica_query_failure_retries_on_primary(replica_db):
+    # The replica connects fine but its connection dies on the first statement (e.g. a failover)
+    replica_conn = MagicMock()
+    replica_conn.closed = 0
+    replica_conn.cursor.return_value.execute.side_effect = psycopg2.OperationalError('server closed the connection')
+    replica_db.side_effect = lambda **kwargs: replica_conn if kwargs['host'] == 'app-db-ro' else replica_db.return_value
+
+    tickets, _ = app_module.get_tickets_page()
+    assert tickets == []  # nosec
+    assert _dialled_hosts(replica_db) == ['app-db-ro', 'localhost']  # nosec
+    replica_conn.close.assert_called_once_with()  # the dead connection is not pooled again
+    assert not app_module._read_from_replica()  # nosec
+
+
+def test_replica_connections_use_connect_timeout(replica_db):
+    app_module.get_ticket_stats()
+    assert replica_db.call_args.kwargs['connect_timeout'] == app_module.DB_CONNECT_TIMEOUT  # nosec
+
+
+def test_session_reads_its_own_writes_from_primary(client, replica_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+        sess['role'] = 'admin'
+
+    client.post('/add_ticket', data={'title': 'Disk full', 'description': 'x', 'priority': 'High'})
+    with client.session_transaction() as sess:
+        assert 'wrote_at' in sess  # nosec
+
+    replica_db.reset_mock()
+    client.get('/api/tickets')
+    assert 'app-db-ro' not in _dialled_hosts(replica_db)  # nosec
+
+    # Once the window has passed, the same session goes back to the replica
+    with client.session_transaction() as sess:
+        sess['wrote_at'] = 0
+    client.get('/api/tickets')
+    assert _dialled_hosts(replica_db)[-1] == 'app-db-ro'  # nosec
+
+
+# ----------------------------------------------------------------------
+# 15. TESTS: WSGI Entry Point
+# ----------------------------------------------------------------------
+
+
+def test_create_app_survives_database_outage():
+    with patch.object(app_module, 'init_db', side_effect=psycopg2.OperationalError('down')), \
+            patch.object(app_module, 'close_pool') as close_pool:
+        assert app_module.create_app() is app_module.app  # nosec
+    # Nothing pooled in the gunicorn master may leak into forked workers
+    close_pool.assert_called_once_with()
+
+
+# ----------------------------------------------------------------------
+# 16. TESTS: Async Data Access
+# ----------------------------------------------------------------------
+
+
+@pytest.fixture
+def async_db():
+    """Serve the async views; yields a mock standing in for AsyncDatabase._fetch(role, query, params, one)."""
+    app_module.ticket_stats_cache.invalidate()
+    app_module.ticket_table_cache.bump()
+    replaced = app_module.install_async_views()
+    with patch.object(app_module.AsyncDatabase, '_fetch', new_callable=AsyncMock) as fetch:
+        yield fetch
+    app.view_functions.update(replaced)
+    app_module.close_async_db()
+
+
+def test_async_index_renders_tickets(client, async_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+    async_db.return_value = [(7, 'Async ticket', 'desc', 'High', 'Open', '2024-01-01', 1)]
+
+    response = client.get('/')
+
+    assert response.status_code == 200  # nosec
+    assert b'Async ticket' in response.data  # nosec
+    role, query, params, _ = async_db.call_args.args
+    assert role == 'primary' and query is app_module.TICKETS_PAGE_SQL and params == (0, 51)  # nosec
+
+
+def test_async_chart_data_fills_shared_stats_cache(client, async_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+    async_db.return_value = [('High', None, 0, 3), (None, 'Open', 1, 3)]
+
+    first = client.get('/get_chart_data')
+    client.get('/get_chart_data')
+
+    assert first.get_json() == {'priority_counts': {'High': 3}, 'status_counts': {'Open': 3}}  # nosec
+    assert async_db.await_count == 1  # nosec
+    # The sync path reads the same cache without touching the database
+    assert app_module.ticket_stats_cache.get()[0] == first.get_json()  # nosec
+
+
+def test_async_reads_fall_back_from_replica(client, async_db):
+    import psycopg
+
+    def fetch(role, query, params, one):
+        if role == 'replica':
+            raise psycopg.OperationalError('replica down')
+        return [('admin', 'admin')]
+    async_db.side_effect = fetch
+
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+        sess['role'] = 'admin'
+    with patch.object(app_module, 'DB_READ_HOST', 'app-db-ro'):
+        response = client.get('/existing_users')
+
+    assert response.get_json() == [{'username': 'admin', 'role': 'admin'}]  # nosec
+    assert [c.args[0] for c in async_db.call_args_list] == ['replica', 'primary']  # nosec
+    app_module.close_pool()  # clears the replica back-off
+
+
+def test_async_pools_share_the_per_worker_connection_budget():
+    with patch.dict(os.environ, {'DB_POOL_MAX_SIZE': '10', 'DB_READ_POOL_MAX_SIZE': '4'}):
+        with patch.object(app_module, 'ASYNC_DB', False):
+            assert app_module.pool_max_sizes('primary') == (10, 0)  # nosec
+        with patch.object(app_module, 'ASYNC_DB', True):
+            assert app_module.pool_max_sizes('primary') == (5, 5)  # nosec
+            assert app_module.pool_max_sizes('replica') == (2, 2)  # nosec
+            with patch.dict(os.environ, {'ASYNC_DB_POOL_MAX_SIZE': '3'}):
+                assert app_module.pool_max_sizes('primary') == (7, 3)  # nosec
+
+
+# ----------------------------------------------------------------------
+# 17. TESTS: Live Ticket Events
+# ----------------------------------------------------------------------
+
+
+def test_event_hub_fans_out_and_coalesces_backlog():
+    hub = app_module.TicketEventHub('ticket_changes', MagicMock())
+    with patch.object(threading.Thread, 'start'):  # no real LISTEN connection
+        first, second = hub.subscribe(), hub.subscribe()
+
+    hub._dispatch('{"op": "update", "id": 1, "status": "Resolved", "old_status": "Open"}')
+    assert first.get_nowait()['status'] == 'Resolved'  # nosec
+    assert second.get_nowait()['id'] == 1  # nosec
+
+    for i in range(app_module.SSE_QUEUE_SIZE + 1):
+        hub.publish({'op': 'insert', 'id': i})
+    # The stalled subscriber gets one reload instead of a partial backlog
+    assert first.qsize() == 1 and first.get_nowait() == {'op': 'reload'}  # nosec
+
+    hub.unsubscribe(first)
+    hub.unsubscribe(second)
+    assert hub.subscriber_count() == 0  # nosec
+
+
+def test_events_endpoint_streams_ticket_and_reload_events(client):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+    events = app_module.queue.Queue()
+    events.put({'op': 'insert', 'id': 9, 'title': 'Live', 'priority': 'High', 'status': 'Open'})
+    events.put({'op': 'reload'})
+
+    with patch.object(app_module.ticket_events_hub, 'subscribe', return_value=events), \
+            patch.object(app_module.ticket_events_hub, 'unsubscribe') as unsubscribe, \
+            patch.object(app_module, 'SSE_STREAM_SECONDS', 0.05), \
+            patch.object(app_module, 'SSE_KEEPALIVE_SECONDS', 0.01):
+        response = client.get('/events')
+        body = response.get_data(as_text=True)
+
+    assert response.mimetype == 'text/event-stream'  # nosec
+    assert 'event: ticket\ndata: {"op": "insert", "id": 9' in body  # nosec
+    assert 'event: reload\n' in body  # nosec
+    unsubscribe.assert_called_once_with(events)
+
+
+def test_events_endpoint_rejects_when_full(client):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+    with patch.object(app_module.ticket_events_hub, 'subscribe', return_value=None):
+        response = client.get('/events')
+    assert response.status_code == 503  # nosec
+    assert response.headers['Retry-After'] == '30'  # nosec
+
+
+# ----------------------------------------------------------------------
+# 18. TESTS: Login Throttling
+# ----------------------------------------------------------------------
+
+
+def test_token_bucket_refills_over_time():
+    limiter = app_module.TokenBucketLimiter(capacity=2, rate=0.5)
+    with patch('app.time.monotonic', return_value=100.0):
+        assert limiter.consume('k') == 0.0 and limiter.consume('k') == 0.0  # nosec
+        assert limiter.consume('k') == 2.0  # nosec
+    with patch('app.time.monotonic', return_value=102.0):
+        assert limiter.peek('k') == 0.0  # nosec
+
+
+def test_login_throttles_repeated_failures_before_hashing(client, mock_db):
+    mock_db.fetchone.return_value = (generate_password_hash('right'), 'admin')
+    with patch.object(app_module.password_hasher, 'verify', return_value=False) as verify:
+        for _ in range(app_module.login_user_limiter.capacity):
+            client.post('/login', data={'username': 'admin', 'password': 'wrong'})
+        response = client.post('/login', data={'username': 'admin', 'password': 'wrong'})
+
+    assert response.status_code == 429  # nosec
+    assert int(response.headers['Retry-After']) > 0  # nosec
+    assert b'Too many login attempts' in response.data  # nosec
+    # The throttled attempt never reached the password hasher
+    assert verify.call_count == app_module.login_user_limiter.capacity  # nosec
+
+
+def test_login_upgrades_outdated_password_hash(client, mock_db):
+    old_hash = generate_password_hash('admin123', method='pbkdf2:sha256:1000')
+    mock_db.fetchone.return_value = (old_hash, 'admin')
+
+    response = client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+    assert response.status_code == 302  # nosec
+    update = next(c for c in mock_db.execute.call_args_list if 'UPDATE users SET password' in c.args[0])
+    new_hash, username, expected_old = update.args[1]
+    assert new_hash.startswith(app_module.PASSWORD_HASH_METHOD + '$')  # nosec
+    assert (username, expected_old) == ('admin', old_hash)  # nosec
+
+
+def test_login_returns_503_when_hash_pool_is_saturated(client, mock_db):
+    mock_db.fetchone.return_value = (generate_password_hash('admin123'), 'admin')
+    with patch.object(app_module.password_hasher, 'verify', side_effect=app_module.HashingBusyError):
+        response = client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    assert response.status_code == 503  # nosec
+    assert response.headers['Retry-After'] == '1'  # nosec
+
+
+def test_password_hash_timeout_is_reported_as_busy():
+    hasher = app_module.PasswordHasher(workers=1, max_pending=2)
+    release = threading.Event()
+    with patch('app.LOGIN_HASH_TIMEOUT', 0.01), pytest.raises(app_module.HashingBusyError):
+        hasher._run(release.wait)
+    release.set()
+
+
+def test_hash_with_defaulted_parameters_is_not_rehashed_every_login():
+    app_module._dummy_password_hash.cache_clear()
+    try:
+        with patch('app.PASSWORD_HASH_METHOD', 'pbkdf2:sha256'):
+            # werkzeug stores this method as 'pbkdf2:sha256:<iterations>'
+            assert not app_module._needs_rehash(generate_password_hash('pw', method='pbkdf2:sha256'))  # nosec
+            assert app_module._needs_rehash(generate_password_hash('pw', method='pbkdf2:sha256:1000'))  # nosec
+    finally:
+        app_module._dummy_password_hash.cache_clear()
+
+
+# ----------------------------------------------------------------------
+# 19. TESTS: Ticket Table Fragment Cache
+# ----------------------------------------------------------------------
+
+
+def test_ticket_table_is_served_from_cache_until_a_write(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'viewer'
+        sess['role'] = 'readonly'
+    mock_db.fetchall.return_value = [
+        (1, 'Cached row', 'd', 'Low', 'Open', '2024-01-01', 1)
+    ]
+
+    client.get('/incident')
+    mock_db.execute.reset_mock()
+    with patch('app.render_template', wraps=app_module.render_template) as render:
+        response = client.get('/incident')
+
+    assert b'Cached row' in response.data  # nosec
+    mock_db.execute.assert_not_called()
+    assert [c.args[0] for c in render.call_args_list] == ['index.html']  # nosec
+
+    app_module.add_ticket('New', 'd', 'High')  # bumps the data version
+    mock_db.execute.reset_mock()
+    client.get('/incident')
+    assert_sql_executed(mock_db, 'FROM tickets WHERE id > %s')
+
+
+def test_ticket_table_cache_is_per_role_and_bounded():
+    cache = app_module.FragmentCache(max_entries=2, ttl=60)
+    for key in [('', True), ('', False), ('q', False)]:
+        cache.put(key, key, cache.version)
+    assert cache.get(('', True)) is None  # nosec - least recently used entry evicted
+    assert cache.get(('q', False)) == ('q', False)  # nosec
+
+    stale_version = cache.version
+    cache.bump()
+    cache.put(('', True), 'read before the write', stale_version)
+    assert cache.get(('', True)) is None  # nosec
+
+# ----------------------------------------------------------------------
+# 20. TESTS: Compact Ticket Rows
+# ----------------------------------------------------------------------
+
+
+def test_ticket_rows_are_built_from_a_tuple_cursor(mock_db):
+    mock_db.fetchall.return_value = [(i, f'T{i}', 'd', 'Low', 'Open', '2024-01-01', 1) for i in (1, 2, 3)]
+
+    tickets, next_after_id = app_module.get_tickets_page(limit=2)
+
+    assert all(isinstance(t, app_module.Ticket) for t in tickets)  # nosec
+    assert [t.title for t in tickets] == ['T1', 'T2'] and next_after_id == 2  # nosec
+    assert not hasattr(tickets[0], '__dict__')  # nosec - no per-row dict
+
+# ----------------------------------------------------------------------
+# 21. TESTS: Ticket History
+# ----------------------------------------------------------------------
+
+
+def test_ticket_events_migration_records_history_with_triggers(mock_db):
+    app_module._migration_ticket_events(mock_db)
+
+    assert_sql_executed(mock_db, "PARTITION BY RANGE (occurred_at)")
+    assert_sql_executed(mock_db, "USING BRIN (occurred_at)")
+    assert_sql_executed(mock_db, "PARTITION OF ticket_events DEFAULT")
+    # Statement-level, so COPY imports and bulk updates write history in the same transaction
+    assert_sql_executed(mock_db, "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows")
+    assert_sql_executed(mock_db, "LOCALTIMESTAMP - coalesce(o.status_changed_at, o.created_at)")
+
+
+def test_ensure_ticket_event_partitions_moves_default_rows_before_attach(mock_db):
+    # This month exists already; the following ones do not
+    mock_db.fetchone.side_effect = [('ticket_events_this_month',), (None,), (None,)]
+
+    created = app_module.ensure_ticket_event_partitions(mock_db, months_ahead=2)
+
+    assert len(created) == 2  # nosec
+    executed = [str(c.args[0]) for c in mock_db.execute.call_args_list]
+    move = next(i for i, q in enumerate(executed) if 'DELETE FROM ticket_events_default' in q)
+    attach = next(i for i, q in enumerate(executed) if 'ATTACH PARTITION' in q)
+    assert move < attach  # nosec
+    bounds = mock_db.execute.call_args_list[attach].args[1]
+    assert bounds[0].day == 1 and bounds[1].day == 1 and bounds[0] < bounds[1]  # nosec
+
+
+def test_resolution_stats_api(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+    mock_db.fetchall.side_effect = [
+        # (priority, overall, count, avg, p50, p90) in seconds
+        [('High', 0, 2, 3600, 3600, 5400), (None, 1, 2, 3600, 3600, 5400)],
+        [('Open', 4, 7200, 1800, 14400)],
+    ]
+
+    response = client.get('/stats/resolution?from=2026-09-01&to=2026-09-30')
+
+    assert response.status_code == 200  # nosec
+    assert response.json['time_to_resolve']['overall']['avg_hours'] == 1.0  # nosec
+    assert response.json['time_to_resolve']['by_priority']['High']['p90_hours'] == 1.5  # nosec
+    assert response.json['status_dwell']['Open'] == {'count': 4, 'avg_hours': 2.0, 'p50_hours': 0.5,  # nosec
+                                                     'p90_hours': 4.0}
+    start, end = mock_db.execute.call_args.args[1]
+    assert (start, end) == (datetime(2026, 9, 1), datetime(2026, 10, 1))  # nosec
+    assert client.get('/stats/resolution?from=2026-10-02&to=2026-10-01').status_code == 400  # nosec
+
+# ----------------------------------------------------------------------
+# 22. TESTS: Ticket Rollups
+# ----------------------------------------------------------------------
+
+
+def test_rollup_migration_upserts_from_a_statement_trigger_and_backfills(mock_db):
+    app_module._migration_ticket_rollups(mock_db)
+
+    assert_sql_executed(mock_db, "FOR EACH STATEMENT EXECUTE FUNCTION update_ticket_rollups()")
+    assert_sql_executed(mock_db, "DO UPDATE SET count = ticket_rollups.count + EXCLUDED.count")
+    assert_sql_executed(mock_db, "INSERT INTO ticket_rollups (granularity, bucket, kind, value, count)")
+
+
+def test_backfill_rollups_rebuilds_whole_days(mock_db):
+    app_module.backfill_ticket_rollups(datetime(2026, 9, 1, 15, 30), datetime(2026, 9, 2))
+
+    assert_sql_executed(mock_db, "LOCK TABLE ticket_rollups IN SHARE ROW EXCLUSIVE MODE")
+    delete = next(c for c in mock_db.execute.call_args_list if 'DELETE FROM ticket_rollups' in c.args[0])
+    assert delete.args[1] == (datetime(2026, 9, 1), datetime(2026, 9, 3))  # nosec
+
+
+def test_backfill_rollups_cli(mock_db):
+    mock_db.rowcount = 12
+    result = app.test_cli_runner().invoke(args=['backfill-rollups', '--from', '2026-09-01'])
+    assert 'Rebuilt 12 rollup rows' in result.output  # nosec
+
+
+def test_trend_api_reads_only_rollups_into_dense_series(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+    mock_db.fetchall.return_value = [
+        (datetime(2026, 9, 2), 'created', 'High', 3),
+        (datetime(2026, 9, 3), 'status', 'Resolved', 2),
+    ]
+
+    response = client.get('/stats/trend?from=2026-09-01&to=2026-09-03')
+
+    assert response.json['buckets'] == ['2026-09-01T00:00:00', '2026-09-02T00:00:00', '2026-09-03T00:00:00']  # nosec
+    assert response.json['created_by_priority']['High'] == [0, 3, 0]  # nosec
+    assert response.json['entered_status']['Resolved'] == [0, 0, 2]  # nosec
+    executed = [str(c.args[0]) for c in mock_db.execute.call_args_list]
+    assert all('FROM tickets' not in q for q in executed)  # nosec
+    assert client.get('/stats/trend?granularity=minute').status_code == 400  # nosec
+    assert client.get('/stats/trend?granularity=hour&from=2026-01-01&to=2026-09-01').status_code == 400  # nosec
+
+
+def test_trend_rejects_huge_ranges_before_building_buckets(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+    response = client.get('/stats/trend?granularity=hour&from=0001-01-01')
+    assert response.status_code == 400  # nosec
+
+    # ~17.7M hourly buckets: must fail on arithmetic alone, not after allocating them
+    with pytest.raises(ValueError, match='at most 1000 hour buckets'):
+        app_module.get_ticket_trend('hour', datetime(1, 1, 1), datetime(2026, 1, 1))
+    mock_db.execute.assert_not_called()
+
+
+# ----------------------------------------------------------------------
+# 23. TESTS: Write-Behind Ticket Ingest
+# ----------------------------------------------------------------------
+
+
+def test_batch_writer_groups_queued_tickets_into_one_insert(mock_db):
+    writer = app_module.TicketBatchWriter(max_queue=10, batch_size=3, flush_seconds=1)
+    rows = [(f't{i}', 'd', 'Low', 'Open', '2026-01-01 00:00:00', f'fp{i}', 1) for i in range(3)]
+    # RETURNING order is not guaranteed; rows are matched back by their VALUES ordinal
+    returned = [(2, 9, False), (0, 7, True), (1, 8, True)]
+    with patch('app.psycopg2.extras.execute_values', return_value=returned) as execute_values:
+        futures = [writer.submit(row) for row in rows]
+        results = [f.result(timeout=5) for f in futures]
+
+    assert results == [(7, True), (8, True), (9, False)]  # nosec
+    execute_values.assert_called_once()
+    assert execute_values.call_args.args[2] == [(i,) + row for i, row in enumerate(rows)]  # nosec
+    assert writer.stats()['batches'] == 1 and writer.stats()['tickets'] == 3  # nosec
+
+
+def test_batch_writer_fails_callers_missing_from_the_result(mock_db):
+    writer = app_module.TicketBatchWriter(max_queue=10, batch_size=2, flush_seconds=1)
+    rows = [(f't{i}', 'd', 'Low', 'Open', '2026-01-01 00:00:00', f'fp{i}', 1) for i in range(2)]
+    with patch('app.psycopg2.extras.execute_values', return_value=[(0, 7, True)]):
+        answered, missing = [writer.submit(row) for row in rows]
+        assert answered.result(timeout=5) == (7, True)  # nosec
+        assert isinstance(missing.exception(timeout=5), app_module.TicketIngestPending)  # nosec
+
+    assert writer.stats()['unanswered'] == 1  # nosec
+
+
+def test_batch_writer_applies_back_pressure_when_full():
+    writer = app_module.TicketBatchWriter(max_queue=1, batch_size=10, flush_seconds=0)
+    writer._queue.put(('queued', None))  # no writer thread yet, so this slot stays taken
+
+    assert writer.submit(('t', 'd', 'Low', 'Open', 'now'), timeout=0) is None  # nosec
+    assert writer.stats()['rejected'] == 1  # nosec
+
+
+def test_add_ticket_falls_back_to_sync_insert_when_batch_fails(mock_db):
+    mock_db.fetchone.return_value = (42, True)
+    with patch('app.INGEST_BATCHING', True), \
+            patch('app.psycopg2.extras.execute_values', side_effect=psycopg2.OperationalError('batch lost')):
+        ticket = app_module.add_ticket('Disk full', 'Node 3', 'High')
+
+    assert ticket == (42, 'High', False)  # nosec
+    assert_sql_executed(mock_db, "VALUES (%s, %s, %s, %s, %s, %s, %s)")
+
+
+def test_ingest_timeout_inserts_directly_while_row_is_still_queued(mock_db):
+    writer = app_module.TicketBatchWriter(max_queue=10, batch_size=10, flush_seconds=0)
+    writer._thread = MagicMock()  # pretend a writer thread is busy elsewhere, so the row stays queued
+    with patch('app.INGEST_WAIT_SECONDS', 0):
+        assert writer.write(('t', 'd', 'Low', 'Open', 'now', None, 1)) is None  # nosec
+
+    (_, future), = list(writer._queue.queue)
+    assert future.cancelled() and writer.stats()['timed_out'] == 1  # nosec
+    assert writer._take_batch() == []  # nosec
+
+
+def test_ingest_timeout_mid_batch_answers_202(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+        sess['role'] = 'admin'
+    with patch.object(app_module.ticket_writer, 'write', side_effect=app_module.TicketIngestPending()), \
+            patch('app.INGEST_BATCHING', True):
+        response = client.post('/add_ticket', data={'title': 'Disk full', 'description': 'x', 'priority': 'High'})
+
+    assert response.status_code == 202  # nosec
+    assert b'still being saved' in response.data  # nosec
+    # The batch may still commit, so the route must not insert the ticket a second time
+    assert not any('INSERT INTO tickets' in executed_sql(c) for c in mock_db.execute.call_args_list)  # nosec
+
+# ----------------------------------------------------------------------
+# 24. TESTS: Ticket Deduplication
+# ----------------------------------------------------------------------
+
+
+def test_fingerprint_ignores_case_spacing_and_timestamps():
+    fp = app_module.ticket_fingerprint
+    assert fp('Disk full on node-3', 'fired at 2026-10-18T04:12:09Z') == \
+        fp('  disk FULL on  node-3', 'fired at 2026-10-18 05:00')  # nosec
+    assert fp('Disk full on node-3', 'x') != fp('Disk full on node-4', 'x')  # nosec
+
+
+def test_repeat_ticket_is_upserted_then_counted_via_the_cached_id(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+        sess['role'] = 'admin'
+    form = {'title': 'CPU high', 'description': 'node-3', 'priority': 'High'}
+
+    mock_db.fetchone.return_value = (5, False)  # ON CONFLICT hit an unresolved ticket
+    response = client.post('/add_ticket', data=form, follow_redirects=True)
+    assert b'Ticket #5 is already open' in response.data  # nosec
+    assert_sql_executed(mock_db, "ON CONFLICT (fingerprint) WHERE status <> 'Resolved'")
+
+    mock_db.execute.reset_mock()
+    mock_db.rowcount = 1
+    client.post('/add_ticket', data=form)
+    executed = [str(c.args[0]) for c in mock_db.execute.call_args_list]
+    assert any('SET occurrences = occurrences + 1' in q for q in executed)  # nosec
+    assert not any('INSERT INTO tickets' in q for q in executed)  # nosec
+
+
+def test_repeat_ticket_refreshes_the_cached_occurrence_count(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+        sess['role'] = 'admin'
+    mock_db.fetchall.return_value = [(5, 'CPU high', 'node-3', 'High', 'Open', '2025-01-01', 1)]
+    assert '&times;1<' in client.get('/').get_data(as_text=True)  # nosec
+
+    mock_db.fetchone.return_value = (5, False)  # ON CONFLICT hit ticket 5
+    client.post('/add_ticket', data={'title': 'CPU high', 'description': 'node-3', 'priority': 'High'})
+    mock_db.fetchall.return_value = [(5, 'CPU high', 'node-3', 'High', 'Open', '2025-01-01', 2)]
+    assert '&times;2<' in client.get('/').get_data(as_text=True)  # nosec
+
+
+def test_stale_cached_fingerprint_falls_back_to_upsert(mock_db):
+    fingerprint = app_module.ticket_fingerprint('CPU high', 'node-3')
+    app_module.fingerprint_index.put(fingerprint, 5)
+    mock_db.rowcount = 0  # ticket 5 was resolved, which released its fingerprint
+    mock_db.fetchone.return_value = (6, True)
+
+    assert app_module.add_ticket('CPU high', 'node-3', 'Low') == (6, 'Low', False)  # nosec
+    assert app_module.fingerprint_index.get(fingerprint) == 6  # nosec
+
+
+def test_batch_writer_folds_duplicates_into_one_row():
+    rows, waiters = app_module.TicketBatchWriter._fold_duplicates([
+        (('a', 'd', 'Low', 'Open', 't', 'fp-a', 1), 'f1'),
+        (('b', 'd', 'Low', 'Open', 't', 'fp-b', 1), 'f2'),
+        (('a', 'd', 'High', 'Open', 't', 'fp-a', 1), 'f3'),
+    ])
+    assert rows == [('a', 'd', 'Low', 'Open', 't', 'fp-a', 2), ('b', 'd', 'Low', 'Open', 't', 'fp-b', 1)]  # nosec
+    assert waiters == [['f1', 'f3'], ['f2']]  # nosec
+
+
+def test_edit_recomputes_the_fingerprint(mock_db):
+    old_fingerprint = app_module.ticket_fingerprint('CPU high', 'node-3')
+    new_fingerprint = app_module.ticket_fingerprint('CPU high', 'node-4')
+    app_module.fingerprint_index.put(old_fingerprint, 5)
+    mock_db.fetchone.return_value = ('Low', old_fingerprint, new_fingerprint)
+
+    app_module.update_ticket(5, 'CPU high', 'node-4', 'Low')
+
+    assert mock_db.execute.call_args.args[1]['fingerprint'] == new_fingerprint  # nosec
+    # Resolved tickets keep a NULL fingerprint rather than taking the new one
+    assert_sql_executed(mock_db, "WHEN status = 'Resolved' OR EXISTS (")
+    assert app_module.fingerprint_index.get(old_fingerprint) is None  # nosec
+    assert app_module.fingerprint_index.get(new_fingerprint) == 5  # nosec
+
+
+def test_occurrences_are_listed_in_api_and_table(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+        sess['role'] = 'admin'
+    mock_db.fetchall.return_value = [(1, 'CPU high', 'node-3', 'High', 'Open', '2025-01-01', 12)]
+
+    assert client.get('/api/tickets').json['tickets'][0]['occurrences'] == 12  # nosec
+    app_module.ticket_table_cache.bump()
+    assert '&times;12' in client.get('/').get_data(as_text=True)  # nosec
+
+
+# ----------------------------------------------------------------------
+# 25. TESTS: Ticket Archival
+# ----------------------------------------------------------------------
+
+
+def test_archive_moves_batches_until_one_comes_up_short(mock_db):
+    rowcounts = iter([2, 2, 1])
+
+    def execute(query, params=None):
+        if 'INSERT INTO tickets_archive' in query:
+            mock_db.rowcount = next(rowcounts)
+
+    mock_db.execute.side_effect = execute
+    assert app_module.archive_resolved_tickets(older_than_days=30, batch_size=2) == 5  # nosec
+
+    moves = [c for c in mock_db.execute.call_args_list if 'INSERT INTO tickets_archive' in c.args[0]]
+    assert len(moves) == 3  # nosec
+    assert moves[0].args[1][1] == 2  # nosec
+    assert_sql_executed(mock_db, "FOR UPDATE SKIP LOCKED")
+    notifies = [c for c in mock_db.execute.call_args_list if 'pg_notify' in c.args[0]]
+    assert len(notifies) == 1 and '"reload"' in notifies[0].args[1][1]  # nosec
+
+
+def test_archive_with_nothing_to_move_does_not_notify(mock_db):
+    mock_db.rowcount = 0
+    assert app_module.archive_resolved_tickets() == 0  # nosec
+    assert not any('pg_notify' in c.args[0] for c in mock_db.execute.call_args_list)  # nosec
+
+
+def test_tickets_api_reads_the_archive_only_when_asked(client, mock_db):
+    with client.session_transaction() as sess:
+        sess['username'] = 'admin'
+    mock_db.fetchall.return_value = [
+        (i, f'T{i}', 'D', 'Low', 'Resolved', '2025-01-01', 1) for i in (1, 2, 3)
+    ]
+
+    response = client.get('/api/tickets?limit=2')
+    assert 'FROM tickets WHERE id > %s' in executed_sql(mock_db.execute.call_args)  # nosec
+    assert 'include_archived' not in response.json['next_url']  # nosec
+
+    response = client.get('/api/tickets?limit=2&include_archived=1')
+    assert 'FROM all_tickets WHERE id > %s' in executed_sql(mock_db.execute.call_args)  # nosec
+    assert 'include_archived=1' in response.json['next_url']  # nosec
+
+
+# ----------------------------------------------------------------------
+# 26. TESTS: Prepared Query Registry
+# ----------------------------------------------------------------------
+
+
+def test_register_numbers_parameters_for_prepare():
+    registry = app_module.QueryRegistry()
+    positional = registry.register('page', 'SELECT id FROM tickets WHERE id > %s LIMIT %s')
+    named = registry.register('find', "SELECT id FROM tickets WHERE title %% %(q)s OR title ILIKE %(q)s LIMIT %(limit)s")
+
+    assert positional.execute == 'EXECUTE page(%s, %s)'  # nosec
+    assert 'WHERE id > $1 LIMIT $2' in str(positional.prepare)  # nosec
+    # A named parameter is sent once however often the statement uses it
+    assert named.execute == 'EXECUTE find(%(q)s, %(limit)s)'  # nosec
+    assert 'title % $1 OR title ILIKE $1 LIMIT $2' in str(named.prepare)  # nosec
+    with pytest.raises(ValueError):
+        registry.register('page', 'SELECT 1')
+
+
+def test_query_is_prepared_once_per_connection_and_counted():
+    registry = app_module.QueryRegistry()
+    query = registry.register('by_id', 'SELECT id FROM tickets WHERE id = %s')
+    cursor = MagicMock(rowcount=1)
+
+    registry.run(cursor, query, (1,))
+    registry.run(cursor, query, (2,))
+    assert [str(c.args[0]).startswith('Composed') for c in cursor.execute.call_args_list] == [True, False, False]  # nosec
+    assert cursor.execute.call_args.args == ('EXECUTE by_id(%s)', (2,))  # nosec
+
+    other = MagicMock(rowcount=0)  # a different pooled connection prepares for itself
+    registry.run(other, query, (3,))
+    assert other.execute.call_count == 2  # nosec
+
+    stats = registry.snapshot()['by_id']
+    assert stats['count'] == 3 and stats['rows'] == 2  # nosec
+
+
+def test_lost_prepared_statements_are_prepared_again():
+    registry = app_module.QueryRegistry()
+    query = registry.register('ping', 'SELECT 1')
+    cursor = MagicMock(rowcount=1)
+    registry.run(cursor, query)
+
+    # Mid-transaction the failure has aborted earlier work, so it propagates
+    cursor.connection.get_transaction_status.return_value = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+    cursor.execute.side_effect = [psycopg2.errors.InvalidSqlStatementName('gone'), None, None]
+    with pytest.raises(psycopg2.errors.InvalidSqlStatementName):
+        registry.run(cursor, query)
+    registry.run(cursor, query)
+
+    assert str(cursor.execute.call_args_list[-2].args[0]).startswith('Composed')  # nosec
+    assert registry.snapshot()['ping']['errors'] == 1  # nosec
+
+
+def test_lost_prepared_statement_is_retried_at_transaction_start():
+    registry = app_module.QueryRegistry()
+    query = registry.register('ping', 'SELECT 1')
+    cursor = MagicMock(rowcount=1)
+    cursor.connection.get_transaction_status.return_value = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    registry.run(cursor, query)
+
+    cursor.execute.reset_mock()
+    cursor.execute.side_effect = [psycopg2.errors.InvalidSqlStatementName('gone'), None, None]
+    registry.run(cursor, query)
+
+    cursor.connection.rollback.assert_called_once_with()
+    executed = [str(c.args[0]) for c in cursor.execute.call_args_list]
+    assert executed[0] == executed[2] == query.execute and executed[1] == str(query.prepare)  # nosec
+    assert registry.snapshot()['ping']['errors'] == 0  # nosec
+
+
+def test_prepared_statements_can_be_disabled(mock_db):
+    mock_db.fetchone.return_value = None
+    with patch.object(app_module, 'DB_PREPARED_STATEMENTS', False):
+        app_module.get_ticket_by_id(7)
+    assert mock_db.execute.call_args.args == (app_module.TICKET_BY_ID_SQL.text, (7,))  # nosec
+
+
+def test_metrics_report_per_query_latency_and_rows(client, mock_db):
+    mock_db.rowcount = 3
+    app_module.get_tickets_page()
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'db_query_duration_seconds_count{query="tickets_page"}' in body  # nosec
+    assert 'db_query_rows_total{query="tickets_page"}' in body  # nosec